@@ -0,0 +1,169 @@
+"""
+Batched, buffered record logging shared by the Flower server and Pi clients.
+
+Callers enqueue records on a bounded queue and return immediately; a single
+background thread collects them for up to flush_interval seconds (or
+batch_size records) and writes each batch with one write() call. When the
+queue is full, write() blocks (backpressure) instead of dropping audit
+records.
+
+CSV output is line-for-line identical to the previous f.write(...) logs.
+Parquet output (optional, requires pyarrow) writes one row group per batch.
+A Parquet file cannot be reopened for appending, so mode="a" on an existing
+log starts a new part file next to it (hashes.parquet, hashes.1.parquet,
+hashes.2.parquet, ...); parquet_parts() lists them in write order.
+"""
+
+import atexit
+import glob
+import logging
+import os
+import re
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+def _part_path(path, number):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{number}{extension or '.parquet'}"
+
+
+def parquet_parts(path):
+    """Existing files of a Parquet log written with mode="a": path, then its part files in write order."""
+    stem, extension = os.path.splitext(path)
+    pattern = re.compile(re.escape(stem) + r"\.(\d+)" + re.escape(extension or ".parquet") + "$")
+    parts = sorted((int(match.group(1)), part) for part in glob.glob(glob.escape(stem) + ".*")
+                   if (match := pattern.match(part)))
+    return ([path] if os.path.exists(path) else []) + [part for _, part in parts]
+
+
+class BatchedLogWriter:
+    """Append records to a log file from a background writer thread."""
+
+    def __init__(self, path, header=None, mode="a", fmt="csv", flush_interval=1.0, max_queue=10000, batch_size=1024):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported log format '{fmt}'. Use 'csv' or 'parquet'.")
+        if fmt == "parquet" and not header:
+            raise ValueError("Parquet logs need a header to name their columns.")
+        if fmt == "parquet" and mode not in ("a", "w"):
+            raise ValueError(f"Unsupported mode '{mode}' for Parquet logs. Use 'a' or 'w'.")
+
+        self.path = path
+        self.header = list(header) if header else None
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.records_written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if fmt == "csv":
+            self._file = open(path, mode, buffering=1 << 16)
+            if self.header and (mode == "w" or self._file.tell() == 0):
+                self._file.write(",".join(self.header) + "\n")
+            self._parquet = None
+        else:
+            self._file = None
+            self._parquet = None
+            existing = parquet_parts(path)
+            self._parquet_path = path
+            if mode == "w":
+                for part in existing:
+                    if part != path:
+                        os.remove(part)
+            elif existing:
+                number = len(existing)
+                while os.path.exists(_part_path(path, number)):
+                    number += 1
+                self._parquet_path = _part_path(path, number)
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, *fields):
+        """Queue one record; fields are joined with commas in CSV output."""
+        if self._closed:
+            raise RuntimeError(f"Log writer for {self.path} is closed.")
+        self._queue.put(fields)
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _CLOSE or isinstance(item, threading.Event):
+                if pending:
+                    self._write_batch(pending)
+                    pending, deadline = [], None
+                if item is _CLOSE:
+                    self._finish()
+                    return
+                item.set()
+                continue
+
+            if item is not None:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(item)
+
+            if pending and (len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                self._write_batch(pending)
+                pending, deadline = [], None
+
+    def _write_batch(self, batch):
+        try:
+            if self.fmt == "csv":
+                self._file.write("".join(",".join(str(field) for field in record) + "\n" for record in batch))
+                self._file.flush()
+            else:
+                self._write_parquet(batch)
+            self.records_written += len(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} records to {self.path}: {e}")
+
+    def _write_parquet(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {name: [record[i] for record in batch] for i, name in enumerate(self.header)}
+        table = pa.table(columns)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self._parquet_path, table.schema, compression="zstd")
+        self._parquet.write_table(table.cast(self._parquet.schema))
+
+    def _finish(self):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def flush(self, timeout=None):
+        """Block until every record queued before this call has been written."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush everything queued so far and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
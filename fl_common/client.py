@@ -0,0 +1,341 @@
+"""
+Shared Flower client core for the Raspberry Pi IDS nodes.
+
+Every node runs the same FlowerClient; its client_config.json selects the
+behaviour. Nothing happens at import time: the dataset, Keras model and hash
+log are created on first use, so the client can be driven in-process by a
+simulation harness or a profiler as well as by main().
+
+Components are injectable:
+- data:          callable returning (X_train, X_val, y_train, y_val)
+                 (default: cached dataset from dataset_path)
+- model_factory: callable taking the feature count, returning a compiled model
+- metrics:       ClientMetrics (no-op) or PrometheusMetrics
+
+Optional config keys on top of the node settings:
+    epochs              local epochs per round (default 7)
+    hash_log_path       client hash log (default DEFAULT_HASH_LOG_PATH)
+    dataset_cache_dir   see fl_common.dataset_cache
+    metrics_port        start the Prometheus exporter on this port
+    simulate_detection  run the detection loop on the validation set after training
+    detection_rate      offered load for the detection loop in flows/s (default: unthrottled)
+    poison_round        replace the weights with random noise after this local round
+    runtime_export_path write each received global model as a NumPy runtime .npz (fl_common.numpy_runtime)
+    quantized_export_path  write each received global model as an int8 QuantizedANN .npz taking raw flow
+                        features (for ids/snort/live_ingest.py --quantized), calibrated on calibration_rows
+    detection_backend   "keras" (default), "numpy" or "int8"; the NumPy backends run detection alongside
+                        training and hot-swap in every received global model
+    calibration_rows    X_val rows used to calibrate int8 activation ranges (default 2000)
+    detection_flows_path  run the detection loop on this CSV of flow features (ids/snort/flow_meter.py output)
+                        instead of the validation set, scaled with the dataset's scaler statistics
+"""
+
+import argparse
+import functools
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import flwr as fl
+
+from fl_common.batched_log import BatchedLogWriter
+from fl_common.compression import UpdateEncoder
+from fl_common.dataset_cache import load_dataset, load_scaler_stats
+from fl_common.detection_engine import HotSwapModel, MicroBatchDetector, keras_predict_fn
+from fl_common.model_hash import hash_weights
+from fl_common.numpy_runtime import NumpyANN, export_runtime
+from fl_common.quantized_runtime import QuantizedANN, quantization_deltas
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HASH_LOG_PATH = "/home/rtikes/ml-data/flower/model_hashes.log"
+DEFAULT_EPOCHS = 7
+DETECTION_BACKENDS = ("keras", "numpy", "int8")
+MODEL_ACTIVATIONS = ("relu", "relu", "sigmoid")
+
+
+def load_config(path, overrides=None):
+    """Read a node's client_config.json, applying any overrides."""
+    with open(path, "r") as f:
+        config = json.load(f)
+    config.update(overrides or {})
+    return config
+
+
+def build_model(input_dim, learning_rate):
+    """The nodes' 64-32-1 ANN for binary intrusion detection."""
+    from tensorflow import keras
+    from tensorflow.keras.layers import Dense, Dropout
+    from tensorflow.keras.models import Sequential
+
+    model = Sequential([
+        Dense(64, activation="relu", input_shape=(input_dim,)),
+        Dropout(0.2),
+        Dense(32, activation="relu"),
+        Dense(1, activation="sigmoid")  # Binary classification output
+    ])
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss="binary_crossentropy",
+                  metrics=["accuracy", "Precision", "Recall", "AUC"])
+    return model
+
+
+def configure_device(use_gpu):
+    """Hide the GPU from TensorFlow on the Raspberry Pi nodes."""
+    if not use_gpu:
+        import tensorflow as tf
+        tf.config.set_visible_devices([], "GPU")
+        logger.info("using CPU.")
+
+
+class ClientMetrics:
+    """No-op metrics sink; subclass to export client training and detection metrics."""
+
+    def round_completed(self, model_hash):
+        pass
+
+    def detection_batch(self, batch_size, predicted_class, alerts, p50_ms, p99_ms):
+        pass
+
+
+class PrometheusMetrics(ClientMetrics):
+    """Prometheus gauges/counters served over HTTP (node-alpha's exporter)."""
+
+    def __init__(self, port=9100):
+        from prometheus_client import Counter, Gauge, start_http_server
+
+        start_http_server(port)
+        self.inference_latency = Gauge('inference_latency_ms', 'Median end-to-end flow latency in milliseconds')
+        self.inference_latency_p99 = Gauge('inference_latency_p99_ms', 'p99 end-to-end flow latency in milliseconds')
+        self.detection_batch_size = Gauge('detection_batch_size', 'Flows in the latest inference micro-batch')
+        self.flows_processed = Counter('flows_processed_total', 'Flows classified by the detection engine')
+        self.alerts_triggered = Gauge('alerts_triggered', 'Number of attack predictions')
+        self.predicted_class = Gauge('predicted_class', 'Latest predicted class (0 or 1)')
+        self.model_training_rounds = Counter('model_training_rounds_total', 'Total number of FL training rounds completed')
+        self.model_hash_changes = Counter('model_hash_changes_total', 'Number of unique model weight updates')
+
+    def round_completed(self, model_hash):
+        self.model_training_rounds.inc()
+        self.model_hash_changes.inc()
+
+    def detection_batch(self, batch_size, predicted_class, alerts, p50_ms, p99_ms):
+        self.detection_batch_size.set(batch_size)
+        self.flows_processed.inc(batch_size)
+        self.predicted_class.set(predicted_class)
+        self.alerts_triggered.set(alerts)
+        self.inference_latency.set(p50_ms)
+        self.inference_latency_p99.set(p99_ms)
+
+
+class FlowerClient(fl.client.NumPyClient):
+    def __init__(self, config, data=None, model_factory=None, metrics=None, hash_log=None, encoder=None):
+        self.config = config
+        self.client_id = config["client_id"]
+        self.epochs = config.get("epochs", DEFAULT_EPOCHS)
+        self.poison_round = config.get("poison_round")
+        self.hash_log_path = config.get("hash_log_path", DEFAULT_HASH_LOG_PATH)
+        self._data_fn = data or functools.partial(
+            load_dataset, config["dataset_path"], cache_dir=config.get("dataset_cache_dir")
+        )
+        self._model_factory = model_factory or functools.partial(build_model, learning_rate=config["learning_rate"])
+        self.metrics = metrics or ClientMetrics()
+        self.encoder = encoder or UpdateEncoder()
+        self._hash_log = hash_log
+        self._data = None
+        self._model = None
+        self.rounds = 0
+        self.detection_backend = config.get("detection_backend", "keras")
+        if self.detection_backend not in DETECTION_BACKENDS:
+            raise ValueError(f"Unknown detection_backend '{self.detection_backend}'. Use one of {DETECTION_BACKENDS}.")
+        self.detector_model = HotSwapModel()
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self._data_fn()
+        return self._data
+
+    @property
+    def model(self):
+        if self._model is None:
+            logger.info("initializing model")
+            self._model = self._model_factory(self.data[0].shape[1])
+        return self._model
+
+    @property
+    def hash_log(self):
+        if self._hash_log is None:
+            self._hash_log = BatchedLogWriter(self.hash_log_path)
+        return self._hash_log
+
+    def get_parameters(self, config):
+        return self.model.get_weights()
+
+    def set_parameters(self, parameters):
+        self.model.set_weights(parameters)
+
+    def poison(self):
+        """Replace every layer's weights with random noise (model-poisoning experiments)."""
+        logger.warning("Injecting poisoned weights on this client...")
+        for layer in self.model.layers:
+            layer.set_weights([np.random.normal(size=w.shape) for w in layer.get_weights()])
+
+    def fit(self, parameters, config):
+        self.rounds += 1
+        logger.info(f"received training request from server, starting local round {self.rounds}")
+        X_train, X_val, y_train, y_val = self.data
+        self.set_parameters(parameters)
+
+        history = self.model.fit(
+            X_train, y_train,
+            batch_size=self.config["batch_size"],
+            epochs=self.epochs,
+            verbose=2,
+            validation_data=(X_val, y_val)
+        )
+        logger.info(f"Training completed. Final Loss: {history.history['loss'][-1]}")
+
+        if self.poison_round is not None and self.rounds == self.poison_round:
+            self.poison()
+
+        current_weights = self.get_parameters(config)
+        # Compress the upload when the server asks for it; hash what the server will reconstruct
+        upload, current_weights, fit_metrics = self.encoder.encode(current_weights, parameters, config)
+        model_hash = hash_weights(current_weights)
+
+        # Save to SSD
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+        self.hash_log.write(self.client_id, timestamp, model_hash)
+        self.metrics.round_completed(model_hash)
+        logger.info(f"Model hash: {model_hash} (saved to {self.hash_log_path})")
+
+        return upload, len(X_train), fit_metrics
+
+    def export_runtime(self, path, weights):
+        """Write weights plus this node's scaler statistics as a TensorFlow-free inference artifact."""
+        scaler_mean = scaler_scale = None
+        if "dataset_path" in self.config:
+            scaler_mean, scaler_scale = load_scaler_stats(
+                self.config["dataset_path"], self.config.get("dataset_cache_dir")
+            )
+        export_runtime(path, weights, scaler_mean, scaler_scale)
+        logger.info(f"Exported NumPy runtime model to {path}")
+
+    def export_quantized(self, path, weights):
+        """Quantize weights with this node's scaler folded in and write them as an int8 inference artifact."""
+        _, X_val, _, _ = self.data
+        scaler_mean, scaler_scale = load_scaler_stats(self.config["dataset_path"], self.config.get("dataset_cache_dir"))
+        runtime = NumpyANN(weights[0::2], weights[1::2], MODEL_ACTIVATIONS, scaler_mean, scaler_scale)
+        # The folded runtime takes raw features, so calibrate on X_val mapped back to them
+        calibration = X_val[:self.config.get("calibration_rows", 2000)] * scaler_scale + scaler_mean
+        QuantizedANN.quantize(runtime, calibration).save(path)
+        logger.info(f"Exported int8 runtime model to {path}")
+
+    def refresh_detector(self, weights):
+        """Rebuild the NumPy (float32 or int8) detector from weights and hot-swap it in."""
+        _, X_val, _, y_val = self.data
+        runtime = NumpyANN(weights[0::2], weights[1::2], MODEL_ACTIVATIONS)
+        if self.detection_backend == "int8":
+            calibration = X_val[:self.config.get("calibration_rows", 2000)]
+            quantized = QuantizedANN.quantize(runtime, calibration)
+            deltas = quantization_deltas(y_val, runtime.predict(X_val), quantized.predict(X_val))
+            logger.info(f"Re-quantized global model: accuracy {deltas['accuracy_delta']:+.4f}, "
+                        f"precision {deltas['precision_delta']:+.4f}, recall {deltas['recall_delta']:+.4f} "
+                        f"vs float32 (agreement {deltas['agreement']:.4%})")
+            runtime = quantized
+        self.detector_model.swap(runtime)
+        return self.detector_model
+
+    def detection_stream(self):
+        """Rows for the detection loop: X_val, or the flows in detection_flows_path scaled like the training data."""
+        path = self.config.get("detection_flows_path")
+        if not path:
+            return self.data[1]
+        import pandas as pd
+
+        flows = pd.read_csv(path)
+        X = flows.drop(columns=[c for c in flows.columns if c.strip() in ("Flow ID", "Label")]).values
+        X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+        scaler_mean, scaler_scale = load_scaler_stats(self.config["dataset_path"], self.config.get("dataset_cache_dir"))
+        logger.info(f"detection stream: {len(X)} flows from {path}")
+        return ((X - scaler_mean) / scaler_scale).astype(np.float32)
+
+    def evaluate(self, parameters, config):
+        logger.info("evaluating model")
+        _, X_val, _, y_val = self.data
+        self.set_parameters(parameters)
+        if self.config.get("runtime_export_path"):
+            self.export_runtime(self.config["runtime_export_path"], parameters)
+        if self.config.get("quantized_export_path"):
+            self.export_quantized(self.config["quantized_export_path"], parameters)
+        if self.detection_backend != "keras":
+            self.refresh_detector(parameters)
+        loss, accuracy, precision, recall, auc = self.model.evaluate(X_val, y_val)
+        logger.info(f"Evaluation completed. Loss: {loss}, Accuracy: {accuracy}, Precision: {precision}, Recall: {recall}, AUC: {auc}")
+        return loss, len(X_val), {"accuracy": accuracy, "precision": precision, "recall": recall, "auc": auc}
+
+
+def simulate_detection(predict_fn, X_stream, metrics, rate=None, max_batch=256, max_delay_ms=5.0):
+    """Stream samples through the micro-batching detection engine, exporting latency and alert metrics.
+
+    rate limits the offered load in flows/second (None replays as fast as the engine accepts them).
+    """
+    logger.info("Starting real-time detection loop with Prometheus metrics...")
+    detector = None
+
+    def publish(verdicts):
+        latency = detector.latency_percentiles()
+        metrics.detection_batch(len(verdicts), int(verdicts[-1].is_attack), detector.alerts, latency[50], latency[99])
+
+    detector = MicroBatchDetector(predict_fn, X_stream.shape[1], max_batch=max_batch,
+                                  max_delay_ms=max_delay_ms, on_verdicts=publish)
+    start = time.perf_counter()
+    for i, x in enumerate(X_stream):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        detector.submit(i, x)
+    detector.close()
+
+    elapsed = time.perf_counter() - start
+    latency = detector.latency_percentiles()
+    logger.info(f"Detection finished: {detector.flows_processed} flows in {elapsed:.2f}s "
+                f"({detector.flows_processed / elapsed:.0f} flows/s, {detector.batches} batches), "
+                f"p50={latency[50]:.2f} ms, p99={latency[99]:.2f} ms, alerts={detector.alerts}")
+    return detector
+
+
+def main(config_path="../config/client_config.json", overrides=None, argv=None):
+    """Run one node's Flower client as configured by its client_config.json."""
+    parser = argparse.ArgumentParser(description="Blockchain-Distributed-IDS Flower client")
+    parser.add_argument("--config", default=config_path, help="path to client_config.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    config = load_config(args.config, overrides)
+    configure_device(config.get("use_gpu", False))
+
+    metrics = PrometheusMetrics(config["metrics_port"]) if config.get("metrics_port") else ClientMetrics()
+    client = FlowerClient(config, metrics=metrics)
+
+    detection = None
+    if config.get("simulate_detection") and client.detection_backend != "keras":
+        # NumPy detectors run while the Keras model trains; each received global model is swapped in
+        predict_fn = client.refresh_detector(client.get_parameters({}))
+        detection = threading.Thread(target=simulate_detection, args=(predict_fn, client.detection_stream(), metrics),
+                                     kwargs={"rate": config.get("detection_rate")}, name="detection", daemon=True)
+        detection.start()
+
+    logger.info(f"starting flower Client {client.client_id}. connecting to server at {config['server_address']}...")
+    fl.client.start_numpy_client(server_address=config["server_address"], client=client)
+
+    if detection is not None:
+        detection.join()
+    elif config.get("simulate_detection"):
+        simulate_detection(keras_predict_fn(client.model), client.detection_stream(), metrics,
+                           rate=config.get("detection_rate"))
+    return client
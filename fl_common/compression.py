@@ -0,0 +1,178 @@
+"""
+Opt-in compression of client model uploads, shared by the Pi clients and the server.
+
+The server turns compression on per round through the fit config
+(compression_config()). Clients then upload their update as a delta to the
+global model they received, optionally sparsified to the top-k entries of
+each layer and quantized to int8 with stochastic rounding (unbiased). Top-k
+and quantization errors are kept in a per-client residual and added to the
+next round's delta (error feedback), so nothing is permanently dropped.
+
+An encoded update is always four arrays, independent of the number of layers:
+
+    indices  flat parameter positions (uint16/uint32), empty for a dense delta
+    values   delta values (int8 when quantized, float32 otherwise)
+    scales   float32 int8 scale per layer
+    counts   int32 number of values per layer
+
+Client and server rebuild the weights with the same reconstruct() call, so
+the hash a client logs for its reconstructed model matches the server's hash.
+"""
+
+import logging
+
+import numpy as np
+import flwr as fl
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_KEY = "compression"
+TOPK_RATIO_KEY = "topk_ratio"
+SCHEMES = ("delta", "delta+int8", "delta+topk", "delta+topk+int8")
+
+
+def compression_config(scheme=None, topk_ratio=0.1):
+    """Fit config entries asking clients to compress their upload (empty dict when scheme is None)."""
+    if not scheme:
+        return {}
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown compression scheme '{scheme}'. Use one of {SCHEMES}.")
+    return {COMPRESSION_KEY: scheme, TOPK_RATIO_KEY: float(topk_ratio)}
+
+
+def stochastic_quantize(values, rng):
+    """Unbiased int8 quantization: returns (int8 values, scale)."""
+    max_abs = float(np.max(np.abs(values))) if values.size else 0.0
+    if max_abs == 0.0:
+        return np.zeros(values.shape, np.int8), 1.0
+    scale = max_abs / 127.0
+    scaled = values / scale
+    quantized = np.floor(scaled + rng.random(values.shape, dtype=np.float32))
+    return np.clip(quantized, -127, 127).astype(np.int8), scale
+
+
+def dense_delta(arrays, total_size):
+    """Expand the four encoded arrays into a flat float32 delta."""
+    indices, values, scales, counts = arrays
+    if values.dtype == np.int8:
+        values = values.astype(np.float32) * np.repeat(scales.astype(np.float32), counts)
+    if indices.size == 0 and values.size == total_size:
+        return values.astype(np.float32, copy=False)
+    delta = np.zeros(total_size, np.float32)
+    delta[indices.astype(np.int64)] = values
+    return delta
+
+
+def reconstruct(arrays, global_weights):
+    """Rebuild full model weights from an encoded update and the global weights it was computed against."""
+    sizes = [g.size for g in global_weights]
+    base = np.concatenate([np.asarray(g, np.float32).ravel() for g in global_weights])
+    flat = base + dense_delta(arrays, base.size)
+    offsets = np.cumsum([0] + sizes)
+    return [flat[offsets[i]:offsets[i + 1]].reshape(g.shape).astype(g.dtype, copy=False)
+            for i, g in enumerate(global_weights)]
+
+
+class UpdateEncoder:
+    """Client-side encoder; keeps the error-feedback residual between rounds."""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.residual = None
+
+    def encode(self, weights, global_weights, config):
+        """Return (arrays to upload, weights the server will reconstruct, fit metrics)."""
+        scheme = config.get(COMPRESSION_KEY) if config else None
+        if not scheme:
+            return weights, weights, {}
+
+        sizes = [w.size for w in weights]
+        offsets = np.cumsum([0] + sizes)
+        delta = np.concatenate([(np.asarray(w, np.float32) - np.asarray(g, np.float32)).ravel()
+                                for w, g in zip(weights, global_weights)])
+        if self.residual is not None and self.residual.size == delta.size:
+            delta += self.residual
+
+        use_topk = "topk" in scheme
+        use_int8 = "int8" in scheme
+        ratio = float(config.get(TOPK_RATIO_KEY, 0.1))
+
+        index_parts, value_parts, scales, counts = [], [], [], []
+        for i in range(len(weights)):
+            segment = delta[offsets[i]:offsets[i + 1]]
+            if use_topk:
+                k = min(segment.size, max(1, int(np.ceil(ratio * segment.size))))
+                local = np.sort(np.argpartition(np.abs(segment), segment.size - k)[segment.size - k:])
+                index_parts.append(local + offsets[i])
+                segment = segment[local]
+            if use_int8:
+                segment, scale = stochastic_quantize(segment, self.rng)
+            else:
+                scale = 1.0
+            value_parts.append(segment)
+            scales.append(scale)
+            counts.append(segment.size)
+
+        index_dtype = np.uint16 if delta.size <= np.iinfo(np.uint16).max + 1 else np.uint32
+        indices = np.concatenate(index_parts).astype(index_dtype) if use_topk else np.zeros(0, index_dtype)
+        arrays = [
+            indices,
+            np.concatenate(value_parts),
+            np.asarray(scales, np.float32),
+            np.asarray(counts, np.int32),
+        ]
+
+        # Error feedback: whatever the server will not see is carried into the next round
+        self.residual = delta - dense_delta(arrays, delta.size)
+        reconstructed = reconstruct(arrays, global_weights)
+
+        encoded_bytes = int(sum(a.nbytes for a in arrays))
+        dense_bytes = int(sum(w.nbytes for w in weights))
+        metrics = {COMPRESSION_KEY: scheme, "encoded_bytes": encoded_bytes, "dense_bytes": dense_bytes}
+        return arrays, reconstructed, metrics
+
+
+def decompress_results(results, global_parameters, server_round=None):
+    """Server side: replace compressed FitRes payloads with full weights.
+
+    Returns (results, uplink_stats, failures). Results that were not compressed pass
+    through untouched; decoded ones lose their compression tag so they are never
+    decoded twice. A payload that cannot be decoded is logged and returned in
+    failures as its exception, like a Flower fit failure, instead of failing the
+    whole round.
+    """
+    global_weights = None
+    uplink_bytes = 0
+    dense_bytes = 0
+    decoded = []
+    failures = []
+    for client, fit_res in results:
+        payload = sum(len(tensor) for tensor in fit_res.parameters.tensors)
+        uplink_bytes += payload
+        scheme = fit_res.metrics.get(COMPRESSION_KEY)
+        if not scheme:
+            dense_bytes += payload
+            decoded.append((client, fit_res))
+            continue
+        try:
+            if global_parameters is None:
+                raise ValueError(f"Client {client.cid} sent a compressed update but no global model is known.")
+            if global_weights is None:
+                global_weights = fl.common.parameters_to_ndarrays(global_parameters)
+            weights = reconstruct(fl.common.parameters_to_ndarrays(fit_res.parameters), global_weights)
+        except Exception as e:
+            logger.error(f"Dropping undecodable {scheme} update from client {client.cid}: {e}")
+            failures.append(e)
+            continue
+        dense_bytes += int(sum(w.nbytes for w in weights))
+        metrics = {k: v for k, v in fit_res.metrics.items() if k != COMPRESSION_KEY}
+        decoded.append((client, fl.common.FitRes(
+            fit_res.status, fl.common.ndarrays_to_parameters(weights), fit_res.num_examples, metrics
+        )))
+
+    stats = {"uplink_bytes": uplink_bytes, "uplink_dense_bytes": dense_bytes}
+    if global_weights is not None:
+        label = f"Round {server_round}" if server_round is not None else "Update batch"
+        logger.info(f"{label} uplink: {uplink_bytes / 1024:.1f} KiB compressed vs {dense_bytes / 1024:.1f} KiB dense "
+                    f"({dense_bytes / max(1, uplink_bytes):.1f}x)")
+    return decoded, stats, failures
@@ -0,0 +1,142 @@
+"""
+Cached CICIDS2017 preprocessing for the Flower clients.
+
+The first start runs the clients' usual pipeline: read the CSV, nan_to_num,
+StandardScaler, BENIGN -> 0 / attack -> 1 labels, RandomOverSampler and a
+stratified train/validation split. The resulting arrays are written as .npy
+files (float32 features, int32 labels) under a directory keyed by the SHA-256
+of the dataset file and the preprocessing parameters. Later starts
+memory-map those files instead of re-parsing the CSV.
+
+Content hashes are remembered per (path, size, mtime), so an unchanged
+dataset is not re-hashed on every start either. The fitted scaler's mean and
+scale are stored next to the arrays for use at inference time.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+ARRAYS = ("X_train", "X_val", "y_train", "y_val")
+FINGERPRINTS = "fingerprints.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in 1 MiB chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _dataset_hash(path, cache_dir):
+    """Content hash of the dataset, reused while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    fingerprint = f"{stat.st_size}:{stat.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, FINGERPRINTS)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    entry = index.get(os.path.abspath(path))
+    if entry and entry["fingerprint"] == fingerprint:
+        return entry["sha256"]
+
+    digest = file_sha256(path)
+    index[os.path.abspath(path)] = {"fingerprint": fingerprint, "sha256": digest}
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return digest
+
+
+def preprocess(path, test_size=0.2, random_state=42, oversample=True):
+    """The clients' CSV preprocessing pipeline; returns the split arrays and scaler statistics."""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv(path)
+    X = df.iloc[:, :-1].values
+    logger.info(f"dataset shape: {X.shape}")
+    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+    scaler = StandardScaler()
+    X = scaler.fit_transform(X)
+
+    # convert multi-class labels into binary labels (Attack = 1, Benign = 0)
+    y = (df.iloc[:, -1].values != "BENIGN").astype(np.int32)
+
+    if oversample:
+        from imblearn.over_sampling import RandomOverSampler
+        ros = RandomOverSampler(sampling_strategy="auto", random_state=random_state)
+        X, y = ros.fit_resample(X, y)
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+    arrays = {
+        "X_train": X_train.astype(np.float32),
+        "X_val": X_val.astype(np.float32),
+        "y_train": y_train.astype(np.int32),
+        "y_val": y_val.astype(np.int32),
+    }
+    return arrays, {"mean": scaler.mean_, "scale": scaler.scale_}
+
+
+def cache_entry(path, cache_dir=None, test_size=0.2, random_state=42, oversample=True):
+    """Directory holding the preprocessed arrays for this dataset and parameters, built on first use."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    params = {"version": CACHE_VERSION, "test_size": test_size, "random_state": random_state, "oversample": oversample}
+    key_source = _dataset_hash(path, cache_dir) + json.dumps(params, sort_keys=True)
+    entry_dir = os.path.join(cache_dir, hashlib.sha256(key_source.encode()).hexdigest()[:32])
+    if os.path.isdir(entry_dir):
+        return entry_dir
+
+    logger.info(f"No preprocessed cache for {path}; running full preprocessing.")
+    arrays, scaler_stats = preprocess(path, test_size, random_state, oversample)
+
+    # Write to a private directory and rename it into place so readers never see a partial entry
+    tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name])
+    np.savez(os.path.join(tmp_dir, "scaler.npz"), **scaler_stats)
+    with open(os.path.join(tmp_dir, "params.json"), "w") as f:
+        json.dump({**params, "dataset": os.path.abspath(path)}, f)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another client process finished the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return entry_dir
+
+
+def load_dataset(path, cache_dir=None, **params):
+    """Return (X_train, X_val, y_train, y_val), memory-mapped from the cache."""
+    start = time.perf_counter()
+    entry_dir = cache_entry(path, cache_dir, **params)
+    X_train, X_val, y_train, y_val = (np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAYS)
+    logger.info(f"Loaded dataset from cache {entry_dir} in {time.perf_counter() - start:.2f}s "
+                f"(train {X_train.shape}, val {X_val.shape})")
+    return X_train, X_val, y_train, y_val
+
+
+def load_scaler_stats(path, cache_dir=None, **params):
+    """(mean, scale) of the StandardScaler fitted for this dataset and parameters."""
+    with np.load(os.path.join(cache_entry(path, cache_dir, **params), "scaler.npz")) as stats:
+        return stats["mean"], stats["scale"]
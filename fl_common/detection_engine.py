@@ -0,0 +1,175 @@
+"""
+Micro-batched streaming inference for the node detection loop.
+
+Flows are submitted to a bounded queue. A single worker thread takes the
+oldest flow, drains whatever else is already queued (up to max_batch) and
+runs the batch through one vectorised predict call. When the queue is empty
+it only waits for more flows if they arrive faster than a predict call takes
+(EMA of inter-arrival gap vs. EMA of call time), and never past max_delay_ms
+after the oldest flow. Under light load, or with a cheap model, each flow is
+classified immediately. Under heavy load, or with per-call overhead like
+Keras, batches grow towards max_batch. Tail latency is bounded by
+max_delay_ms plus one batch's compute time.
+
+predict_fn is any callable mapping a float32 (n, features) array to n attack
+scores: keras_predict_fn() wraps a Keras model in a compiled tf.function, and
+plain NumPy forward passes work too. HotSwapModel lets a new global model
+replace the running one without stopping the detector. Verdicts are
+delivered per batch to an optional callback; end-to-end (submit -> verdict)
+latencies are kept in a ring buffer for p50/p99 reporting.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Verdict = namedtuple("Verdict", ["flow_id", "score", "is_attack", "latency_ms"])
+
+_STOP = object()
+
+
+def keras_predict_fn(model):
+    """Compile a Keras model's forward pass once with a variable batch dimension."""
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec([None, model.input_shape[-1]], tf.float32)])
+    def infer(x):
+        return model(x, training=False)
+
+    return lambda X: infer(X).numpy().ravel()
+
+
+class HotSwapModel:
+    """predict_fn wrapper whose model can be replaced while a detector is running."""
+
+    def __init__(self, model=None):
+        self.model = model
+        self.version = 0
+
+    def swap(self, model):
+        """Serve subsequent batches from model."""
+        # A single reference assignment: in-flight batches finish on the model they started with
+        self.model = model
+        self.version += 1
+
+    def __call__(self, X):
+        model = self.model
+        return model(X)
+
+
+class MicroBatchDetector:
+    """Adaptive micro-batching detector fed from a bounded flow queue."""
+
+    def __init__(self, predict_fn, num_features, max_batch=256, max_delay_ms=5.0, threshold=0.5,
+                 on_verdicts=None, max_queue=65536, latency_window=100000):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.threshold = threshold
+        self.on_verdicts = on_verdicts
+        self.flows_processed = 0
+        self.alerts = 0
+        self.batches = 0
+        self._buffer = np.empty((max_batch, num_features), np.float32)
+        self._latencies = np.zeros(latency_window, np.float64)
+        self._latency_count = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._submitted = 0
+        self._last_submit = None
+        self._gap_ema = float("inf")
+        self._service_ema = 0.0
+        self._done = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="micro-batch-detector", daemon=True)
+        self._thread.start()
+
+    def submit(self, flow_id, features):
+        """Queue one flow's feature vector; blocks when the queue is full."""
+        now = time.perf_counter()
+        if self._last_submit is not None:
+            gap = now - self._last_submit
+            self._gap_ema = gap if self._gap_ema == float("inf") else 0.9 * self._gap_ema + 0.1 * gap
+        self._last_submit = now
+        self._submitted += 1
+        self._queue.put((flow_id, features, now))
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_delay
+        stop = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                # Waiting only pays off if another flow is expected before a predict call would finish
+                if remaining <= 0 or self._gap_ema >= self._service_ema:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            try:
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Detection batch of {len(batch)} flows failed: {e}")
+            with self._done:
+                self.flows_processed += len(batch)
+                self._done.notify_all()
+            if stop:
+                return
+
+    def _process(self, batch):
+        n = len(batch)
+        for i, (_, features, _) in enumerate(batch):
+            self._buffer[i] = features
+        start = time.perf_counter()
+        scores = np.asarray(self.predict_fn(self._buffer[:n])).ravel()[:n]
+
+        now = time.perf_counter()
+        self._service_ema = 0.9 * self._service_ema + 0.1 * (now - start) if self.batches else now - start
+        latencies = (now - np.fromiter((t for _, _, t in batch), np.float64, n)) * 1000.0
+        slots = (self._latency_count + np.arange(n)) % self._latencies.size
+        self._latencies[slots] = latencies
+        self._latency_count += n
+
+        attacks = scores >= self.threshold
+        self.alerts += int(attacks.sum())
+        self.batches += 1
+        if self.on_verdicts is not None:
+            self.on_verdicts([Verdict(flow_id, float(score), bool(is_attack), float(latency))
+                              for (flow_id, _, _), score, is_attack, latency in zip(batch, scores, attacks, latencies)])
+
+    def latency_percentiles(self, percentiles=(50, 99)):
+        """End-to-end latency percentiles (ms) over the most recent flows."""
+        filled = self._latencies[:min(self._latency_count, self._latencies.size)]
+        if filled.size == 0:
+            return {p: float("nan") for p in percentiles}
+        return dict(zip(percentiles, np.percentile(filled, percentiles).tolist()))
+
+    def flush(self, timeout=None):
+        """Block until every flow submitted so far has a verdict."""
+        with self._done:
+            return self._done.wait_for(lambda: self.flows_processed >= self._submitted, timeout)
+
+    def close(self):
+        """Finish queued flows and stop the worker thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
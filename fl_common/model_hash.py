@@ -0,0 +1,90 @@
+"""
+Zero-copy SHA-256 hashing of model weights, shared by the server and clients.
+
+hash_weights() feeds each C-contiguous layer's buffer straight into hashlib,
+so no bytes objects are materialized. The digest is identical to the previous
+hashlib.sha256(b"".join(w.tobytes() for w in weights)) and per-layer
+hasher.update(w.tobytes()) implementations, keeping existing hash logs valid.
+
+Optionally a per-layer Merkle tree (RFC 6962-style domain separation: 0x00
+leaf prefix, 0x01 node prefix, unpaired nodes promoted) lets a verifier check
+a single layer against the root with only log2(layers) sibling digests.
+"""
+
+import hashlib
+
+import numpy as np
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def _layer_buffer(weight):
+    """Memoryview over a layer in C order; only non-contiguous layers are copied."""
+    return np.ascontiguousarray(weight).data
+
+
+def hash_weights(weights):
+    """SHA-256 hex digest of the concatenated layer bytes, byte-compatible with the hash logs."""
+    hasher = hashlib.sha256()
+    for weight in weights:
+        hasher.update(_layer_buffer(weight))
+    return hasher.hexdigest()
+
+
+def layer_digest(weight):
+    """Merkle leaf digest of one layer."""
+    hasher = hashlib.sha256(LEAF_PREFIX)
+    hasher.update(_layer_buffer(weight))
+    return hasher.digest()
+
+
+def hash_weights_with_merkle(weights):
+    """Return (log-compatible hex digest, per-layer leaf digests) reading each layer once."""
+    model_hasher = hashlib.sha256()
+    leaves = []
+    for weight in weights:
+        buffer = _layer_buffer(weight)
+        model_hasher.update(buffer)
+        leaf_hasher = hashlib.sha256(LEAF_PREFIX)
+        leaf_hasher.update(buffer)
+        leaves.append(leaf_hasher.digest())
+    return model_hasher.hexdigest(), leaves
+
+
+def _parent(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_root(leaves):
+    """Merkle root (hex) over per-layer leaf digests."""
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = [_parent(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def merkle_proof(leaves, index):
+    """Sibling path for leaf index as a list of (sibling digest hex, sibling_is_left)."""
+    proof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append((level[sibling].hex(), sibling < index))
+        level = [_parent(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        index //= 2
+    return proof
+
+
+def verify_layer(weight, proof, root):
+    """Check one layer against a Merkle root without touching the other layers."""
+    node = layer_digest(weight)
+    for sibling_hex, sibling_is_left in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        node = _parent(sibling, node) if sibling_is_left else _parent(node, sibling)
+    return node.hex() == root
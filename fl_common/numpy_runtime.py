@@ -0,0 +1,116 @@
+"""
+TensorFlow-free inference runtime for the nodes' 78-64-32-1 IDS ANN.
+
+export_runtime() writes a single .npz artifact holding the Dense kernels and
+biases from model.get_weights() (Dropout has no weights and is a no-op at
+inference) plus the StandardScaler mean/scale. NumpyANN loads it with NumPy
+only:
+
+- StandardScaler is folded into the first layer
+  (W' = W / scale[:, None], b' = b - (mean / scale) @ W), so raw features go
+  straight into the first matmul;
+- every layer writes into float32 buffers preallocated for max_batch rows
+  (matmul/maximum/exp with out=), so steady-state inference allocates nothing.
+
+The module imports nothing but NumPy, so detection-only nodes can load a model
+in milliseconds without TensorFlow installed.
+"""
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ACTIVATIONS = ("relu", "sigmoid", "linear")
+
+
+def export_runtime(path, weights, scaler_mean=None, scaler_scale=None, activations=("relu", "relu", "sigmoid")):
+    """Write Dense weights (kernel, bias, kernel, bias, ...) and scaler statistics to a .npz artifact."""
+    if len(weights) != 2 * len(activations):
+        raise ValueError(f"Expected {2 * len(activations)} weight arrays for {len(activations)} Dense layers, "
+                         f"got {len(weights)}.")
+    for activation in activations:
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation '{activation}'. Use one of {ACTIVATIONS}.")
+    num_features = weights[0].shape[0]
+    arrays = {f"layer{i}_{kind}": np.asarray(w, np.float32)
+              for i in range(len(activations)) for kind, w in zip(("kernel", "bias"), weights[2 * i:2 * i + 2])}
+    np.savez(
+        path,
+        format_version=np.array(FORMAT_VERSION),
+        activations=np.array(activations),
+        scaler_mean=np.zeros(num_features, np.float32) if scaler_mean is None else np.asarray(scaler_mean, np.float32),
+        scaler_scale=np.ones(num_features, np.float32) if scaler_scale is None else np.asarray(scaler_scale, np.float32),
+        **arrays,
+    )
+
+
+def export_model(model, path, scaler_mean=None, scaler_scale=None):
+    """Export a Keras Sequential Dense model (see fl_common.client.build_model)."""
+    activations = tuple(layer.get_config()["activation"] for layer in model.layers if layer.get_weights())
+    export_runtime(path, model.get_weights(), scaler_mean, scaler_scale, activations)
+
+
+class NumpyANN:
+    """Fused float32 forward pass over preallocated buffers (one instance per thread)."""
+
+    def __init__(self, kernels, biases, activations, scaler_mean=None, scaler_scale=None, max_batch=1024,
+                 sanitize=True):
+        kernels = [np.asarray(k, np.float64) for k in kernels]
+        biases = [np.asarray(b, np.float64) for b in biases]
+        if scaler_mean is not None:
+            # Fold (x - mean) / scale into the first layer, in float64 before rounding to float32
+            scale = np.asarray(scaler_scale, np.float64)
+            scale = np.where(scale == 0, 1.0, scale)
+            biases[0] = biases[0] - (np.asarray(scaler_mean, np.float64) / scale) @ kernels[0]
+            kernels[0] = kernels[0] / scale[:, None]
+        self.kernels = [np.ascontiguousarray(k, np.float32) for k in kernels]
+        self.biases = [b.astype(np.float32) for b in biases]
+        self.activations = list(activations)
+        self.num_features = self.kernels[0].shape[0]
+        self.sanitize = sanitize
+        self.max_batch = max_batch
+        self._buffers = [np.empty((max_batch, k.shape[1]), np.float32) for k in self.kernels]
+        self._input = np.empty((max_batch, self.num_features), np.float32)
+
+    @classmethod
+    def load(cls, path, max_batch=1024, sanitize=True):
+        """Load an artifact written by export_runtime()."""
+        with np.load(path, allow_pickle=False) as artifact:
+            activations = [str(a) for a in artifact["activations"]]
+            kernels = [artifact[f"layer{i}_kernel"] for i in range(len(activations))]
+            biases = [artifact[f"layer{i}_bias"] for i in range(len(activations))]
+            return cls(kernels, biases, activations, artifact["scaler_mean"], artifact["scaler_scale"],
+                       max_batch=max_batch, sanitize=sanitize)
+
+    def _forward(self, X):
+        n = X.shape[0]
+        x = self._input[:n]
+        np.copyto(x, X, casting="unsafe")
+        if self.sanitize:
+            # Same cleaning as the training pipeline: NaN/inf features become 0 before scaling
+            np.nan_to_num(x, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+        for kernel, bias, activation, buffer in zip(self.kernels, self.biases, self.activations, self._buffers):
+            out = buffer[:n]
+            np.matmul(x, kernel, out=out)
+            out += bias
+            if activation == "relu":
+                np.maximum(out, 0.0, out=out)
+            elif activation == "sigmoid":
+                np.negative(out, out=out)
+                with np.errstate(over="ignore"):
+                    np.exp(out, out=out)
+                out += 1.0
+                np.reciprocal(out, out=out)
+            x = out
+        return x
+
+    def predict(self, X):
+        """Attack probabilities for raw (unscaled) feature rows; returns a new float32 array of shape (n,)."""
+        X = np.atleast_2d(X)
+        scores = np.empty(X.shape[0], np.float32)
+        for start in range(0, X.shape[0], self.max_batch):
+            chunk = X[start:start + self.max_batch]
+            scores[start:start + len(chunk)] = self._forward(chunk)[:, 0]
+        return scores
+
+    __call__ = predict
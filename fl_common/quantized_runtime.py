@@ -0,0 +1,200 @@
+"""
+Int8 post-training quantization of the IDS ANN for edge detection.
+
+QuantizedANN.quantize() takes a float NumpyANN and a calibration sample of
+its inputs (e.g. rows of X_val, or raw flow features when the scaler is
+folded into the first layer):
+
+- activations: symmetric int8 with one scale per input channel of every
+  layer, calibrated as the given percentile of |x[:, i]| over the sample.
+  Raw CICFlowMeter features span many orders of magnitude, so a single
+  per-layer scale would round most of them to zero;
+- weights: each input row is multiplied by its activation scale
+  (W'[i, j] = s_in[i] * W[i, j], so that q_in @ W' == x @ W), then
+  quantized to symmetric int8 with one scale per output channel
+  (max |W'[:, j]| / 127);
+- biases and the per-channel rescale s_w[j] stay float32.
+
+Each layer quantizes its input to int8, multiplies by the int8 weights with
+exact integer accumulation, then rescales, adds the bias and applies the
+activation. Only the int8 weights are resident. kernel="int32" runs NumPy's
+int8 x int8 -> int32 matmul. The default kernel="blas" dequantizes
+DEQUANTIZE_ROWS input rows of the int8 weights at a time into a small shared
+float32 scratch block and runs the integer products through float32 BLAS,
+summing the partial products of each block. That is exact because every
+partial sum stays below 2**24 for these layer widths
+(78 * 127 * 127 < 2**24), and NumPy's integer matmul is not BLAS-accelerated.
+Both kernels return identical scores.
+"""
+
+import numpy as np
+
+FORMAT_VERSION = 2
+KERNELS = ("blas", "int32")
+EXACT_FLOAT32_LIMIT = 2 ** 24
+DEQUANTIZE_ROWS = 16
+
+
+def _quantize(x, scale, out):
+    np.divide(x, scale, out=out)
+    np.rint(out, out=out)
+    np.clip(out, -127, 127, out=out)
+    return out
+
+
+class QuantizedANN:
+    """Int8 weights/activations with per-channel activation and weight scales."""
+
+    def __init__(self, weights_q, weight_scales, biases, input_scales, activations, kernel="blas",
+                 max_batch=1024, sanitize=True):
+        if kernel not in KERNELS:
+            raise ValueError(f"Unknown kernel '{kernel}'. Use one of {KERNELS}.")
+        for w in weights_q:
+            if w.shape[0] * 127 * 127 >= EXACT_FLOAT32_LIMIT and kernel == "blas":
+                raise ValueError(f"Layer with {w.shape[0]} inputs is too wide for exact float32 accumulation; "
+                                 f"use kernel='int32'.")
+        self.weights_q = [np.ascontiguousarray(w, np.int8) for w in weights_q]
+        self.weight_scales = [np.asarray(s, np.float32) for s in weight_scales]
+        self.biases = [np.asarray(b, np.float32) for b in biases]
+        self.input_scales = [np.asarray(s, np.float32) for s in input_scales]
+        self.activations = list(activations)
+        self.kernel = kernel
+        self.sanitize = sanitize
+        self.max_batch = max_batch
+        self.num_features = self.weights_q[0].shape[0]
+        if kernel == "blas":
+            # A few weight rows at a time are dequantized into this block; no float32 copy of the model is kept
+            self._scratch = np.empty((DEQUANTIZE_ROWS, max(w.shape[1] for w in self.weights_q)), np.float32)
+            self._partials = [np.empty((max_batch, w.shape[1]), np.float32) for w in self.weights_q]
+        else:
+            self._inputs = [np.empty((max_batch, w.shape[0]), np.int8) for w in self.weights_q]
+            self._accumulators = [np.empty((max_batch, w.shape[1]), np.int32) for w in self.weights_q]
+        self._staging = [np.empty((max_batch, w.shape[0]), np.float32) for w in self.weights_q]
+        self._outputs = [np.empty((max_batch, w.shape[1]), np.float32) for w in self.weights_q]
+
+    @classmethod
+    def quantize(cls, runtime, calibration, percentile=99.99, kernel="blas", max_batch=1024):
+        """Quantize a float NumpyANN, calibrating per-channel activation ranges on calibration rows."""
+        x = np.asarray(calibration, np.float32)
+        if runtime.sanitize:
+            x = np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+        weights_q, weight_scales, input_scales = [], [], []
+        for kernel_f, bias, activation in zip(runtime.kernels, runtime.biases, runtime.activations):
+            input_range = np.percentile(np.abs(x), percentile, axis=0)
+            input_scale = np.where(input_range > 0, input_range / 127.0, 1.0).astype(np.float32)
+            input_scales.append(input_scale)
+            folded = kernel_f.astype(np.float64) * input_scale[:, None]
+            channel_range = np.max(np.abs(folded), axis=0)
+            scales = np.where(channel_range > 0, channel_range / 127.0, 1.0).astype(np.float32)
+            weights_q.append(np.clip(np.rint(folded / scales), -127, 127).astype(np.int8))
+            weight_scales.append(scales)
+            x = x @ kernel_f + bias
+            if activation == "relu":
+                x = np.maximum(x, 0.0)
+        return cls(weights_q, weight_scales, runtime.biases, input_scales, runtime.activations,
+                   kernel=kernel, max_batch=max_batch, sanitize=runtime.sanitize)
+
+    @property
+    def weight_bytes(self):
+        """Resident parameter bytes: int8 weights, float32 scales and biases, and the blas kernel's scratch."""
+        parameters = sum(w.nbytes + s_w.nbytes + s_in.nbytes + b.nbytes for w, s_w, s_in, b in
+                         zip(self.weights_q, self.weight_scales, self.input_scales, self.biases))
+        return int(parameters + (self._scratch.nbytes if self.kernel == "blas" else 0))
+
+    def save(self, path):
+        """Write the quantized model as a .npz artifact."""
+        arrays = {}
+        for i, (w, s_w, s_in, b) in enumerate(zip(self.weights_q, self.weight_scales, self.input_scales,
+                                                  self.biases)):
+            arrays.update({f"layer{i}_kernel_q": w, f"layer{i}_scales": s_w, f"layer{i}_input_scales": s_in,
+                           f"layer{i}_bias": b})
+        np.savez(path, format_version=np.array(FORMAT_VERSION), activations=np.array(self.activations), **arrays)
+
+    @classmethod
+    def load(cls, path, kernel="blas", max_batch=1024, sanitize=True):
+        """Load an artifact written by save()."""
+        with np.load(path, allow_pickle=False) as artifact:
+            if int(artifact["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"{path} is a version {int(artifact['format_version'])} quantized model; "
+                                 f"expected version {FORMAT_VERSION}.")
+            activations = [str(a) for a in artifact["activations"]]
+            layers = range(len(activations))
+            return cls([artifact[f"layer{i}_kernel_q"] for i in layers],
+                       [artifact[f"layer{i}_scales"] for i in layers],
+                       [artifact[f"layer{i}_bias"] for i in layers],
+                       [artifact[f"layer{i}_input_scales"] for i in layers], activations,
+                       kernel=kernel, max_batch=max_batch, sanitize=sanitize)
+
+    def _forward(self, X):
+        n = X.shape[0]
+        x = self._staging[0][:n]
+        np.copyto(x, X, casting="unsafe")
+        if self.sanitize:
+            np.nan_to_num(x, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+        for i, (weights, bias, activation) in enumerate(zip(self.weights_q, self.biases, self.activations)):
+            q = _quantize(x, self.input_scales[i], self._staging[i][:n])
+            out = self._outputs[i][:n]
+            if self.kernel == "int32":
+                q_int = self._inputs[i][:n]
+                np.copyto(q_int, q, casting="unsafe")
+                accumulator = self._accumulators[i][:n]
+                np.matmul(q_int, weights, dtype=np.int32, out=accumulator)
+                np.copyto(out, accumulator, casting="unsafe")
+            else:
+                partial = self._partials[i][:n]
+                for row in range(0, weights.shape[0], DEQUANTIZE_ROWS):
+                    block = weights[row:row + DEQUANTIZE_ROWS]
+                    kernel = self._scratch[:block.shape[0], :block.shape[1]]
+                    np.copyto(kernel, block, casting="unsafe")
+                    if row == 0:
+                        np.matmul(q[:, :block.shape[0]], kernel, out=out)
+                    else:
+                        np.matmul(q[:, row:row + block.shape[0]], kernel, out=partial)
+                        out += partial
+            out *= self.weight_scales[i]
+            out += bias
+            if activation == "relu":
+                np.maximum(out, 0.0, out=out)
+            elif activation == "sigmoid":
+                np.negative(out, out=out)
+                with np.errstate(over="ignore"):
+                    np.exp(out, out=out)
+                out += 1.0
+                np.reciprocal(out, out=out)
+            x = out
+        return x
+
+    def predict(self, X):
+        """Attack probabilities for rows in the float model's input space; returns float32 (n,)."""
+        X = np.atleast_2d(X)
+        scores = np.empty(X.shape[0], np.float32)
+        for start in range(0, X.shape[0], self.max_batch):
+            chunk = X[start:start + self.max_batch]
+            scores[start:start + len(chunk)] = self._forward(chunk)[:, 0]
+        return scores
+
+    __call__ = predict
+
+
+def classification_report(y_true, scores, threshold=0.5):
+    """Accuracy, precision and recall of binary attack scores."""
+    y_true = np.asarray(y_true).astype(bool)
+    y_pred = np.asarray(scores) >= threshold
+    true_positives = np.sum(y_pred & y_true)
+    return {
+        "accuracy": float(np.mean(y_pred == y_true)),
+        "precision": float(true_positives / max(1, np.sum(y_pred))),
+        "recall": float(true_positives / max(1, np.sum(y_true))),
+    }
+
+
+def quantization_deltas(y_true, float_scores, quantized_scores, threshold=0.5):
+    """Int8 metrics minus float32 metrics, plus the verdict agreement between the two."""
+    reference = classification_report(y_true, float_scores, threshold)
+    quantized = classification_report(y_true, quantized_scores, threshold)
+    deltas = {f"{name}_delta": quantized[name] - reference[name] for name in reference}
+    deltas["agreement"] = float(np.mean((np.asarray(float_scores) >= threshold) ==
+                                        (np.asarray(quantized_scores) >= threshold)))
+    return {**{f"float32_{k}": v for k, v in reference.items()}, **{f"int8_{k}": v for k, v in quantized.items()},
+            **deltas}
@@ -0,0 +1,90 @@
+"""
+Benchmark model hashing on a ~10M-parameter float32 model.
+
+Compares the previous server hash (sha256 over b"".join(w.tobytes() ...)),
+the previous client hash (hasher.update(w.tobytes()) per layer) and the
+zero-copy fl_common.model_hash.hash_weights, reporting time and the peak
+extra memory allocated while hashing (tracemalloc sees NumPy/bytes buffers).
+All three digests must match.
+
+Usage:
+    python bench_model_hash.py --params 10000000 --repeats 5
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fl_common.model_hash import hash_weights, hash_weights_with_merkle, merkle_proof, merkle_root, verify_layer
+
+
+def join_tobytes(weights):
+    flat_bytes = b"".join([w.tobytes() for w in weights])
+    return hashlib.sha256(flat_bytes).hexdigest()
+
+
+def per_layer_tobytes(weights):
+    hasher = hashlib.sha256()
+    for weight in weights:
+        hasher.update(weight.tobytes())
+    return hasher.hexdigest()
+
+
+def synthetic_model(num_params, seed=42):
+    rng = np.random.default_rng(seed)
+    hidden = int(np.sqrt(num_params / 2))
+    shapes = [(78, hidden), (hidden,), (hidden, hidden), (hidden,), (hidden, hidden), (hidden,), (hidden, 1), (1,)]
+    return [rng.standard_normal(shape, dtype=np.float32) for shape in shapes]
+
+
+def measure(fn, weights, repeats):
+    fn(weights)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        digest = fn(weights)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    fn(weights)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return digest, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--params", type=int, default=10_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    weights = synthetic_model(args.params)
+    total = sum(w.size for w in weights)
+    print(f"Model: {total:,} parameters, {sum(w.nbytes for w in weights) / 2**20:.1f} MiB")
+
+    digests = set()
+    print(f"{'method':>22} {'ms':>9} {'extra MiB':>10}")
+    for name, fn in [("join(tobytes) [server]", join_tobytes),
+                     ("tobytes per layer", per_layer_tobytes),
+                     ("zero-copy", hash_weights),
+                     ("zero-copy + merkle", lambda w: hash_weights_with_merkle(w)[0])]:
+        digest, elapsed, peak = measure(fn, weights, args.repeats)
+        digests.add(digest)
+        print(f"{name:>22} {elapsed * 1000:>9.1f} {peak / 2**20:>10.2f}")
+    assert len(digests) == 1, "hash implementations disagree"
+
+    _, leaves = hash_weights_with_merkle(weights)
+    root = merkle_root(leaves)
+    proof = merkle_proof(leaves, 2)
+    start = time.perf_counter()
+    assert verify_layer(weights[2], proof, root)
+    print(f"Single-layer Merkle verification: {(time.perf_counter() - start) * 1000:.1f} ms (root {root[:16]}...)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Parity check and latency benchmark for the NumPy IDS runtime.
+
+Builds the nodes' 78-64-32-1 ANN. The reference is Keras model.predict with
+TensorFlow installed (--reference keras). Otherwise it is an unfused float64
+NumPy implementation of StandardScaler + the Dense stack. Then:
+
+- parity: the exported .npz loaded by NumpyANN must match the reference on
+  raw (unscaled, NaN/inf-containing) features to within --tolerance, with
+  identical 0.5-threshold verdicts;
+- latency: per-call time at several batch sizes;
+- startup: wall time and peak RSS of a fresh process that imports the runtime,
+  loads the artifact and classifies one flow (and, with TensorFlow, the same
+  for importing TensorFlow and loading a .keras model).
+
+Usage:
+    python bench_numpy_runtime.py --batch-sizes 1 32 256 4096
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(REPO_ROOT)
+from fl_common.numpy_runtime import NumpyANN, export_runtime
+
+NUM_FEATURES = 78
+
+STARTUP_NUMPY = """
+import resource, sys, time
+start = time.perf_counter()
+sys.path.append({root!r})
+import numpy as np
+from fl_common.numpy_runtime import NumpyANN
+model = NumpyANN.load({artifact!r})
+model.predict(np.zeros((1, {features}), np.float32))
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+STARTUP_KERAS = """
+import resource, time
+start = time.perf_counter()
+import numpy as np
+from tensorflow import keras
+model = keras.models.load_model({model_path!r})
+model.predict(np.zeros((1, {features}), np.float32), verbose=0)
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def raw_features(rows, rng):
+    X = rng.lognormal(mean=2.0, sigma=2.0, size=(rows, NUM_FEATURES)).astype(np.float32)
+    X[rng.random(X.shape) < 0.001] = np.nan
+    X[rng.random(X.shape) < 0.0005] = np.inf
+    return X
+
+
+def reference_numpy(weights, mean, scale):
+    def predict(X):
+        x = (np.nan_to_num(X.astype(np.float64), nan=0.0, posinf=0.0, neginf=0.0) - mean) / scale
+        h = np.maximum(x @ weights[0] + weights[1], 0.0)
+        h = np.maximum(h @ weights[2] + weights[3], 0.0)
+        return (1.0 / (1.0 + np.exp(-(h @ weights[4] + weights[5])))).ravel()
+    return predict
+
+
+def reference_keras(model, mean, scale):
+    def predict(X):
+        x = (np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0) - mean) / scale
+        return model.predict(x.astype(np.float32), verbose=0).ravel()
+    return predict
+
+
+def best_time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def startup(script):
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.split()
+    return float(out[-2]), int(out[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", choices=["numpy", "keras"], default="numpy")
+    parser.add_argument("--rows", type=int, default=20000, help="rows used for the parity check")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256, 4096])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    calibration = np.nan_to_num(raw_features(5000, rng), nan=0.0, posinf=0.0, neginf=0.0)
+    mean, scale = calibration.mean(axis=0), calibration.std(axis=0)
+
+    work_dir = tempfile.mkdtemp(prefix="numpy_runtime_bench_")
+    try:
+        model_path = os.path.join(work_dir, "ann.keras")
+        if args.reference == "keras":
+            from fl_common.client import build_model
+            model = build_model(NUM_FEATURES, 0.0005)
+            model.save(model_path)
+            weights = model.get_weights()
+            reference = reference_keras(model, mean, scale)
+        else:
+            sizes = [NUM_FEATURES, 64, 32, 1]
+            weights = []
+            for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+                weights += [(rng.normal(size=(fan_in, fan_out)) * np.sqrt(2.0 / fan_in)).astype(np.float32),
+                            (rng.normal(size=fan_out) * 0.1).astype(np.float32)]
+            reference = reference_numpy(weights, mean, scale)
+
+        artifact = os.path.join(work_dir, "ids_ann.npz")
+        export_runtime(artifact, weights, mean, scale)
+        runtime = NumpyANN.load(artifact, max_batch=max(args.batch_sizes))
+
+        X = raw_features(args.rows, rng)
+        expected, actual = reference(X), runtime.predict(X)
+        max_diff = float(np.max(np.abs(expected - actual)))
+        agreement = float(np.mean((expected >= 0.5) == (actual >= 0.5)))
+        print(f"Parity vs {args.reference}: max |diff| = {max_diff:.2e}, verdict agreement = {agreement:.4%} "
+              f"-> {'PASS' if max_diff <= args.tolerance and agreement == 1.0 else 'FAIL'}")
+
+        print(f"{'batch':>6} {args.reference + ' ms':>12} {'runtime ms':>11} {'speedup':>8} {'runtime flows/s':>16}")
+        for batch in args.batch_sizes:
+            sample = X[:batch]
+            ref_time = best_time(lambda: reference(sample), args.repeats)
+            run_time = best_time(lambda: runtime.predict(sample), args.repeats)
+            print(f"{batch:>6} {ref_time * 1000:>12.3f} {run_time * 1000:>11.3f} {ref_time / run_time:>7.1f}x "
+                  f"{batch / run_time:>16.0f}")
+
+        seconds, rss = startup(STARTUP_NUMPY.format(root=REPO_ROOT, artifact=artifact, features=NUM_FEATURES))
+        print(f"Cold start (NumPy runtime): {seconds:.3f}s, peak RSS {rss:.0f} MiB")
+        if args.reference == "keras":
+            seconds, rss = startup(STARTUP_KERAS.format(model_path=model_path, features=NUM_FEATURES))
+            print(f"Cold start (TensorFlow + .keras): {seconds:.3f}s, peak RSS {rss:.0f} MiB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Export a trained Keras IDS model to the TensorFlow-free NumPy runtime format.
+
+Writes kernels, biases and (optionally) the StandardScaler statistics of a
+client dataset to one .npz file that fl_common.numpy_runtime.NumpyANN loads
+without TensorFlow. Scaler statistics come from the dataset cache
+(fl_common.dataset_cache), so they match the client's training pipeline.
+
+Usage:
+    python export_numpy_runtime.py ../../flower_server/models/ann_model_server.keras ids_ann.npz \
+        --dataset /home/rtikes/ml-data/flower/data/CICIDS2017_alpha.csv
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fl_common.dataset_cache import load_scaler_stats
+from fl_common.numpy_runtime import export_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="Keras model file (.keras/.h5)")
+    parser.add_argument("output", help="runtime artifact to write (.npz)")
+    parser.add_argument("--dataset", help="CICIDS CSV whose StandardScaler statistics are folded into the model")
+    parser.add_argument("--cache-dir", help="dataset cache directory (default: .cache next to the dataset)")
+    args = parser.parse_args()
+
+    from tensorflow import keras
+    model = keras.models.load_model(args.model)
+
+    scaler_mean = scaler_scale = None
+    if args.dataset:
+        scaler_mean, scaler_scale = load_scaler_stats(args.dataset, args.cache_dir)
+    export_model(model, args.output, scaler_mean, scaler_scale)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Streaming FedAvg aggregation engine for the Flower server strategies.
+
+Each client's FitRes is decoded exactly once: the serialized .npy tensors are
+viewed in place (no np.load copy), hashed layer by layer, copied into a single
+reusable flat float32 buffer and folded into a float64 running weighted sum.
+Peak memory is therefore O(model size) regardless of how many clients report
+in a round.
+
+Strategies that filter clients measure(..., hold=True) every update first and
+accumulate() only the accepted digests, so a blocked update never touches the
+running sum. A held digest keeps a float32 copy of its decoded update until it
+is accumulated, so accepted updates are folded without decoding them again;
+that costs one model-sized float32 array per measured client during the round.
+"""
+
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+from flwr.common import Parameters
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fl_common.model_hash import hash_weights
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def _parse_npy_header(header):
+    """Parse an .npy header; client updates share a handful of layouts, so this is cached."""
+    stream = BytesIO(header)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not accepted in client updates.")
+    return shape, fortran_order, dtype
+
+
+def tensor_view(tensor):
+    """Return a read-only ndarray view over a serialized .npy tensor without copying."""
+    if tensor[6] == 1:
+        header_len = 10 + int.from_bytes(tensor[8:10], "little")
+    else:
+        header_len = 12 + int.from_bytes(tensor[8:12], "little")
+    shape, fortran_order, dtype = _parse_npy_header(bytes(tensor[:header_len]))
+
+    count = int(np.prod(shape, dtype=np.int64))
+    array = np.frombuffer(tensor, dtype=dtype, count=count, offset=header_len)
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+
+def layer_shapes(parameters: Parameters):
+    """Layer shapes of a serialized update, read from the .npy headers only."""
+    return [tensor_view(tensor).shape for tensor in parameters.tensors]
+
+
+def decode_update(parameters: Parameters, shapes, destinations, hash_layers=True):
+    """Copy a serialized update layer by layer into flat float32 destinations; return its SHA-256 hex or None.
+
+    Raises ValueError if the layer shapes differ from shapes.
+    """
+    layers = [tensor_view(tensor) for tensor in parameters.tensors]
+    if [layer.shape for layer in layers] != shapes:
+        raise ValueError(f"Update layer shapes {[layer.shape for layer in layers]} do not match {shapes}.")
+    # Hash the layers exactly as sent so digests match the existing hash logs
+    model_hash = hash_weights(layers) if hash_layers else None
+    for destination, layer in zip(destinations, layers):
+        np.copyto(destination, layer.ravel(), casting="same_kind")
+    return model_hash
+
+
+def layer_offsets(shapes):
+    """Start offset of every layer in the flat parameter vector, followed by its total size."""
+    return np.cumsum([0] + [int(np.prod(shape)) for shape in shapes])
+
+
+def stack_flat(results, hash_layers=True):
+    """Decode every client's update straight into one (clients x params) float32 matrix.
+
+    Returns (matrix, shapes, hashes); each SHA-256 is taken over the layers as sent
+    (None when hash_layers is False).
+    """
+    shapes = layer_shapes(results[0][1].parameters)
+    offsets = layer_offsets(shapes)
+    matrix = np.empty((len(results), offsets[-1]), dtype=np.float32)
+    layers = [matrix[:, offsets[j]:offsets[j + 1]] for j in range(len(shapes))]
+    hashes = [decode_update(fit_res.parameters, shapes, [layer[i] for layer in layers], hash_layers)
+              for i, (_, fit_res) in enumerate(results)]
+    return matrix, shapes, hashes
+
+
+def stack_layers(results, hash_layers=True):
+    """Per-layer (clients x layer size) views over the stack_flat() matrix; returns (stacks, shapes, hashes)."""
+    matrix, shapes, hashes = stack_flat(results, hash_layers)
+    offsets = layer_offsets(shapes)
+    return [matrix[:, offsets[j]:offsets[j + 1]] for j in range(len(shapes))], shapes, hashes
+
+
+def unflatten(flat, shapes):
+    """Split a flat parameter vector back into per-layer float32 arrays."""
+    offsets = layer_offsets(shapes)
+    return [
+        flat[offsets[i]:offsets[i + 1]].reshape(shape).astype(np.float32)
+        for i, shape in enumerate(shapes)
+    ]
+
+
+class ClientDigest:
+    """Per-client summary produced by a single streaming pass."""
+
+    def __init__(self, client_id, num_examples, norm, model_hash, update=None):
+        self.client_id = client_id
+        self.num_examples = num_examples
+        self.norm = norm
+        self.model_hash = model_hash
+        # Flat float32 copy of the decoded update, kept by measure(hold=True) for accumulate()
+        self.update = update
+
+
+class StreamingAggregator:
+    """Weighted running-sum FedAvg over serialized client updates."""
+
+    def __init__(self):
+        self.shapes = None
+        self.dtypes = None
+        self.offsets = None
+        self.buffer = None
+        self.scratch = None
+        self.weighted_sum = None
+        self._layer_views = None
+        self.total_examples = 0
+
+    def _init_layout(self, layers):
+        self.shapes = [layer.shape for layer in layers]
+        self.dtypes = [layer.dtype for layer in layers]
+        self.offsets = np.cumsum([0] + [layer.size for layer in layers])
+        self.buffer = np.empty(self.offsets[-1], dtype=np.float32)
+        self.scratch = np.empty(self.offsets[-1], dtype=np.float64)
+        self.weighted_sum = np.zeros(self.offsets[-1], dtype=np.float64)
+        self._layer_views = [self.buffer[self.offsets[i]:self.offsets[i + 1]] for i in range(len(layers))]
+
+    def decode(self, parameters: Parameters, hash_layers=True):
+        """Decode an update into the shared flat buffer and return (buffer, sha256 hex or None)."""
+        if self.shapes is None:
+            self._init_layout([tensor_view(tensor) for tensor in parameters.tensors])
+        model_hash = decode_update(parameters, self.shapes, self._layer_views, hash_layers)
+        return self.buffer, model_hash
+
+    def measure(self, client_id, parameters: Parameters, num_examples, hold=False):
+        """Decode and hash one update and return its digest without adding it to the sum.
+
+        The decoded update stays in self.buffer until the next decode; with
+        hold=True the digest also keeps a copy for a later accumulate().
+        """
+        flat, model_hash = self.decode(parameters)
+        np.copyto(self.scratch, flat)
+        norm = float(np.sqrt(np.dot(self.scratch, self.scratch)))
+        return ClientDigest(client_id, num_examples, norm, model_hash, flat.copy() if hold else None)
+
+    def _fold(self, num_examples):
+        # scratch holds the float64 copy of the update in self.buffer
+        self.scratch *= num_examples
+        self.weighted_sum += self.scratch
+        self.total_examples += num_examples
+
+    def add(self, client_id, parameters: Parameters, num_examples):
+        """Fold one client update into the running sum and return its digest."""
+        digest = self.measure(client_id, parameters, num_examples)
+        self._fold(num_examples)
+        return digest
+
+    def accumulate(self, digest):
+        """Fold an update measured with hold=True (and accepted) into the running sum and release its copy."""
+        if digest.update is None:
+            raise ValueError(f"Update from {digest.client_id} was not measured with hold=True or was already summed.")
+        np.copyto(self.scratch, digest.update)
+        digest.update = None
+        self._fold(digest.num_examples)
+
+    def result(self):
+        """Return the weighted average as per-layer ndarrays in the original dtypes."""
+        if self.total_examples <= 0:
+            return None
+        average = self.weighted_sum / self.total_examples
+        return [
+            average[self.offsets[i]:self.offsets[i + 1]].reshape(shape).astype(dtype)
+            for i, (shape, dtype) in enumerate(zip(self.shapes, self.dtypes))
+        ]
+
+
+def aggregate_fit_metrics(strategy, results):
+    """Apply the strategy's fit_metrics_aggregation_fn the same way FedAvg does."""
+    if strategy.fit_metrics_aggregation_fn:
+        return strategy.fit_metrics_aggregation_fn([(res.num_examples, res.metrics) for _, res in results])
+    return {}
+
+
+def weighted_layer_mean(stacks, shapes, num_examples):
+    """Example-weighted mean of per-layer float32 stacks, one GEMV per layer."""
+    coefficients = np.asarray(num_examples, dtype=np.float32)
+    total = coefficients.sum()
+    if total <= 0:
+        raise ValueError(f"Cannot weight {len(coefficients)} update(s) that report no training examples.")
+    coefficients /= total
+    return [(coefficients @ stack).reshape(shape) for stack, shape in zip(stacks, shapes)]
+
+
+class AsyncCheckpointer:
+    """Persist the latest global weights on a background thread, coalescing pending saves."""
+
+    def __init__(self, save_fn):
+        self.save_fn = save_fn
+        self._pending = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+
+    def submit(self, weights):
+        with self._lock:
+            self._pending = weights
+            if not self._running:
+                self._running = True
+                self._executor.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                weights, self._pending = self._pending, None
+                if weights is None:
+                    self._running = False
+                    return
+            try:
+                self.save_fn(weights)
+            except Exception as e:
+                logger.error(f"Checkpoint save failed: {e}")
+
+    def close(self):
+        """Wait for any outstanding save before shutdown."""
+        self._executor.shutdown(wait=True)
+
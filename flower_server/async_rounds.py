@@ -0,0 +1,270 @@
+"""
+Asynchronous buffered federated rounds (FedBuff-style) for slow Pi stragglers.
+
+FedBuffServer replaces Flower's synchronous round loop. Every available client
+trains continuously: as soon as one returns an update it is buffered and the
+client is immediately re-dispatched with the latest global model. Once K
+updates are buffered, a new global model version is published without
+waiting for the rest of the cohort.
+
+Updates trained on an older version are stale. Their delta is rebased onto
+the current global model and their example count is discounted by
+(1 + staleness) ** -staleness_exponent. The buffer is then handed to the
+configured strategy's aggregate_fit, so hash logging, reputation filtering
+and robust rules still apply. Fresh updates (staleness 0) are passed through
+untouched, so their logged hashes are exactly what the client sent.
+
+Compressed uploads (fl_common.compression) are decoded against the version
+each client trained on before rebasing.
+
+A client whose fit raises or returns a non-OK status is not re-dispatched at
+once: it waits retry_backoff seconds, doubling with every consecutive failure
+up to max_backoff. After max_client_failures consecutive failures it is
+dropped for the rest of the run; the run stops once every client is dropped.
+
+num_rounds in ServerConfig counts published global versions.
+"""
+
+import concurrent.futures
+import logging
+import time
+import timeit
+
+import flwr as fl
+from flwr.common import Code, FitIns
+from flwr.server.history import History
+
+from fl_common.compression import decompress_results
+
+logger = logging.getLogger(__name__)
+
+
+def staleness_weight(staleness, exponent=0.5):
+    """Polynomial staleness discount used by FedAsync/FedBuff."""
+    return (1.0 + staleness) ** -exponent
+
+
+class FedBuffServer(fl.server.Server):
+    """Flower server that aggregates every K client updates instead of every full round."""
+
+    def __init__(self, *, client_manager, strategy=None, buffer_size=3, staleness_exponent=0.5,
+                 server_learning_rate=1.0, target_accuracy=None, retry_backoff=1.0, max_backoff=60.0,
+                 max_client_failures=5):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.buffer_size = buffer_size
+        self.staleness_exponent = staleness_exponent
+        self.server_learning_rate = server_learning_rate
+        self.target_accuracy = target_accuracy
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.max_client_failures = max_client_failures
+        self.version = 0
+        self.updates_applied = 0
+        self.time_to_target = None
+        self.consecutive_failures = {}
+        self.dropped = set()
+
+    def _dispatch(self, executor, client, fit_config, timeout):
+        ins = FitIns(self.parameters, dict(fit_config))
+        base_version = self.version
+        future = executor.submit(client.fit, ins, timeout, base_version)
+        return future, (client, base_version)
+
+    def _record_failure(self, client, backoff):
+        """Count a failed fit; back the client off, or drop it after max_client_failures in a row."""
+        count = self.consecutive_failures.get(client.cid, 0) + 1
+        self.consecutive_failures[client.cid] = count
+        if count >= self.max_client_failures:
+            self.dropped.add(client.cid)
+            logger.error(f"Client {client.cid} failed {count} times in a row; dropping it from the run")
+            return
+        delay = min(self.max_backoff, self.retry_backoff * 2 ** (count - 1))
+        backoff[client.cid] = (time.monotonic() + delay, client)
+        logger.info(f"Client {client.cid}: retrying in {delay:.1f}s (failure {count}/{self.max_client_failures})")
+
+    def _rebase(self, fit_res, base_parameters, global_weights):
+        """Move a stale update's delta onto the current global model."""
+        weights = fl.common.parameters_to_ndarrays(fit_res.parameters)
+        base = fl.common.parameters_to_ndarrays(base_parameters)
+        rebased = [(g + (w - b)).astype(w.dtype) for g, w, b in zip(global_weights, weights, base)]
+        return fl.common.ndarrays_to_parameters(rebased)
+
+    def _aggregate_buffer(self, buffer, base_parameters):
+        global_weights = fl.common.parameters_to_ndarrays(self.parameters)
+        results = []
+        failures = []
+        for client, fit_res, base_version in buffer:
+            decoded, _, decode_failures = decompress_results(
+                [(client, fit_res)], base_parameters[base_version], self.version + 1
+            )
+            if decode_failures:
+                failures.extend(decode_failures)
+                continue
+            fit_res = decoded[0][1]
+            staleness = self.version - base_version
+            if staleness == 0:
+                results.append((client, fit_res))
+                continue
+            discounted = max(1, int(round(fit_res.num_examples * staleness_weight(staleness, self.staleness_exponent))))
+            rebased = self._rebase(fit_res, base_parameters[base_version], global_weights)
+            results.append((client, fl.common.FitRes(fit_res.status, rebased, discounted, fit_res.metrics)))
+            logger.info(f"Client {client.cid}: staleness={staleness}, weight {fit_res.num_examples} -> {discounted}")
+
+        if not results:
+            logger.error("No update in the buffer could be decoded; skipping this version.")
+            return None, {}
+        aggregated, metrics = self.strategy.aggregate_fit(self.version + 1, results, failures)
+        if aggregated is None:
+            return None, metrics
+
+        if self.server_learning_rate != 1.0:
+            aggregated_weights = fl.common.parameters_to_ndarrays(aggregated)
+            aggregated = fl.common.ndarrays_to_parameters([
+                (g + self.server_learning_rate * (a - g)).astype(a.dtype)
+                for g, a in zip(global_weights, aggregated_weights)
+            ])
+        return aggregated, metrics
+
+    def _evaluate_version(self, history, start_time):
+        res = self.strategy.evaluate(self.version, parameters=self.parameters)
+        if res is None:
+            return
+        loss, metrics = res
+        elapsed = timeit.default_timer() - start_time
+        history.add_loss_centralized(server_round=self.version, loss=loss)
+        history.add_metrics_centralized(server_round=self.version, metrics=metrics)
+        logger.info(f"Version {self.version}: loss={loss}, metrics={metrics}, elapsed={elapsed:.1f}s")
+        accuracy = metrics.get("accuracy")
+        if (self.target_accuracy is not None and self.time_to_target is None
+                and accuracy is not None and accuracy >= self.target_accuracy):
+            self.time_to_target = elapsed
+            logger.info(f"Reached target accuracy {self.target_accuracy} after {elapsed:.1f}s (version {self.version})")
+
+    def fit(self, num_rounds, timeout):
+        """Publish num_rounds global versions, each from the next buffer_size arriving updates."""
+        history = History()
+        self.parameters = self._get_initial_parameters(server_round=0, timeout=timeout)
+        start_time = timeit.default_timer()
+        self._evaluate_version(history, start_time)
+
+        instructions = self.strategy.configure_fit(
+            server_round=1, parameters=self.parameters, client_manager=self._client_manager
+        )
+        if not instructions:
+            logger.warning("configure_fit: no clients selected, cancel")
+            return history, 0.0
+        fit_config = instructions[0][1].config
+
+        # Global versions still referenced by in-flight clients, needed to rebase their deltas
+        base_parameters = {self.version: self.parameters}
+        in_flight = {}
+        buffer = []
+        failures = 0
+        # cid -> (monotonic retry time, client) for clients backing off after a failed fit
+        backoff = {}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        for client, _ in instructions:
+            future, task = self._dispatch(executor, client, fit_config, timeout)
+            in_flight[future] = task
+
+        while self.version < num_rounds and (in_flight or backoff):
+            wait = timeout
+            if backoff:
+                next_retry = max(0.0, min(retry_at for retry_at, _ in backoff.values()) - time.monotonic())
+                wait = next_retry if timeout is None else min(timeout, next_retry)
+            if in_flight:
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            else:
+                time.sleep(wait)
+                done = set()
+            if not done and not backoff:
+                logger.warning(f"No client update within {timeout}s; still waiting on {len(in_flight)} client(s).")
+                continue
+
+            idle = []
+            for future in done:
+                client, base_version = in_flight.pop(future)
+                try:
+                    fit_res = future.result()
+                except Exception as e:
+                    failures += 1
+                    logger.warning(f"Client {client.cid} failed: {e}")
+                    self._record_failure(client, backoff)
+                    continue
+                if fit_res.status.code != Code.OK:
+                    failures += 1
+                    logger.warning(f"Client {client.cid} returned status {fit_res.status.code}")
+                    self._record_failure(client, backoff)
+                    continue
+                self.consecutive_failures.pop(client.cid, None)
+                idle.append(client)
+                buffer.append((client, fit_res, base_version))
+
+            if len(buffer) >= self.buffer_size:
+                aggregated, metrics = self._aggregate_buffer(buffer, base_parameters)
+                self.updates_applied += len(buffer)
+                buffer = []
+                if aggregated is not None:
+                    self.version += 1
+                    self.parameters = aggregated
+                    base_parameters[self.version] = aggregated
+                    history.add_metrics_distributed_fit(server_round=self.version, metrics=metrics)
+                    elapsed = timeit.default_timer() - start_time
+                    throughput = self.updates_applied / elapsed if elapsed > 0 else 0.0
+                    logger.info(f"Published global version {self.version}: "
+                                f"{self.updates_applied} updates applied, {throughput:.2f} updates/s")
+                    self._evaluate_version(history, start_time)
+
+                    # Let the strategy see the new version (round-dependent fit config, reputation baselines)
+                    instructions = self.strategy.configure_fit(
+                        server_round=self.version + 1, parameters=self.parameters, client_manager=self._client_manager
+                    )
+                    if instructions:
+                        fit_config = instructions[0][1].config
+
+            if self.version >= num_rounds:
+                break
+
+            # Re-dispatch finished clients and clients whose backoff expired, and pick up any client
+            # that (re)joined meanwhile
+            now = time.monotonic()
+            for cid in [cid for cid, (retry_at, _) in backoff.items() if retry_at <= now]:
+                idle.append(backoff.pop(cid)[1])
+            busy = {task[0].cid for task in in_flight.values()} | set(backoff) | self.dropped
+            available = self._client_manager.all()
+            for client in idle + [c for cid, c in available.items() if cid not in busy]:
+                if client.cid in busy or client.cid not in available:
+                    continue
+                busy.add(client.cid)
+                future, task = self._dispatch(executor, client, fit_config, timeout)
+                in_flight[future] = task
+
+            referenced = {base_version for _, base_version in in_flight.values()}
+            referenced.update(base_version for _, _, base_version in buffer)
+            referenced.add(self.version)
+            for stale_version in [v for v in base_parameters if v not in referenced]:
+                del base_parameters[stale_version]
+
+        if self.version < num_rounds and not in_flight and not backoff:
+            logger.error(f"Every client was dropped after repeated failures ({sorted(self.dropped)}); "
+                         f"stopping at version {self.version} of {num_rounds}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        elapsed = timeit.default_timer() - start_time
+        throughput = self.updates_applied / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Async training finished: {self.version} versions, {self.updates_applied} updates, "
+                    f"{failures} failures, {throughput:.2f} updates/s in {elapsed:.1f}s")
+        if self.target_accuracy is not None:
+            logger.info(f"Time to target accuracy {self.target_accuracy}: {self.time_to_target}")
+        history.add_metrics_centralized(
+            server_round=self.version,
+            metrics={"updates_per_second": throughput, "time_to_target": self.time_to_target or float("nan")},
+        )
+
+        res_fed = self.evaluate_round(server_round=self.version, timeout=timeout)
+        if res_fed is not None and res_fed[0] is not None:
+            history.add_loss_distributed(server_round=self.version, loss=res_fed[0])
+            history.add_metrics_distributed(server_round=self.version, metrics=res_fed[1])
+        return history, elapsed
@@ -23,15 +23,19 @@ Flower Federated Learning Framework:
 """
 
 import os
+import sys
 import flwr as fl
-import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
 from tensorflow.keras.optimizers import Adam
 from flwr.server.strategy import FedProx
 import logging
-import hashlib
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fl_common.batched_log import BatchedLogWriter
+from fl_common.compression import compression_config, decompress_results
+from async_rounds import FedBuffServer
+from aggregation import AsyncCheckpointer, aggregate_fit_metrics, stack_layers, weighted_layer_mean
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 tf.config.set_visible_devices([], "GPU")
@@ -42,6 +46,15 @@ logger = logging.getLogger(__name__)
 MODEL_PATH = "./models/ann_model_server.keras"
 INPUT_SHAPE = 78
 HASH_LOG_PATH = "./received_model_hashes.log"
+LOG_FLUSH_INTERVAL = 1.0  # seconds between batched log writes
+# Asynchronous FedBuff-style rounds: publish a new global model every ASYNC_BUFFER_SIZE client updates
+# instead of waiting for the whole cohort; None keeps synchronous rounds
+ASYNC_BUFFER_SIZE = None
+# Client upload compression from fl_common.compression.SCHEMES (e.g. "delta+topk+int8"); None sends full weights
+COMPRESSION = None
+COMPRESSION_TOPK_RATIO = 0.1
+
+hash_log = BatchedLogWriter(HASH_LOG_PATH, flush_interval=LOG_FLUSH_INTERVAL)
 
 # Build ANN model
 def build_model():
@@ -64,13 +77,17 @@ else:
     model = build_model()
     logger.info("No saved model found. Creating new.")
 
-# Compute SHA-256 hash of model weights
-def compute_hash(weights):
-    flat_bytes = b"".join([w.tobytes() for w in weights])
-    return hashlib.sha256(flat_bytes).hexdigest()
+def save_checkpoint(weights):
+    model.set_weights(weights)
+    model.save(MODEL_PATH)
+    logger.info(f"Global model checkpoint saved to {MODEL_PATH}")
+
+checkpointer = AsyncCheckpointer(save_checkpoint)
 
 # Custom FedProx Strategy with hash logging
 class FedProxStrategy(FedProx):
+    global_parameters = None
+
     def configure_fit(self, server_round, parameters, client_manager):
         available_clients = client_manager.num_available()
         logger.info(f"{available_clients} clients available. Selecting for training.")
@@ -82,8 +99,12 @@ class FedProxStrategy(FedProx):
             logger.warning("No clients available for training.")
             return None
 
+        # Compressed uploads are deltas against this round's global model
+        self.global_parameters = parameters
+        fit_config = compression_config(COMPRESSION, COMPRESSION_TOPK_RATIO)
+
         logger.info(f"Requesting training from {len(clients)} clients.")
-        return [(client, fl.common.FitIns(parameters, {})) for client in clients]
+        return [(client, fl.common.FitIns(parameters, dict(fit_config))) for client in clients]
 
     def aggregate_fit(self, server_round, results, failures):
         logger.info(f"Aggregating results for round {server_round}")
@@ -96,36 +117,58 @@ class FedProxStrategy(FedProx):
             return None, {}
 
         try:
-            client_weights = [fl.common.parameters_to_ndarrays(res.parameters) for _, res in results]
-
-            for idx, weights in enumerate(client_weights):
-                if weights[0].shape[0] != INPUT_SHAPE:
-                    logger.error(f"Client {idx+1} sent incorrect feature shape: {weights[0].shape}. Expected {INPUT_SHAPE}.")
+            results, uplink_stats, decode_failures = decompress_results(results, self.global_parameters, server_round)
+            if decode_failures:
+                logger.warning(f"{len(decode_failures)} update(s) could not be decoded and count as failures.")
+                if not self.accept_failures:
                     return None, {}
+            if not results:
+                logger.error("No decodable results received for aggregation.")
+                return None, {}
+
+            # Decode every update once into contiguous per-layer float32 stacks
+            stacks, shapes, hashes = stack_layers(results)
+
+            if shapes[0][0] != INPUT_SHAPE:
+                logger.error(f"Clients sent incorrect feature shape: {shapes[0]}. Expected {INPUT_SHAPE}.")
+                return None, {}
 
             # Log SHA-256 hashes of received client models
-            with open(HASH_LOG_PATH, "a") as f:
-                for idx, weights in enumerate(client_weights):
-                    client_id = results[idx][0].cid
-                    model_hash = compute_hash(weights)
-                    logger.info(f"Received model update from {client_id} with SHA-256 hash: {model_hash}")
-                    f.write(f"{client_id},{server_round},{model_hash}\n")
-
-            # Aggregate using FedAvg (or FedProx logic)
-            aggregated_weights = np.mean(np.array(client_weights, dtype=object), axis=0)
-            model.set_weights(aggregated_weights)
-            model.save(MODEL_PATH)
-            logger.info("Model aggregated and saved.")
-
-            return fl.common.ndarrays_to_parameters(aggregated_weights), {}
+            for (client, _), model_hash in zip(results, hashes):
+                client_id = client.cid
+                logger.info(f"Received model update from {client_id} with SHA-256 hash: {model_hash}")
+                hash_log.write(client_id, server_round, model_hash)
+
+            # Example-weighted FedAvg (the proximal term only affects client-side training)
+            num_examples = [res.num_examples for _, res in results]
+            aggregated_weights = weighted_layer_mean(stacks, shapes, num_examples)
+
+            # Checkpoint off the gRPC thread so the round returns as soon as the reduction is done
+            checkpointer.submit(aggregated_weights)
+            logger.info("Model aggregated; checkpoint queued.")
+
+            metrics = {**aggregate_fit_metrics(self, results), **uplink_stats}
+            return fl.common.ndarrays_to_parameters(aggregated_weights), metrics
         except Exception as e:
             logger.error(f"Aggregation error: {e}")
             return None, {}
 
 logger.info("Starting Flower Server...")
-fl.server.start_server(
-    server_address="0.0.0.0:9091",
-    config=fl.server.ServerConfig(num_rounds=10, round_timeout=300),
-    strategy=FedProxStrategy(proximal_mu=0.1),
-)
+strategy = FedProxStrategy(proximal_mu=0.1)
+if ASYNC_BUFFER_SIZE:
+    logger.info(f"Using asynchronous buffered rounds (buffer size {ASYNC_BUFFER_SIZE})")
+    fl.server.start_server(
+        server_address="0.0.0.0:9091",
+        server=FedBuffServer(
+            client_manager=fl.server.SimpleClientManager(), strategy=strategy, buffer_size=ASYNC_BUFFER_SIZE
+        ),
+        config=fl.server.ServerConfig(num_rounds=10, round_timeout=300),
+    )
+else:
+    fl.server.start_server(
+        server_address="0.0.0.0:9091",
+        config=fl.server.ServerConfig(num_rounds=10, round_timeout=300),
+        strategy=strategy,
+    )
+checkpointer.close()
 
@@ -23,6 +23,8 @@ Flower Federated Learning Framework:
 """
 
 import os
+import sys
+import time
 import flwr as fl
 import numpy as np
 import tensorflow as tf
@@ -30,7 +32,13 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
 from tensorflow.keras.optimizers import Adam
 import logging
-import hashlib
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fl_common.batched_log import BatchedLogWriter
+from fl_common.compression import compression_config, decompress_results
+from async_rounds import FedBuffServer
+from aggregation import StreamingAggregator, aggregate_fit_metrics, tensor_view
+from reputation_store import ReputationStateStore
+from robust_aggregation import RobustFedAvg
 
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 tf.config.set_visible_devices([], "GPU")
@@ -40,9 +48,21 @@ logger = logging.getLogger(__name__)
 
 MODEL_PATH = "./models/ann_model_server.keras"
 HASH_LOG_PATH = "./received_model_hashes.log"
+LOG_FLUSH_INTERVAL = 1.0  # seconds between batched log writes
+# Asynchronous FedBuff-style rounds: publish a new global model every ASYNC_BUFFER_SIZE client updates
+# instead of waiting for the whole cohort; None keeps synchronous rounds
+ASYNC_BUFFER_SIZE = None
+# Client upload compression from fl_common.compression.SCHEMES (e.g. "delta+topk+int8"); None sends full weights.
+# Applies to the reputation-scoring strategy.
+COMPRESSION = None
+COMPRESSION_TOPK_RATIO = 0.1
 INPUT_SHAPE = 78
 
 USE_REPUTATION_SCORING = True
+# Robust aggregation rule from robust_aggregation.AGGREGATORS ("median", "trimmed_mean", "krum",
+# "geometric_median"); None keeps the strategy selected by USE_REPUTATION_SCORING
+ROBUST_AGGREGATOR = None
+ROBUST_AGGREGATOR_KWARGS = {}
 
 MIN_CLIENTS = 3
 MIN_FIT_CLIENTS = 3 
@@ -68,27 +88,28 @@ else:
     model = build_model()
     logger.info("No saved model found. Created new model.")
 
-def compute_hash(weights):
-    flat_bytes = b"".join([w.tobytes() for w in weights])
-    return hashlib.sha256(flat_bytes).hexdigest()
+hash_log = BatchedLogWriter(HASH_LOG_PATH, flush_interval=LOG_FLUSH_INTERVAL)
 
 # Simple FedAvg Strategy with hash logging only
 class FedAvgWithHashLogging(fl.server.strategy.FedAvg):
     def aggregate_fit(self, server_round, results, failures):
-        # First, do the standard FedAvg aggregation
-        aggregated_parameters, metrics = super().aggregate_fit(server_round, results, failures)
-        
-        if results and aggregated_parameters:
-            # Log SHA-256 hashes of received model updates
-            with open(HASH_LOG_PATH, "a") as f:
-                for client, fit_res in results:
-                    client_id = client.cid
-                    weights = fl.common.parameters_to_ndarrays(fit_res.parameters)
-                    model_hash = compute_hash(weights)
-                    logger.info(f"Received model update from {client_id} with SHA-256 hash: {model_hash}")
-                    f.write(f"{client_id},{server_round},{model_hash}\n")
-        
-        return aggregated_parameters, metrics
+        if not results:
+            return None, {}
+        if not self.accept_failures and failures:
+            return None, {}
+
+        # Single streaming pass: hash each update while folding it into the FedAvg sum
+        aggregator = StreamingAggregator()
+        for client, fit_res in results:
+            digest = aggregator.add(client.cid, fit_res.parameters, fit_res.num_examples)
+            logger.info(f"Received model update from {client.cid} with SHA-256 hash: {digest.model_hash}")
+            hash_log.write(client.cid, server_round, digest.model_hash)
+
+        aggregated_weights = aggregator.result()
+        if aggregated_weights is None:
+            return None, {}
+        return fl.common.ndarrays_to_parameters(aggregated_weights), aggregate_fit_metrics(self, results)
+
 # Custom FedAvg Strategy with reputation scoring and hash logging (for E6-R)
 class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
     def __init__(self, *args, **kwargs):
@@ -103,17 +124,24 @@ class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
         self.norm_threshold = 50.0  #threshold based on clean model norms
         self.outlier_factor = 2.5   # 2.5x the average to be considered suspicious
         self.reputation_log_path = "./reputation_scores.log"
+        # Sketch/similarity state carried across rounds and restarts
+        self.sybil_threshold = 0.99  # EMA cosine similarity above which clients are treated as colluding
+        self.sybil_min_observations = 3  # rounds a pair must be measured in before it can be blocked
+        self.norm_min_observations = 3  # accepted rounds before a client's norm is judged against its own history
+        self.norm_outlier_std = 4.0  # standard deviations above a client's running mean norm to be suspicious
+        self.state_store = ReputationStateStore(path="./reputation_state.npz")
+        self.reputation.update(self.state_store.reputation)
+        self.state_store.reputation = self.reputation
+        self.global_flat = None
+        self.global_parameters = None
         
         # Initialize reputation log
-        with open(self.reputation_log_path, "w") as f:
-            f.write("round,client_id,reputation_score,timestamp,reason\n")
-    
-    def compute_update_norm(self, weights):
-        """Compute L2 norm of model weights"""
-        total_norm = 0.0
-        for w in weights:
-            total_norm += np.linalg.norm(w.flatten()) ** 2
-        return np.sqrt(total_norm)
+        self.reputation_log = BatchedLogWriter(
+            self.reputation_log_path,
+            header=["round", "client_id", "reputation_score", "timestamp", "reason"],
+            mode="w",
+            flush_interval=LOG_FLUSH_INTERVAL,
+        )
     
     def update_reputation(self, client_id, is_suspicious, reason=""):
         if client_id not in self.reputation:
@@ -132,10 +160,17 @@ class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
     
     def log_reputation(self, server_round, client_id, reason=""):
         """Log reputation changes to file"""
-        import time
-        timestamp = time.time()
-        with open(self.reputation_log_path, "a") as f:
-            f.write(f"{server_round},{client_id},{self.reputation[client_id]:.3f},{timestamp},{reason}\n")
+        self.reputation_log.write(server_round, client_id, f"{self.reputation[client_id]:.3f}", time.time(), reason)
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        # Remember the global model so client sketches are taken over their update deltas
+        self.global_flat = np.concatenate([tensor_view(t).ravel() for t in parameters.tensors]).astype(np.float32)
+        self.global_parameters = parameters
+        instructions = super().configure_fit(server_round, parameters, client_manager)
+        fit_config = compression_config(COMPRESSION, COMPRESSION_TOPK_RATIO)
+        for _, fit_ins in instructions:
+            fit_ins.config.update(fit_config)
+        return instructions
 
     def aggregate_fit(self, server_round, results, failures):
         logger.info(f"=== REPUTATION-BASED AGGREGATION - Round {server_round} ===")
@@ -148,28 +183,44 @@ class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
             return None, {}
 
         try:
-            # Extract client weights and analyze each update
-            client_weights = []
-            client_norms = []
-            client_ids = []
-            
+            results, uplink_stats, decode_failures = decompress_results(results, self.global_parameters, server_round)
+            if decode_failures:
+                logger.warning(f"{len(decode_failures)} update(s) could not be decoded and count as failures.")
+                if not self.accept_failures:
+                    return None, {}
+            if not results:
+                logger.error("No decodable results received for aggregation.")
+                return None, {}
+
+            # Decode, hash and measure every update once, holding a copy; only accepted ones are summed below
+            aggregator = StreamingAggregator()
+            digests = []
+            self.state_store.begin_round()
+
             for client, fit_res in results:
-                weights = fl.common.parameters_to_ndarrays(fit_res.parameters)
-                client_weights.append(weights)
-                client_ids.append(client.cid)
-                
-                # Compute update norm for anomaly detection
-                update_norm = self.compute_update_norm(weights)
-                client_norms.append(update_norm)
-                
-                logger.info(f"Client {client.cid}: Update norm = {update_norm:.4f}")
-            
-            # Ultra-simple approach: Find the obvious outlier
+                digest = aggregator.measure(client.cid, fit_res.parameters, fit_res.num_examples, hold=True)
+                digests.append(digest)
+                logger.info(f"Client {client.cid}: Update norm = {digest.norm:.4f}")
+
+                # Sketch the update while it is still in the shared decode buffer
+                update = aggregator.buffer
+                if self.global_flat is not None and self.global_flat.size == update.size:
+                    update = update - self.global_flat
+                self.state_store.observe(client.cid, update)
+
+            client_ids = [digest.client_id for digest in digests]
+            client_norms = [digest.norm for digest in digests]
+
+            # Clients with enough history are judged against their own running norm mean/variance
+            norm_limits = [self.state_store.norm_limit(client_id, self.norm_min_observations, self.norm_outlier_std,
+                                                       self.outlier_factor) for client_id in client_ids]
+
+            # Ultra-simple approach for the rest: Find the obvious outlier
             min_norm = min(client_norms)
             max_norm = max(client_norms)
-            
+
             logger.info(f"Update norms - Min: {min_norm:.1f}, Max: {max_norm:.1f}")
-            
+
             # If max is more than 5x the min, it's obviously suspicious
             if max_norm > min_norm * 5.0:
                 outlier_threshold = min_norm * 5.0
@@ -177,58 +228,83 @@ class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
             else:
                 outlier_threshold = float('inf')  # No outliers
                 logger.info("No clear outliers detected")
-            
+            thresholds = [outlier_threshold if limit is None else limit for limit in norm_limits]
+
+            # Sybil/collusion check: near-identical sketches keep only one representative per group
+            self.state_store.update_similarities()
+            sybil_reasons = {}
+            for group in self.state_store.colluding_groups(self.sybil_threshold, clients=set(client_ids),
+                                                           min_observations=self.sybil_min_observations):
+                logger.warning(f"Colluding clients detected: {group}")
+                for client_id in group[1:]:
+                    sybil_reasons[client_id] = f"sybil_cluster_with_{group[0]}"
+
             # DETECTION & PREVENTION: Filter out extreme outliers
-            filtered_results = []
-            filtered_client_ids = []
-            
+            blocked = {i for i, (client_id, norm) in enumerate(zip(client_ids, client_norms))
+                       if norm > thresholds[i] or client_id in sybil_reasons}
+            accepted_results = [res for i, res in enumerate(results) if i not in blocked]
+
             for i, (client_id, norm) in enumerate(zip(client_ids, client_norms)):
-                is_suspicious = norm > outlier_threshold
-                
+                is_suspicious = i in blocked
+
                 if is_suspicious:
-                    reason = f"extreme_outlier_{norm:.1f}_vs_{min_norm:.1f}"
+                    if norm > thresholds[i] and norm_limits[i] is not None:
+                        reason = f"norm_outlier_{norm:.1f}_above_history_{thresholds[i]:.1f}"
+                    elif norm > thresholds[i]:
+                        reason = f"extreme_outlier_{norm:.1f}_vs_{min_norm:.1f}"
+                    else:
+                        reason = sybil_reasons[client_id]
                     logger.warning(f"BLOCKED: Client {client_id} norm={norm:.1f} - EXCLUDED from aggregation")
-                    # Update reputation but DON'T include in aggregation
-                    self.update_reputation(client_id, is_suspicious, reason)
-                    self.log_reputation(server_round, client_id, reason)
                 else:
                     reason = ""
                     logger.info(f"ACCEPTED: Client {client_id} norm={norm:.1f}")
-                    # Include in aggregation
-                    filtered_results.append(results[i])
-                    filtered_client_ids.append(client_id)
-                    self.update_reputation(client_id, is_suspicious, reason)
-                    self.log_reputation(server_round, client_id, reason)
-            
+                self.update_reputation(client_id, is_suspicious, reason)
+                self.log_reputation(server_round, client_id, reason)
+                # Outlying norms are kept out of the history they are judged against
+                if norm <= thresholds[i]:
+                    self.state_store.record_norm(client_id, norm)
+
             # Check if we have any clean clients left after filtering
-            if not filtered_results:
+            if not accepted_results:
                 logger.error("ALL CLIENTS BLOCKED! Falling back to standard aggregation")
                 # Fallback to prevent system failure
-                return super().aggregate_fit(server_round, results, failures)
-            
-            logger.info(f"PREVENTION: Using {len(filtered_results)}/{len(results)} clients after filtering")
-            
+                accepted_results = results
+                blocked = set()
+
+            # Sum only the accepted updates, from the copies held since measuring them
+            for i, digest in enumerate(digests):
+                if i not in blocked:
+                    aggregator.accumulate(digest)
+
+            logger.info(f"PREVENTION: Using {len(accepted_results)}/{len(results)} clients after filtering")
+
             # Log current reputation state
             logger.info("Current reputation scores:")
             for client_id in client_ids:
                 rep_score = self.reputation[client_id]
                 logger.info(f"  {client_id}: {rep_score:.3f}")
-            
-            # Use ONLY clean clients for standard FedAvg aggregation
+
+            # Use ONLY clean clients for the FedAvg result
             logger.info("Performing clean-client-only aggregation...")
-            aggregated_weights = super().aggregate_fit(server_round, filtered_results, failures)
-            
+            aggregated_ndarrays = aggregator.result()
+            if aggregated_ndarrays is None:
+                return None, {}
+            aggregated_weights = (
+                fl.common.ndarrays_to_parameters(aggregated_ndarrays),
+                {**aggregate_fit_metrics(self, accepted_results), **uplink_stats},
+            )
+
             # Log hashes for ALL clients (including blocked ones)
-            with open(HASH_LOG_PATH, "a") as f:
-                for client_id, weights in zip(client_ids, client_weights):
-                    model_hash = compute_hash(weights)
-                    rep_score = self.reputation[client_id]
-                    status = "BLOCKED" if client_id not in filtered_client_ids else "ACCEPTED"
-                    logger.info(f"Client {client_id}: hash={model_hash}, reputation={rep_score:.3f}, status={status}")
-                    f.write(f"{client_id},{server_round},{model_hash},{rep_score:.3f},{status}\n")
-            
+            for i, digest in enumerate(digests):
+                rep_score = self.reputation[digest.client_id]
+                status = "BLOCKED" if i in blocked else "ACCEPTED"
+                logger.info(f"Client {digest.client_id}: hash={digest.model_hash}, reputation={rep_score:.3f}, status={status}")
+                hash_log.write(digest.client_id, server_round, digest.model_hash, f"{rep_score:.3f}", status)
+
+            self.state_store.save()
+
             return aggregated_weights
-            
+
         except Exception as e:
             logger.error(f" reputation-based aggregation error: {e}")
             import traceback
@@ -236,7 +312,21 @@ class FedAvgWithReputationScoring(fl.server.strategy.FedAvg):
             return None, {}
 
 # Select strategy based on configuration
-if USE_REPUTATION_SCORING:
+if ROBUST_AGGREGATOR:
+    logger.info(f" starting Flower Server with robust aggregation ({ROBUST_AGGREGATOR})...")
+    strategy = RobustFedAvg(
+        aggregator=ROBUST_AGGREGATOR,
+        aggregator_kwargs=ROBUST_AGGREGATOR_KWARGS,
+        hash_log=hash_log,
+        compression=COMPRESSION,
+        compression_topk_ratio=COMPRESSION_TOPK_RATIO,
+        min_available_clients=3,
+        min_fit_clients=3,
+        min_evaluate_clients=3,
+        fraction_fit=1.0,
+        fraction_evaluate=1.0,
+    )
+elif USE_REPUTATION_SCORING:
     logger.info(" starting Flower Server with Reputation Scoring...")
     strategy = FedAvgWithReputationScoring(
         min_available_clients=3,
@@ -255,9 +345,19 @@ else:
         fraction_evaluate=1.0,
     )
 
-fl.server.start_server(
-    server_address="0.0.0.0:9091",
-    config=fl.server.ServerConfig(num_rounds=1, round_timeout=300),
-    strategy=strategy,
-)
+if ASYNC_BUFFER_SIZE:
+    logger.info(f"Using asynchronous buffered rounds (buffer size {ASYNC_BUFFER_SIZE})")
+    fl.server.start_server(
+        server_address="0.0.0.0:9091",
+        server=FedBuffServer(
+            client_manager=fl.server.SimpleClientManager(), strategy=strategy, buffer_size=ASYNC_BUFFER_SIZE
+        ),
+        config=fl.server.ServerConfig(num_rounds=1, round_timeout=300),
+    )
+else:
+    fl.server.start_server(
+        server_address="0.0.0.0:9091",
+        config=fl.server.ServerConfig(num_rounds=1, round_timeout=300),
+        strategy=strategy,
+    )
 
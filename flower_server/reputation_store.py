@@ -0,0 +1,269 @@
+"""
+Persistent per-client state for reputation scoring across rounds.
+
+Each client's latest update (delta to the global model) is compressed to a
+sparse random-projection (CountSketch) sketch of a few hundred dimensions. Norm statistics
+(Welford running mean/variance) and pairwise cosine similarities are updated
+incrementally every round, so Sybil/colluder clustering works on n sketches
+of size k instead of n^2 full-model comparisons, and a client's norm is judged
+against its own history instead of the other clients of the same round:
+
+- candidate pairs come from sign-bit LSH bands over the sketches (O(n*k)),
+- only candidate pairs get an exact sketch cosine and an EMA update,
+- a pair whose EMA similarity stays above the threshold over at least
+  min_observations measured rounds is reported as colluding (the
+  exp-20250826-sybil-e9 collusion scenario).
+
+Rounds are numbered by the store itself (begin_round()), not by Flower's
+server_round: the server runs one round per process, so server_round is 1
+after every restart. The counter is part of the snapshot, so sketches loaded
+from an earlier round are never compared with this round's updates.
+
+The whole store, reputation scores included, is saved as a compact .npz
+snapshot (float16 sketches) so it survives a server restart. Snapshots carry
+FORMAT_VERSION; one written in another format is refused rather than guessed at.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+class ClientState:
+    """Latest sketch, running norm statistics and last seen store round of one client."""
+
+    def __init__(self, sketch=None, norm_count=0, norm_mean=0.0, norm_m2=0.0, last_round=0):
+        self.sketch = sketch
+        self.norm_count = norm_count
+        self.norm_mean = norm_mean
+        self.norm_m2 = norm_m2
+        self.last_round = last_round
+
+    @property
+    def norm_std(self):
+        if self.norm_count < 2:
+            return 0.0
+        return float(np.sqrt(self.norm_m2 / (self.norm_count - 1)))
+
+    def update_norm(self, norm):
+        # Welford's online mean/variance
+        self.norm_count += 1
+        delta = norm - self.norm_mean
+        self.norm_mean += delta / self.norm_count
+        self.norm_m2 += delta * (norm - self.norm_mean)
+
+
+class ReputationStateStore:
+    """Incremental sketch/similarity store for per-client reputation state."""
+
+    def __init__(self, path=None, sketch_dim=256, seed=0, bands=4, band_bits=8, similarity_decay=0.5,
+                 prune_below=0.5):
+        self.path = path
+        self.sketch_dim = sketch_dim
+        self.seed = seed
+        self.bands = bands
+        self.band_bits = min(band_bits, sketch_dim // max(1, bands))
+        self.similarity_decay = similarity_decay
+        self.prune_below = prune_below
+        self.model_dim = None
+        self._buckets = None
+        self._signs = None
+        self.round = 0
+        self.clients = {}
+        self.pair_similarity = {}
+        self.pair_observations = {}
+        self.reputation = {}
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _projection(self, model_dim):
+        if self.model_dim not in (None, model_dim):
+            logger.warning(f"Model size changed from {self.model_dim} to {model_dim}; resetting client sketches.")
+            self.clients = {}
+            self.pair_similarity = {}
+            self.pair_observations = {}
+            self._buckets = None
+        if self._buckets is None:
+            # Regenerated from the seed, so it never has to be stored on disk. Each parameter maps to one
+            # bucket with a random sign, which preserves inner products in expectation with O(d) memory.
+            rng = np.random.default_rng(self.seed)
+            self._buckets = rng.integers(0, self.sketch_dim, size=model_dim, dtype=np.int32)
+            self._signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=model_dim)
+            self.model_dim = model_dim
+        return self._buckets, self._signs
+
+    def sketch(self, flat_update):
+        """Project a flat update onto the sketch space."""
+        buckets, signs = self._projection(flat_update.size)
+        return np.bincount(buckets, weights=signs * flat_update, minlength=self.sketch_dim).astype(np.float32)
+
+    def begin_round(self):
+        """Start a new store round; updates observed from now on are compared with each other only."""
+        self.round += 1
+        return self.round
+
+    def observe(self, client_id, flat_update):
+        """Record one client's update for the current round by sketching it."""
+        state = self.clients.setdefault(client_id, ClientState())
+        state.sketch = self.sketch(flat_update)
+        state.last_round = self.round
+        return state
+
+    def norm_limit(self, client_id, min_observations=3, num_std=4.0, min_factor=2.5):
+        """Largest norm consistent with a client's own history, or None while it has too few observations.
+
+        A norm is only out of line if it is num_std standard deviations above the client's running mean and
+        also min_factor times that mean, so the natural drift of a steady client is not flagged.
+        """
+        state = self.clients.get(client_id)
+        if state is None or state.norm_count < min_observations:
+            return None
+        return max(state.norm_mean + num_std * state.norm_std, min_factor * state.norm_mean)
+
+    def record_norm(self, client_id, norm):
+        """Fold an accepted update's norm into the client's running statistics."""
+        self.clients.setdefault(client_id, ClientState()).update_norm(float(norm))
+
+    def _candidate_pairs(self, client_ids, unit_sketches):
+        # Sign-bit LSH: each band hashes band_bits sketch coordinates into one bucket key
+        weights = 1 << np.arange(self.band_bits, dtype=np.int64)
+        candidates = set()
+        for band in range(self.bands):
+            bits = unit_sketches[:, band * self.band_bits:(band + 1) * self.band_bits] > 0
+            keys = bits.astype(np.int64) @ weights
+            order = np.argsort(keys, kind="stable")
+            boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                for i_pos, i in enumerate(bucket):
+                    for j in bucket[i_pos + 1:]:
+                        candidates.add((min(i, j), max(i, j)))
+        return candidates
+
+    def update_similarities(self):
+        """Refresh the EMA cosine similarity of LSH-candidate pairs among this round's clients."""
+        client_ids = sorted(cid for cid, state in self.clients.items()
+                            if state.last_round == self.round and state.sketch is not None)
+        if len(client_ids) < 2:
+            return {}
+
+        sketches = np.stack([self.clients[cid].sketch for cid in client_ids]).astype(np.float32)
+        norms = np.linalg.norm(sketches, axis=1, keepdims=True)
+        unit_sketches = sketches / np.maximum(norms, 1e-12)
+
+        updated = {}
+        for i, j in self._candidate_pairs(client_ids, unit_sketches):
+            cosine = float(unit_sketches[i] @ unit_sketches[j])
+            key = (client_ids[i], client_ids[j])
+            previous = self.pair_similarity.get(key)
+            if previous is None:
+                ema = cosine
+            else:
+                ema = self.similarity_decay * previous + (1.0 - self.similarity_decay) * cosine
+            self.pair_similarity[key] = ema
+            self.pair_observations[key] = self.pair_observations.get(key, 0) + 1
+            updated[key] = ema
+
+        # Pairs that both reported but no longer share a bucket decay towards zero; weak pairs are dropped
+        active = set(client_ids)
+        for key in list(self.pair_similarity):
+            if key not in updated and key[0] in active and key[1] in active:
+                self.pair_similarity[key] *= self.similarity_decay
+            if self.pair_similarity[key] < self.prune_below:
+                del self.pair_similarity[key]
+                self.pair_observations.pop(key, None)
+        return updated
+
+    def colluding_groups(self, threshold=0.99, clients=None, min_observations=1):
+        """Connected groups of clients whose EMA similarity is at or above threshold.
+
+        Only pairs whose cosine was measured in at least min_observations rounds are considered.
+        """
+        parent = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for (a, b), similarity in self.pair_similarity.items():
+            if similarity < threshold or self.pair_observations.get((a, b), 0) < min_observations:
+                continue
+            if clients is not None and (a not in clients or b not in clients):
+                continue
+            parent[find(a)] = find(b)
+
+        groups = {}
+        for client_id in parent:
+            groups.setdefault(find(client_id), set()).add(client_id)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+    def save(self, path=None):
+        """Write a compact .npz snapshot atomically."""
+        path = path or self.path
+        if not path:
+            return
+        client_ids = sorted(self.clients)
+        sketch_dim = self.sketch_dim
+        sketches = np.stack([
+            self.clients[cid].sketch if self.clients[cid].sketch is not None else np.zeros(sketch_dim, np.float32)
+            for cid in client_ids
+        ]).astype(np.float16) if client_ids else np.zeros((0, sketch_dim), np.float16)
+        last_rounds = np.array([self.clients[cid].last_round for cid in client_ids], dtype=np.int64)
+        norm_stats = np.array([[self.clients[cid].norm_count, self.clients[cid].norm_mean, self.clients[cid].norm_m2]
+                               for cid in client_ids], dtype=np.float64).reshape(-1, 3)
+        pairs = sorted(self.pair_similarity)
+        reputation_ids = sorted(self.reputation)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                format_version=np.array(FORMAT_VERSION),
+                meta=np.array([sketch_dim, self.seed, self.model_dim or 0, self.round], dtype=np.int64),
+                client_ids=np.array(client_ids, dtype=str),
+                sketches=sketches,
+                last_rounds=last_rounds,
+                norm_stats=norm_stats,
+                pair_ids=np.array(pairs, dtype=str).reshape(-1, 2),
+                pair_similarity=np.array([self.pair_similarity[p] for p in pairs], dtype=np.float32),
+                pair_observations=np.array([self.pair_observations.get(p, 0) for p in pairs], dtype=np.int64),
+                reputation_ids=np.array(reputation_ids, dtype=str),
+                reputation=np.array([self.reputation[c] for c in reputation_ids], dtype=np.float32),
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Restore a snapshot written by save()."""
+        path = path or self.path
+        with np.load(path, allow_pickle=False) as snapshot:
+            version = int(snapshot["format_version"]) if "format_version" in snapshot else 0
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path} is a version {version} reputation snapshot; expected version "
+                                 f"{FORMAT_VERSION}. Remove it to start from fresh reputation state.")
+            sketch_dim, seed, model_dim, self.round = (int(v) for v in snapshot["meta"])
+            self.sketch_dim, self.seed = sketch_dim, seed
+            self.model_dim = model_dim or None
+            self._buckets = None
+            client_ids = snapshot["client_ids"].tolist()
+            self.clients = {
+                cid: ClientState(sketch.astype(np.float32), int(count), float(mean), float(m2), int(last_round))
+                for cid, sketch, (count, mean, m2), last_round
+                in zip(client_ids, snapshot["sketches"], snapshot["norm_stats"], snapshot["last_rounds"])
+            }
+            pairs = [tuple(pair) for pair in snapshot["pair_ids"].tolist()]
+            self.pair_similarity = {pair: float(similarity) for pair, similarity in zip(pairs, snapshot["pair_similarity"])}
+            self.pair_observations = {pair: int(count) for pair, count in zip(pairs, snapshot["pair_observations"])}
+            self.reputation = {
+                cid: float(score)
+                for cid, score in zip(snapshot["reputation_ids"].tolist(), snapshot["reputation"])
+            }
+        logger.info(f"Loaded reputation state for {len(self.clients)} clients from {path}")
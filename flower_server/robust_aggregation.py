@@ -0,0 +1,192 @@
+"""
+Robust aggregation rules for poisoning-resistant federated rounds.
+
+Every rule works on a stacked (clients x params) float32 matrix built in a
+single decode pass (see aggregation.stack_flat) and is vectorized over
+clients: order statistics use np.partition, Krum derives all pairwise
+distances from one Gram matrix and Weiszfeld iterates with GEMVs only.
+
+Select a rule through RobustFedAvg(aggregator=...) with one of the names in
+AGGREGATORS. Compressed uploads (compression=...) are decoded against the
+round's global model before stacking, as in the other server strategies.
+"""
+
+import logging
+import os
+import sys
+
+import numpy as np
+import flwr as fl
+
+from aggregation import aggregate_fit_metrics, stack_flat, unflatten
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fl_common.compression import compression_config, decompress_results
+
+logger = logging.getLogger(__name__)
+
+
+def coordinate_median(updates, num_examples=None):
+    """Coordinate-wise median of the client updates."""
+    n = updates.shape[0]
+    mid = n // 2
+    if n % 2:
+        return np.partition(updates, mid, axis=0)[mid].astype(np.float64)
+    partitioned = np.partition(updates, [mid - 1, mid], axis=0)
+    return (partitioned[mid - 1].astype(np.float64) + partitioned[mid]) / 2.0
+
+
+def trimmed_mean(updates, num_examples=None, trim_ratio=0.2):
+    """Coordinate-wise mean after dropping the trim_ratio largest and smallest values.
+
+    At least one value is trimmed from each end whenever trim_ratio > 0 and
+    there are 3 or more updates.
+    """
+    n = updates.shape[0]
+    k = int(trim_ratio * n)
+    if k == 0 and trim_ratio > 0:
+        if n >= 3:
+            k = 1
+        else:
+            logger.warning(f"trimmed_mean cannot trim {n} update(s); using the plain mean.")
+    if k == 0:
+        return updates.mean(axis=0, dtype=np.float64)
+    if 2 * k >= n:
+        raise ValueError(f"trim_ratio={trim_ratio} trims every one of the {n} updates.")
+    partitioned = np.partition(updates, [k, n - k - 1], axis=0)
+    return partitioned[k:n - k].mean(axis=0, dtype=np.float64)
+
+
+def pairwise_sq_distances(updates):
+    """All pairwise squared L2 distances from a single Gram-matrix product."""
+    updates64 = updates.astype(np.float64)
+    gram = updates64 @ updates64.T
+    sq_norms = np.diag(gram)
+    distances = sq_norms[:, None] + sq_norms[None, :] - 2.0 * gram
+    np.maximum(distances, 0.0, out=distances)
+    return distances
+
+
+def krum_scores(updates, num_byzantine):
+    """Krum score per client: sum of distances to its n - f - 2 nearest neighbours."""
+    n = updates.shape[0]
+    neighbours = min(max(1, n - num_byzantine - 2), n - 1)
+    distances = pairwise_sq_distances(updates)
+    np.fill_diagonal(distances, np.inf)
+    nearest = np.partition(distances, neighbours - 1, axis=1)[:, :neighbours]
+    return nearest.sum(axis=1)
+
+
+def multi_krum(updates, num_examples=None, num_byzantine=1, num_selected=None):
+    """Example-weighted average of the num_selected updates with the lowest Krum scores."""
+    n = updates.shape[0]
+    if n < 2:
+        return updates[0].astype(np.float64), np.arange(n)
+    if num_selected is None:
+        num_selected = max(1, n - num_byzantine)
+    num_selected = min(num_selected, n)
+
+    scores = krum_scores(updates, num_byzantine)
+    selected = np.argpartition(scores, num_selected - 1)[:num_selected]
+    weights = np.ones(n) if num_examples is None else np.asarray(num_examples, dtype=np.float64)
+    coefficients = weights[selected] / weights[selected].sum()
+    return coefficients @ updates[selected].astype(np.float64), np.sort(selected)
+
+
+def geometric_median(updates, num_examples=None, max_iter=100, tol=1e-6, eps=1e-8):
+    """Weighted geometric median via Weiszfeld iterations."""
+    n = updates.shape[0]
+    weights = np.ones(n) if num_examples is None else np.asarray(num_examples, dtype=np.float64)
+    weights = weights / weights.sum()
+    updates64 = updates.astype(np.float64)
+    sq_norms = np.einsum("ij,ij->i", updates64, updates64)
+
+    median = weights @ updates64
+    for _ in range(max_iter):
+        # ||x_i - z||^2 = ||x_i||^2 - 2 x_i.z + ||z||^2, so each step is one GEMV over the stack
+        sq_distances = sq_norms - 2.0 * (updates64 @ median) + median @ median
+        inv_distances = weights / np.maximum(np.sqrt(np.maximum(sq_distances, 0.0)), eps)
+        updated = (inv_distances @ updates64) / inv_distances.sum()
+        shift = np.linalg.norm(updated - median)
+        median = updated
+        if shift <= tol * max(1.0, np.linalg.norm(median)):
+            break
+    return median
+
+
+def _krum_average(updates, num_examples=None, **kwargs):
+    average, _ = multi_krum(updates, num_examples, **kwargs)
+    return average
+
+
+AGGREGATORS = {
+    "median": coordinate_median,
+    "trimmed_mean": trimmed_mean,
+    "krum": _krum_average,
+    "geometric_median": geometric_median,
+}
+
+
+class RobustFedAvg(fl.server.strategy.FedAvg):
+    """FedAvg with the averaging step replaced by a selectable robust aggregator."""
+
+    def __init__(self, *args, aggregator="median", aggregator_kwargs=None, hash_log=None, compression=None,
+                 compression_topk_ratio=0.1, **kwargs):
+        super().__init__(*args, **kwargs)
+        if aggregator not in AGGREGATORS:
+            raise ValueError(f"Unknown aggregator '{aggregator}'. Choose from {sorted(AGGREGATORS)}.")
+        self.aggregator = aggregator
+        self.aggregator_kwargs = aggregator_kwargs or {}
+        self.hash_log = hash_log
+        self.fit_config = compression_config(compression, compression_topk_ratio)
+        self.global_parameters = None
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        # Compressed uploads are deltas against this round's global model
+        self.global_parameters = parameters
+        instructions = super().configure_fit(server_round, parameters, client_manager)
+        for _, fit_ins in instructions:
+            fit_ins.config.update(self.fit_config)
+        return instructions
+
+    def aggregate_fit(self, server_round, results, failures):
+        logger.info(f"=== ROBUST AGGREGATION ({self.aggregator}) - Round {server_round} ===")
+
+        if failures:
+            logger.warning(f"{len(failures)} client(s) failed.")
+        if not results:
+            logger.error("No valid results received for aggregation.")
+            return None, {}
+        if not self.accept_failures and failures:
+            return None, {}
+
+        try:
+            results, uplink_stats, decode_failures = decompress_results(results, self.global_parameters, server_round)
+            if decode_failures:
+                logger.warning(f"{len(decode_failures)} update(s) could not be decoded and count as failures.")
+                if not self.accept_failures:
+                    return None, {}
+            if not results:
+                logger.error("No decodable results received for aggregation.")
+                return None, {}
+
+            updates, shapes, hashes = stack_flat(results)
+            num_examples = [res.num_examples for _, res in results]
+
+            if self.aggregator == "krum":
+                aggregated, selected = multi_krum(updates, num_examples, **self.aggregator_kwargs)
+                selected_ids = [results[i][0].cid for i in selected]
+                logger.info(f"Multi-Krum selected {len(selected_ids)}/{len(results)} clients: {selected_ids}")
+            else:
+                aggregated = AGGREGATORS[self.aggregator](updates, num_examples, **self.aggregator_kwargs)
+
+            for (client, _), model_hash in zip(results, hashes):
+                logger.info(f"Received model update from {client.cid} with SHA-256 hash: {model_hash}")
+                if self.hash_log is not None:
+                    self.hash_log.write(client.cid, server_round, model_hash)
+
+            parameters = fl.common.ndarrays_to_parameters(unflatten(aggregated, shapes))
+            return parameters, {**aggregate_fit_metrics(self, results), **uplink_stats}
+        except Exception as e:
+            logger.error(f"Robust aggregation error: {e}")
+            return None, {}
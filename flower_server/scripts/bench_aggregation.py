@@ -0,0 +1,110 @@
+"""
+Benchmark round aggregation time and peak RSS for the reputation-scoring server.
+
+Compares the previous path (parameters_to_ndarrays for every client, per-layer
+norm loop, then FedAvg.aggregate_fit deserializing everything again) with the
+single-pass StreamingAggregator. Each configuration runs in its own
+subprocess so ru_maxrss reflects only that run.
+
+Usage:
+    python bench_aggregation.py                     # 3, 30, 300 clients, real ANN size
+    python bench_aggregation.py --hidden 1024       # wider synthetic model
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import flwr as fl
+from flwr.server.strategy.aggregate import aggregate
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from aggregation import StreamingAggregator
+from bench_common import model_shapes, synthetic_results
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def baseline_round(results):
+    client_weights = []
+    client_norms = []
+    for _, fit_res in results:
+        weights = fl.common.parameters_to_ndarrays(fit_res.parameters)
+        client_weights.append(weights)
+        total_norm = 0.0
+        for w in weights:
+            total_norm += np.linalg.norm(w.flatten()) ** 2
+        client_norms.append(np.sqrt(total_norm))
+    weights_results = [
+        (fl.common.parameters_to_ndarrays(fit_res.parameters), fit_res.num_examples) for _, fit_res in results
+    ]
+    aggregated = aggregate(weights_results)
+    for weights in client_weights:
+        b"".join([w.tobytes() for w in weights])
+    return aggregated
+
+
+def streaming_round(results):
+    aggregator = StreamingAggregator()
+    for client, fit_res in results:
+        aggregator.add(client.cid, fit_res.parameters, fit_res.num_examples)
+    return aggregator.result()
+
+
+def run_single(mode, num_clients, hidden):
+    results = synthetic_results(num_clients, hidden)
+    num_params = sum(int(np.prod(shape)) for shape in model_shapes(hidden))
+    rss_before = current_rss_mb()
+    round_fn = streaming_round if mode == "streaming" else baseline_round
+    start = time.perf_counter()
+    round_fn(results)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "mode": mode,
+        "clients": num_clients,
+        "params": num_params,
+        "round_seconds": elapsed,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "aggregation_rss_mb": max(0.0, peak_rss_mb() - rss_before),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[3, 30, 300])
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--mode", choices=["baseline", "streaming"])
+    args = parser.parse_args()
+
+    if args.mode:
+        run_single(args.mode, args.clients[0], args.hidden)
+        return
+
+    print(f"{'clients':>8} {'mode':>10} {'round s':>10} {'agg RSS MB':>11} {'peak RSS MB':>12}")
+    for num_clients in args.clients:
+        for mode in ("baseline", "streaming"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--clients", str(num_clients), "--hidden", str(args.hidden)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            row = json.loads(out.strip().splitlines()[-1])
+            print(f"{num_clients:>8} {mode:>10} {row['round_seconds']:>10.4f} "
+                  f"{row['aggregation_rss_mb']:>11.1f} {row['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Compare synchronous Flower rounds with FedBuff-style asynchronous rounds.
+
+Runs both server loops in-process against simulated Raspberry Pi clients: each
+trains a 78-feature logistic-regression model with NumPy on a synthetic
+CICIDS-like shard and sleeps to model device speed. One straggler is several
+times slower than the others. Reports update throughput (updates/second) and
+wall-clock time until the global model reaches the target accuracy.
+
+A final async run adds a client whose fit always fails at once, and checks
+that it is backed off and then dropped while the other clients finish the run.
+
+Usage:
+    python bench_async_rounds.py --clients 4 --straggler-factor 6 --buffer-size 2 --target-accuracy 0.9
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import flwr as fl
+from flwr.common import Code, FitRes, Status
+from flwr.server.client_proxy import ClientProxy
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from async_rounds import FedBuffServer
+
+INPUT_SHAPE = 78
+
+
+def synthetic_data(num_samples, rng, shift=0.0):
+    y = rng.integers(0, 2, size=num_samples)
+    centers = np.where(y[:, None] == 1, 0.35, -0.35) + shift
+    X = (rng.normal(size=(num_samples, INPUT_SHAPE)) + centers).astype(np.float32)
+    return X, y.astype(np.float32)
+
+
+def predict(weights, X):
+    w, b = weights
+    return 1.0 / (1.0 + np.exp(-(X @ w + b).ravel()))
+
+
+class SimulatedPiClient(ClientProxy):
+    def __init__(self, cid, X, y, delay, rng, epochs=1, lr=0.05, batch_size=64):
+        super().__init__(cid)
+        self.X, self.y = X, y
+        self.delay = delay
+        self.rng = rng
+        self.epochs = epochs
+        self.lr = lr
+        self.batch_size = batch_size
+
+    def fit(self, ins, timeout, group_id):
+        w, b = [a.copy() for a in fl.common.parameters_to_ndarrays(ins.parameters)]
+        for _ in range(self.epochs):
+            order = self.rng.permutation(len(self.X))
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                error = predict((w, b), self.X[idx]) - self.y[idx]
+                w -= self.lr * (self.X[idx].T @ error)[:, None] / len(idx)
+                b -= self.lr * error.mean()
+        time.sleep(self.delay * self.rng.uniform(0.8, 1.2))
+        return FitRes(Status(Code.OK, ""), fl.common.ndarrays_to_parameters([w, b]), len(self.X), {})
+
+    def evaluate(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def get_properties(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def get_parameters(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def reconnect(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+
+class FailingPiClient(SimulatedPiClient):
+    def fit(self, ins, timeout, group_id):
+        raise ConnectionError("simulated crash before training")
+
+
+def build(args, seed):
+    rng = np.random.default_rng(seed)
+    client_manager = fl.server.SimpleClientManager()
+    for i in range(args.clients):
+        X, y = synthetic_data(args.samples, rng, shift=0.05 * i)
+        delay = args.base_delay * (args.straggler_factor if i == args.clients - 1 else 1.0)
+        client_manager.register(SimulatedPiClient(f"node-{i}", X, y, delay, np.random.default_rng(seed + i)))
+
+    X_test, y_test = synthetic_data(4000, rng)
+    reached = {"time": None}
+    start = {"time": None}
+
+    def evaluate_fn(server_round, parameters, config):
+        if start["time"] is None:
+            start["time"] = time.perf_counter()
+        probs = predict(parameters, X_test)
+        accuracy = float(((probs >= 0.5) == y_test).mean())
+        loss = float(-np.mean(y_test * np.log(probs + 1e-7) + (1 - y_test) * np.log(1 - probs + 1e-7)))
+        if reached["time"] is None and accuracy >= args.target_accuracy:
+            reached["time"] = time.perf_counter() - start["time"]
+        return loss, {"accuracy": accuracy}
+
+    initial = [np.zeros((INPUT_SHAPE, 1), np.float32), np.zeros(1, np.float32)]
+    strategy = fl.server.strategy.FedAvg(
+        fraction_fit=1.0,
+        fraction_evaluate=0.0,
+        min_fit_clients=args.clients,
+        min_available_clients=args.clients,
+        evaluate_fn=evaluate_fn,
+        initial_parameters=fl.common.ndarrays_to_parameters(initial),
+    )
+    return client_manager, strategy, reached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=6, help="synchronous rounds; async applies as many updates")
+    parser.add_argument("--buffer-size", type=int, default=2)
+    parser.add_argument("--base-delay", type=float, default=0.2)
+    parser.add_argument("--straggler-factor", type=float, default=6.0)
+    parser.add_argument("--target-accuracy", type=float, default=0.9)
+    args = parser.parse_args()
+    logging.getLogger("flwr").setLevel(logging.WARNING)
+
+    client_manager, strategy, reached = build(args, seed=1)
+    server = fl.server.Server(client_manager=client_manager, strategy=strategy)
+    history, elapsed = server.fit(num_rounds=args.rounds, timeout=None)
+    sync_updates = args.rounds * args.clients
+    sync_accuracy = history.metrics_centralized["accuracy"][-1][1]
+    sync_target = reached["time"]
+
+    client_manager, strategy, reached = build(args, seed=1)
+    versions = max(1, sync_updates // args.buffer_size)
+    server = FedBuffServer(client_manager=client_manager, strategy=strategy, buffer_size=args.buffer_size)
+    history, async_elapsed = server.fit(num_rounds=versions, timeout=None)
+    async_accuracy = [acc for _, acc in history.metrics_centralized["accuracy"]][-1]
+    async_target = reached["time"]
+
+    def fmt(value):
+        return f"{value:.2f}s" if value is not None else "not reached"
+
+    print(f"{'mode':>6} {'updates':>8} {'seconds':>8} {'updates/s':>10} {'final acc':>10} {'time to ' + str(args.target_accuracy):>14}")
+    print(f"{'sync':>6} {sync_updates:>8} {elapsed:>8.2f} {sync_updates / elapsed:>10.2f} {sync_accuracy:>10.4f} {fmt(sync_target):>14}")
+    print(f"{'async':>6} {server.updates_applied:>8} {async_elapsed:>8.2f} {server.updates_applied / async_elapsed:>10.2f} "
+          f"{async_accuracy:>10.4f} {fmt(async_target):>14}")
+
+    client_manager, strategy, _ = build(args, seed=1)
+    client_manager.register(FailingPiClient("node-crashing", None, None, 0.0, np.random.default_rng(0)))
+    server = FedBuffServer(client_manager=client_manager, strategy=strategy, buffer_size=args.buffer_size,
+                           retry_backoff=0.05, max_client_failures=3)
+    server.fit(num_rounds=versions, timeout=None)
+    if server.version != versions or server.dropped != {"node-crashing"}:
+        raise AssertionError(f"Expected {versions} versions with node-crashing dropped, got {server.version} "
+                             f"versions and dropped {sorted(server.dropped)}")
+    print(f"Failing client: dropped after {server.consecutive_failures['node-crashing']} backed-off attempts; "
+          f"{server.version} versions published by the others")
+
+
+if __name__ == "__main__":
+    main()
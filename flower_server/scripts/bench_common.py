@@ -0,0 +1,40 @@
+"""
+Synthetic Flower round fixtures shared by the aggregation benchmarks.
+
+Clients are stand-ins with only a cid, and their updates are FitRes objects
+holding serialized float32 weights of the nodes' 78-hidden-hidden/2-1 ANN,
+exactly what a strategy's aggregate_fit receives.
+"""
+
+import numpy as np
+import flwr as fl
+
+INPUT_SHAPE = 78
+
+
+class SyntheticClient:
+    def __init__(self, cid):
+        self.cid = cid
+
+
+def model_shapes(hidden):
+    return [(INPUT_SHAPE, hidden), (hidden,), (hidden, hidden // 2), (hidden // 2,), (hidden // 2, 1), (1,)]
+
+
+def fit_result(weights, num_examples):
+    return fl.common.FitRes(
+        status=fl.common.Status(code=fl.common.Code.OK, message=""),
+        parameters=fl.common.ndarrays_to_parameters(weights),
+        num_examples=num_examples,
+        metrics={},
+    )
+
+
+def synthetic_results(num_clients, hidden, seed=42):
+    """(client, FitRes) pairs with independent small random weights and 1000-5000 examples each."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(num_clients):
+        weights = [rng.normal(scale=0.05, size=shape).astype(np.float32) for shape in model_shapes(hidden)]
+        results.append((SyntheticClient(f"client-{i}"), fit_result(weights, int(rng.integers(1000, 5000)))))
+    return results
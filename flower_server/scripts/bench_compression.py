@@ -0,0 +1,142 @@
+"""
+Measure uplink bytes per round and accuracy impact of client update compression.
+
+Simulates federated rounds with the clients' 78-64-32-1 ANN implemented in
+NumPy on synthetic data labelled by a random teacher network. Every scheme
+goes through the real encode -> Flower serialization -> decompress_results
+path, so the reported bytes are the .npy payload sizes a Pi would upload.
+Also checks that client and server hashes of the reconstructed model agree.
+
+Usage:
+    python bench_compression.py --clients 3 --rounds 10 --topk-ratio 0.1 0.01
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+import flwr as fl
+from flwr.common import Code, FitRes, Status
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fl_common.compression import UpdateEncoder, compression_config, decompress_results
+from fl_common.model_hash import hash_weights
+from bench_common import SyntheticClient
+
+INPUT_SHAPE = 78
+LAYERS = [INPUT_SHAPE, 64, 32, 1]
+
+
+def init_weights(rng):
+    weights = []
+    for fan_in, fan_out in zip(LAYERS[:-1], LAYERS[1:]):
+        weights.append((rng.normal(size=(fan_in, fan_out)) * np.sqrt(2.0 / fan_in)).astype(np.float32))
+        weights.append(np.zeros(fan_out, np.float32))
+    return weights
+
+
+def forward(weights, X):
+    activations = [X]
+    for i in range(0, len(weights) - 2, 2):
+        activations.append(np.maximum(activations[-1] @ weights[i] + weights[i + 1], 0.0))
+    logits = activations[-1] @ weights[-2] + weights[-1]
+    return activations, 1.0 / (1.0 + np.exp(-logits.ravel()))
+
+
+def train(weights, X, y, rng, epochs=1, lr=0.05, batch_size=64):
+    weights = [w.copy() for w in weights]
+    for _ in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            activations, probs = forward(weights, X[idx])
+            grad = ((probs - y[idx]) / len(idx))[:, None].astype(np.float32)
+            for i in range(len(weights) - 2, -1, -2):
+                grad_w = activations[i // 2].T @ grad
+                grad_b = grad.sum(axis=0)
+                if i > 0:
+                    grad = (grad @ weights[i].T) * (activations[i // 2] > 0)
+                weights[i] -= lr * grad_w
+                weights[i + 1] -= lr * grad_b
+    return weights
+
+
+def accuracy(weights, X, y):
+    return float(((forward(weights, X)[1] >= 0.5) == y).mean())
+
+
+def make_data(args, rng):
+    teacher = init_weights(rng)
+    shards = []
+    for i in range(args.clients + 1):
+        X = (rng.normal(size=(args.samples, INPUT_SHAPE)) + 0.1 * i).astype(np.float32)
+        scores = forward(teacher, X)[1]
+        shards.append((X, (scores >= np.median(scores)).astype(np.float32)))
+    return shards[:-1], shards[-1]
+
+
+def run(args, scheme, topk_ratio):
+    rng = np.random.default_rng(0)
+    shards, (X_test, y_test) = make_data(args, rng)
+    global_weights = init_weights(rng)
+    encoders = [UpdateEncoder(seed=i) for i in range(args.clients)]
+    train_rngs = [np.random.default_rng(100 + i) for i in range(args.clients)]
+    config = compression_config(scheme, topk_ratio)
+    uplink, dense = [], []
+    hashes_match = True
+
+    for server_round in range(1, args.rounds + 1):
+        global_parameters = fl.common.ndarrays_to_parameters(global_weights)
+        received = fl.common.parameters_to_ndarrays(global_parameters)
+        results, client_hashes = [], []
+        for i, (X, y) in enumerate(shards):
+            local = train(received, X, y, train_rngs[i], epochs=args.epochs)
+            upload, reconstructed, metrics = encoders[i].encode(local, received, config)
+            client_hashes.append(hash_weights(reconstructed))
+            fit_res = FitRes(Status(Code.OK, ""), fl.common.ndarrays_to_parameters(upload), len(X), metrics)
+            results.append((SyntheticClient(f"node-{i}"), fit_res))
+
+        results, stats, failures = decompress_results(results, global_parameters, server_round)
+        if failures:
+            raise AssertionError(f"{len(failures)} compressed update(s) failed to decode: {failures}")
+        uplink.append(stats["uplink_bytes"])
+        dense.append(stats["uplink_dense_bytes"])
+
+        client_weights = [fl.common.parameters_to_ndarrays(res.parameters) for _, res in results]
+        hashes_match &= client_hashes == [hash_weights(w) for w in client_weights]
+        coefficients = np.array([res.num_examples for _, res in results], np.float32)
+        coefficients /= coefficients.sum()
+        global_weights = [sum(c * w[layer] for c, w in zip(coefficients, client_weights)).astype(np.float32)
+                          for layer in range(len(global_weights))]
+
+    return np.mean(uplink) / args.clients, np.mean(dense) / args.clients, accuracy(global_weights, X_test, y_test), hashes_match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--topk-ratio", type=float, nargs="+", default=[0.1, 0.01])
+    args = parser.parse_args()
+    logging.getLogger("fl_common.compression").setLevel(logging.WARNING)
+
+    runs = [(None, None), ("delta", None), ("delta+int8", None)]
+    for ratio in args.topk_ratio:
+        runs += [("delta+topk", ratio), ("delta+topk+int8", ratio)]
+
+    print(f"{'scheme':>22} {'KiB/client/round':>17} {'ratio':>7} {'accuracy':>9} {'vs full':>8} {'hashes':>7}")
+    baseline = None
+    for scheme, ratio in runs:
+        upload, dense, acc, hashes_match = run(args, scheme, ratio or 0.1)
+        baseline = acc if baseline is None else baseline
+        label = (scheme or "none") + (f" k={ratio:g}" if ratio else "")
+        print(f"{label:>22} {upload / 1024:>17.2f} {dense / upload:>6.1f}x {acc:>9.4f} {acc - baseline:>+8.4f} "
+              f"{'ok' if hashes_match else 'DIFF':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Microbenchmark the FedProx server reduction.
+
+Compares the previous path (parameters_to_ndarrays for every client, then
+np.mean(np.array(client_weights, dtype=object), axis=0)) with stack_layers +
+weighted_layer_mean, which decodes each layer straight into a contiguous
+float32 (clients x layer size) matrix and reduces it with one GEMV. Both
+timings start from the serialized Parameters a strategy receives.
+
+Usage:
+    python bench_fedprox_reduce.py --clients 4 32 256 --hidden 64 --repeats 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import flwr as fl
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from aggregation import stack_layers, weighted_layer_mean
+from bench_common import synthetic_results
+
+
+def object_array_round(results):
+    client_weights = [fl.common.parameters_to_ndarrays(res.parameters) for _, res in results]
+    return np.mean(np.array(client_weights, dtype=object), axis=0)
+
+
+def layerwise_round(results):
+    stacks, shapes, _ = stack_layers(results, hash_layers=False)
+    return weighted_layer_mean(stacks, shapes, [res.num_examples for _, res in results])
+
+
+def time_fn(fn, results, repeats):
+    fn(results)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(results)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[4, 32, 256])
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'object ms':>10} {'layerwise ms':>13} {'speedup':>8}")
+    for num_clients in args.clients:
+        results = synthetic_results(num_clients, args.hidden)
+
+        # Sanity check: with equal example counts both paths compute the same mean
+        stacks, shapes, _ = stack_layers(results, hash_layers=False)
+        for a, b in zip(object_array_round(results), weighted_layer_mean(stacks, shapes, [1] * num_clients)):
+            assert np.allclose(a, b, atol=1e-5)
+
+        object_ms = time_fn(object_array_round, results, args.repeats)
+        layer_ms = time_fn(layerwise_round, results, args.repeats)
+        print(f"{num_clients:>8} {object_ms:>10.3f} {layer_ms:>13.3f} {object_ms / layer_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark robust aggregation rules against the current 5x-min-norm filter.
+
+Clean clients send the global model plus small Gaussian drift; poisoned
+clients replace every layer with np.random.normal(size=shape), the pattern
+used by raspberry_pi/node-zeta/scripts/flower_client_poison.py. For each
+client count the script reports wall-clock time per round and the L2 error of
+the aggregate against the mean of the clean updates.
+
+Usage:
+    python bench_robust_aggregation.py --clients 4 16 64 256 --poisoned-fraction 0.25
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from aggregation import StreamingAggregator, stack_flat
+from bench_common import SyntheticClient, fit_result, model_shapes
+from robust_aggregation import coordinate_median, geometric_median, multi_krum, trimmed_mean
+
+
+def synthetic_round(num_clients, num_poisoned, hidden, seed=42):
+    rng = np.random.default_rng(seed)
+    shapes = model_shapes(hidden)
+    global_model = [rng.normal(scale=0.1, size=shape).astype(np.float32) for shape in shapes]
+    results = []
+    clean = []
+    for i in range(num_clients):
+        if i < num_poisoned:
+            weights = [rng.normal(size=shape).astype(np.float32) for shape in shapes]
+        else:
+            weights = [(w + rng.normal(scale=0.01, size=w.shape)).astype(np.float32) for w in global_model]
+            clean.append(np.concatenate([w.ravel() for w in weights]))
+        results.append((SyntheticClient(f"client-{i}"), fit_result(weights, 1000)))
+    return results, np.mean(clean, axis=0)
+
+
+def norm_filter_round(results):
+    """The existing FedAvgWithReputationScoring rule: drop norms above 5x the minimum."""
+    aggregator = StreamingAggregator()
+    digests = [aggregator.measure(client.cid, res.parameters, res.num_examples, hold=True) for client, res in results]
+    norms = [digest.norm for digest in digests]
+    threshold = min(norms) * 5.0 if max(norms) > min(norms) * 5.0 else float("inf")
+    accepted = [digest for digest in digests if digest.norm <= threshold] or digests
+    for digest in accepted:
+        aggregator.accumulate(digest)
+    return np.concatenate([w.ravel() for w in aggregator.result()])
+
+
+def robust_round(rule, num_byzantine):
+    def run(results):
+        updates, _, _ = stack_flat(results)
+        num_examples = [res.num_examples for _, res in results]
+        if rule is multi_krum:
+            return multi_krum(updates, num_examples, num_byzantine=num_byzantine)[0]
+        if rule is trimmed_mean:
+            return trimmed_mean(updates, num_examples, trim_ratio=min(0.45, num_byzantine / len(results) + 0.05))
+        return rule(updates, num_examples)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[4, 16, 64, 256])
+    parser.add_argument("--poisoned-fraction", type=float, default=0.25)
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'poisoned':>9} {'rule':>17} {'ms/round':>10} {'L2 error':>10}")
+    for num_clients in args.clients:
+        num_poisoned = max(1, int(args.poisoned_fraction * num_clients))
+        results, clean_mean = synthetic_round(num_clients, num_poisoned, args.hidden)
+        rules = {
+            "norm_filter": norm_filter_round,
+            "median": robust_round(coordinate_median, num_poisoned),
+            "trimmed_mean": robust_round(trimmed_mean, num_poisoned),
+            "multi_krum": robust_round(multi_krum, num_poisoned),
+            "geometric_median": robust_round(geometric_median, num_poisoned),
+        }
+        for name, run in rules.items():
+            aggregated = run(results)
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                run(results)
+            elapsed_ms = (time.perf_counter() - start) / args.repeats * 1000
+            error = np.linalg.norm(aggregated - clean_mean)
+            print(f"{num_clients:>8} {num_poisoned:>9} {name:>17} {elapsed_ms:>10.2f} {error:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
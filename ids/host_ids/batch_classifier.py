@@ -0,0 +1,98 @@
+"""
+Batching, deduplicating front end for the host IDS log classifier.
+
+Lines are submitted from any thread and queued. A single worker takes the
+oldest line, keeps collecting until max_batch lines are queued or
+max_delay_ms have passed since that line arrived, and classifies the batch
+with one call to classify_fn. Identical lines within a batch (common in
+bursts such as an sshd brute force) are classified once. submit() returns a
+Future resolving to (label, score); batches complete in submission order, so
+futures resolve in the order lines were submitted.
+
+Queue depth and batch sizes are reported through the optional on_batch
+callback (see prometheus_exporter.export_batch).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatchingClassifier:
+    """Micro-batches log lines into single forward passes."""
+
+    def __init__(self, classify_fn, max_batch=32, max_delay_ms=20.0, max_queue=10000, on_batch=None):
+        self.classify_fn = classify_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.on_batch = on_batch
+        self.lines_classified = 0
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-classifier", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, line):
+        """Queue one log line; returns a Future of (label, score). Blocks when the queue is full."""
+        future = Future()
+        self._queue.put((line, future, time.perf_counter()))
+        return future
+
+    def classify(self, lines):
+        """Classify lines through the batcher, returning (label, score) pairs in order."""
+        return [future.result() for future in [self.submit(line) for line in lines]]
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_delay
+        stop = False
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        unique = list(dict.fromkeys(line for line, _, _ in batch))
+        start = time.perf_counter()
+        try:
+            results = dict(zip(unique, self.classify_fn(unique)))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        for line, future, _ in batch:
+            future.set_result(results[line])
+        self.lines_classified += len(batch)
+        self.batches += 1
+        if self.on_batch is not None:
+            self.on_batch(len(batch), len(unique), self.queue_depth, elapsed)
+
+    def close(self):
+        """Classify everything already queued and stop the worker."""
+        self._queue.put(_STOP)
+        self._thread.join()
@@ -0,0 +1,86 @@
+"""
+Benchmark the batching log classifier against per-line classification.
+
+Replays a burst of journal lines (an sshd brute force interleaved with
+routine HDFS lines) through classify_log_line one line at a time and then
+through BatchingClassifier, reporting lines/s and mean batch size.
+
+--backend model uses the configured HuggingFace model (needs transformers and
+torch). The default, --backend simulated, emulates a forward pass that costs
+--call-ms per call plus --line-ms per distinct line, so the batching gain can
+be measured without the model.
+
+Usage:
+    python bench_batch_classifier.py --lines 2000 --backend simulated
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from ids.host_ids.batch_classifier import BatchingClassifier
+
+TEMPLATES = [
+    "sshd[{pid}]: Failed password for root from 192.168.1.{host} port {port} ssh2",
+    "sshd[{pid}]: Failed password for invalid user admin from 192.168.1.{host} port {port} ssh2",
+    "dfs.DataNode$PacketResponder: Received block blk_{block} of size 67108864 from /10.250.19.{host}",
+    "dfs.FSNamesystem: BLOCK* NameSystem.addStoredBlock: blockMap updated: 10.251.{host}.1:50010",
+]
+
+
+def burst(lines, seed=0):
+    rng = random.Random(seed)
+    pid, host = rng.randint(1000, 9999), rng.randint(1, 254)
+    # Brute-force bursts repeat the attacker's line until the source port changes
+    return [rng.choice(TEMPLATES).format(pid=pid, host=host, port=50000 + i // 8, block=rng.randint(0, 1 << 40))
+            for i in range(lines)]
+
+
+def simulated_classifier(call_ms, line_ms):
+    def classify_lines(lines):
+        time.sleep((call_ms + line_ms * len(lines)) / 1000.0)
+        return [("POSITIVE" if "Failed password" in line else "NEGATIVE", 0.9) for line in lines]
+    return classify_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--backend", choices=["simulated", "model"], default="simulated")
+    parser.add_argument("--call-ms", type=float, default=4.0, help="simulated fixed cost per forward pass")
+    parser.add_argument("--line-ms", type=float, default=0.3, help="simulated cost per line in a forward pass")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-delay-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.backend == "model":
+        from ids.host_ids.model_inference import classify_log_line, classify_log_lines
+    else:
+        classify_log_lines = simulated_classifier(args.call_ms, args.line_ms)
+
+        def classify_log_line(line):
+            return classify_log_lines([line])[0]
+
+    lines = burst(args.lines)
+    start = time.perf_counter()
+    expected = [classify_log_line(line) for line in lines]
+    per_line = time.perf_counter() - start
+
+    classifier = BatchingClassifier(classify_log_lines, max_batch=args.max_batch, max_delay_ms=args.max_delay_ms)
+    start = time.perf_counter()
+    results = classifier.classify(lines)
+    batched = time.perf_counter() - start
+    classifier.close()
+
+    agree = sum(a[0] == b[0] and abs(a[1] - b[1]) < 1e-4 for a, b in zip(expected, results)) / len(lines)
+    print(f"{'mode':>10} {'seconds':>8} {'lines/s':>9} {'mean batch':>11}")
+    print(f"{'per-line':>10} {per_line:>8.2f} {len(lines) / per_line:>9.0f} {1:>11.1f}")
+    print(f"{'batched':>10} {batched:>8.2f} {len(lines) / batched:>9.0f} {len(lines) / classifier.batches:>11.1f}")
+    print(f"Speedup {per_line / batched:.1f}x, results in order and matching: {agree:.2%}")
+
+
+if __name__ == "__main__":
+    main()
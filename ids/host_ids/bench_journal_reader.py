@@ -0,0 +1,111 @@
+"""
+Compare the journalctl subprocess reader with the native python-systemd reader.
+
+Writes --entries synthetic entries (sshd, cron, kernel and systemd lines with
+units, PIDs and priorities) in journal export format and imports them into a
+local .journal file with systemd-journal-remote, so no live journal is read.
+Both backends then read the whole file through their log_reader source.
+The script reports entries/s, process CPU time (including the journalctl
+child for the subprocess path) and whether both produced identical lines,
+cursors and fields.
+
+Needs journalctl, systemd-journal-remote and python-systemd
+(pip install systemd-python).
+
+Usage:
+    python bench_journal_reader.py --entries 200000
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from ids.host_ids.log_reader import JournalSource, NativeJournalSource
+
+JOURNAL_REMOTE = "/usr/lib/systemd/systemd-journal-remote"
+
+UNITS = [
+    ("ssh.service", "sshd", 5, "Failed password for root from 192.168.1.{n} port {port} ssh2"),
+    ("ssh.service", "sshd", 6, "Accepted publickey for pi from 10.0.0.{n} port {port} ssh2"),
+    ("cron.service", "CRON", 6, "(root) CMD (run-parts /etc/cron.hourly)"),
+    ("systemd-logind.service", "systemd-logind", 6, "New session {port} of user pi."),
+    ("", "kernel", 4, "usb 1-1.{n}: new high-speed USB device number {n} using xhci_hcd"),
+    ("docker.service", "dockerd", 7, "Calling GET /v1.41/containers/json"),
+]
+
+
+def write_export(path, entries, seed=0):
+    rng = random.Random(seed)
+    boot_id = "%032x" % rng.getrandbits(128)
+    start_us = 1752400000000000
+    with open(path, "w") as f:
+        for i in range(entries):
+            unit, identifier, priority, message = rng.choice(UNITS)
+            f.write(f"__REALTIME_TIMESTAMP={start_us + i * 1000}\n__MONOTONIC_TIMESTAMP={i * 1000 + 1}\n"
+                    f"_BOOT_ID={boot_id}\n_HOSTNAME=node-alpha\nSYSLOG_IDENTIFIER={identifier}\n"
+                    f"_PID={1000 + rng.randint(0, 500)}\nPRIORITY={priority}\n"
+                    + (f"_SYSTEMD_UNIT={unit}\n" if unit else "")
+                    + f"MESSAGE={message.format(n=rng.randint(1, 254), port=rng.randint(1024, 65535))}\n\n")
+
+
+def drain(source):
+    entries = []
+    while True:
+        batch = source.read()
+        if batch is None:
+            return entries
+        entries += batch
+
+
+def timed(make_source):
+    cpu = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    source = make_source()
+    if source.selectable:
+        os.set_blocking(source.fileno(), True)
+    entries = drain(source)
+    elapsed = time.perf_counter() - start
+    source.close()
+    after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = sum(b.ru_utime + b.ru_stime - a.ru_utime - a.ru_stime for a, b in zip(cpu, after))
+    return entries, elapsed, cpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=256, help="native reader entries per read")
+    parser.add_argument("--journal-remote", default=JOURNAL_REMOTE)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="journal_bench_")
+    try:
+        export_path = os.path.join(work_dir, "synthetic.export")
+        journal_path = os.path.join(work_dir, "synthetic.journal")
+        write_export(export_path, args.entries)
+        subprocess.run([args.journal_remote, f"--output={journal_path}", export_path], check=True)
+
+        subprocess_entries, subprocess_seconds, subprocess_cpu = timed(
+            lambda: JournalSource("bench", files=[journal_path], follow=False))
+        native_entries, native_seconds, native_cpu = timed(
+            lambda: NativeJournalSource("bench", files=[journal_path], follow=False, batch_size=args.batch_size))
+
+        print(f"{'backend':>10} {'entries':>8} {'seconds':>8} {'entries/s':>10} {'CPU s':>7}")
+        for name, entries, seconds, cpu in (("journalctl", subprocess_entries, subprocess_seconds, subprocess_cpu),
+                                            ("native", native_entries, native_seconds, native_cpu)):
+            print(f"{name:>10} {len(entries):>8} {seconds:>8.2f} {len(entries) / seconds:>10.0f} {cpu:>7.2f}")
+        print(f"Speedup {subprocess_seconds / native_seconds:.1f}x, identical output: "
+              f"{subprocess_entries == native_entries}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare the PyTorch pipeline backend with the int8 ONNX Runtime backend.
+
+Each backend runs in a fresh process, which reports:
+- cold start: imports, model load and the first classified line;
+- peak RSS after the run;
+- per-call latency (median over --repeats) at several batch sizes;
+- throughput classifying --lines HDFS lines in batches of 32.
+
+Every latency call and the throughput run get distinct lines the backend has
+not seen before, so the ONNX backend's token cache cannot skip tokenization
+that the PyTorch backend has to do.
+
+The PyTorch backend loads model_path (the fine-tuned checkpoint). The ONNX
+backend loads onnx_model_dir as written by train/export_onnx.py. Both default
+to config.yaml. Lines come from HDFS_100k.log_structured.csv when present,
+otherwise from synthetic HDFS templates.
+
+Usage:
+    python bench_onnx_inference.py --backends pytorch onnx --batch-sizes 1 8 32
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import yaml
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+CHILD = """
+import json, resource, statistics, sys, time
+start = time.perf_counter()
+sys.path.append({root!r})
+sys.path.append({host_ids!r})
+from ids.host_ids.inference_backends import load_backend
+backend = load_backend({config!r})
+backend.classify_line("Receiving block blk_1 src: /10.250.19.102:54106")
+cold_start = time.perf_counter() - start
+
+from bench_template_cache import read_hdfs, synthetic_hdfs
+import os
+needed = {lines} + sum({batch_sizes!r}) * {repeats}
+pool = read_hdfs({csv!r}) if os.path.exists({csv!r}) else synthetic_hdfs(needed)
+# Distinct lines, consumed front to back, so no call is served from a token cache
+pool = iter(dict.fromkeys(pool))
+latency = {{}}
+for batch_size in {batch_sizes!r}:
+    times = []
+    for _ in range({repeats}):
+        batch = [next(pool) for _ in range(batch_size)]
+        t = time.perf_counter()
+        backend.classify_lines(batch)
+        times.append(time.perf_counter() - t)
+    latency[batch_size] = statistics.median(times) * 1000
+lines = [line for line, _ in zip(pool, range({lines}))]
+t = time.perf_counter()
+for i in range(0, len(lines), 32):
+    backend.classify_lines(lines[i:i + 32])
+throughput = len(lines) / (time.perf_counter() - t)
+print(json.dumps({{"cold_start": cold_start, "latency_ms": latency, "lines_per_second": throughput,
+                  "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def run_backend(config, args):
+    script = CHILD.format(root=REPO_ROOT, host_ids=os.path.dirname(os.path.abspath(__file__)), config=config,
+                          csv=args.csv, lines=args.lines, batch_sizes=args.batch_sizes, repeats=args.repeats)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=["pytorch", "onnx"], default=["pytorch", "onnx"])
+    parser.add_argument("--model-path", help="PyTorch checkpoint (default: config.yaml model_path)")
+    parser.add_argument("--onnx-model-dir", help="ONNX export (default: config.yaml onnx_model_dir)")
+    parser.add_argument("--onnx-model-file", default="model.int8.onnx")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "data", "HDFS_100k.log_structured.csv"))
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(os.path.join(os.path.dirname(__file__), "config.yaml")) as f:
+        config = yaml.safe_load(f)
+    configs = {
+        "pytorch": {"inference_backend": "pytorch", "model_path": args.model_path or config["model_path"]},
+        "onnx": {"inference_backend": "onnx", "onnx_model_dir": args.onnx_model_dir or config["onnx_model_dir"],
+                 "onnx_model_file": args.onnx_model_file, "onnx_threads": config.get("onnx_threads", 0)},
+    }
+
+    results = {backend: run_backend(configs[backend], args) for backend in args.backends}
+    header = " ".join(f"{f'b={b} ms':>9}" for b in args.batch_sizes)
+    print(f"{'backend':>8} {'cold s':>7} {'RSS MiB':>8} {header} {'lines/s':>9}")
+    for backend, r in results.items():
+        latencies = " ".join(f"{r['latency_ms'][str(b)]:>9.2f}" for b in args.batch_sizes)
+        print(f"{backend:>8} {r['cold_start']:>7.2f} {r['peak_rss_mib']:>8.0f} {latencies} {r['lines_per_second']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
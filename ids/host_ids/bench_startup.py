@@ -0,0 +1,113 @@
+"""
+Startup time and per-process RSS of host IDS classifier clients.
+
+Each case runs in a fresh process that imports ids.host_ids.model_inference
+and, where noted, calls warm_up() to classify its first lines:
+
+- eager load: import + warm_up() with a local model. This is what every
+  importer paid before loading was lazy;
+- lazy import: import only, which is what tools that never classify pay now;
+- model server: import + warm_up() against a running model_server.py over
+  its Unix socket.
+
+The script also reports the model server's own RSS (parent plus workers)
+and the total RSS of --clients processes with and without the shared server.
+
+Usage:
+    python bench_startup.py --backend onnx --onnx-model-dir bert-mini-hdfs-onnx --clients 3
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = """
+import resource, sys, time
+start = time.perf_counter()
+sys.path.append({root!r})
+from ids.host_ids import model_inference
+if {warm_up}:
+    model_inference.warm_up()
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def run_client(env, warm_up):
+    script = CHILD.format(root=os.path.abspath(os.path.join(HERE, "..", "..")), warm_up=warm_up)
+    out = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    seconds, rss = out.stdout.split()[-2:]
+    return float(seconds), int(rss) / 1024
+
+
+def tree_rss_mib(pid):
+    # Resident set of the server and its forked workers from /proc (shared pages are counted per process)
+    pids = [pid] + [int(p) for p in open(f"/proc/{pid}/task/{pid}/children").read().split()]
+    total = 0
+    for p in pids:
+        with open(f"/proc/{p}/status") as f:
+            total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    return total / 1024, len(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], default="onnx")
+    parser.add_argument("--model-path")
+    parser.add_argument("--onnx-model-dir")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(HERE, "config.yaml")) as f:
+        config = yaml.safe_load(f)
+    config["inference_backend"] = args.backend
+    config["model_path"] = args.model_path or config["model_path"]
+    config["onnx_model_dir"] = args.onnx_model_dir or config["onnx_model_dir"]
+
+    work_dir = tempfile.mkdtemp(prefix="host_ids_startup_")
+    socket_path = os.path.join(work_dir, "model.sock")
+    local_config, server_config = os.path.join(work_dir, "local.yaml"), os.path.join(work_dir, "server.yaml")
+    with open(local_config, "w") as f:
+        yaml.safe_dump({**config, "model_server_socket": None}, f)
+    with open(server_config, "w") as f:
+        yaml.safe_dump({**config, "model_server_socket": socket_path}, f)
+    local_env = {**os.environ, "HOST_IDS_CONFIG": local_config}
+    server_env = {**os.environ, "HOST_IDS_CONFIG": server_config}
+
+    results = {"eager load": run_client(local_env, True), "lazy import": run_client(local_env, False)}
+
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, "model_server.py"), "--socket", socket_path,
+                               "--workers", str(args.workers)], env=server_env, stdout=subprocess.DEVNULL)
+    try:
+        start = time.perf_counter()
+        while not os.path.exists(socket_path):
+            if server.poll() is not None:
+                raise RuntimeError("model_server.py exited before opening its socket")
+            time.sleep(0.05)
+        server_start = time.perf_counter() - start
+        results["model server"] = run_client(server_env, True)
+        server_rss, server_processes = tree_rss_mib(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'case':>13} {'startup s':>10} {'RSS MiB':>8}")
+    for case, (seconds, rss) in results.items():
+        print(f"{case:>13} {seconds:>10.3f} {rss:>8.0f}")
+    print(f"Model server: ready in {server_start:.2f}s, {server_rss:.0f} MiB RSS over {server_processes} process(es)")
+    local_total = args.clients * results["eager load"][1]
+    shared_total = server_rss + args.clients * results["model server"][1]
+    print(f"{args.clients} clients: {local_total:.0f} MiB with a model each, {shared_total:.0f} MiB sharing the server")
+
+
+if __name__ == "__main__":
+    main()
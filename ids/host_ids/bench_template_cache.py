@@ -0,0 +1,115 @@
+"""
+Benchmark the log-template cache on a replay of the HDFS log.
+
+Replays the Content column of HDFS_100k.log_structured.csv in batches of
+--batch-size lines, once through the template cache and, for the first
+--baseline-lines lines, straight through the classifier. Reports the
+template count, the cache hit rate (lines answered without the model), the
+speedup over classifying every line, and how often a cached verdict differs
+from the verdict for the line itself.
+
+--backend model uses the configured HuggingFace model (needs transformers and
+torch). --backend simulated emulates a forward pass costing --call-ms per call
+plus --line-ms per line. Without the CSV, --synthetic N generates N lines
+from common HDFS templates.
+
+Usage:
+    python bench_template_cache.py --csv data/HDFS_100k.log_structured.csv
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from ids.host_ids.template_cache import CachedClassifier, TemplateCache, log_template
+
+DEFAULT_CSV = os.path.join(os.path.dirname(__file__), "data", "HDFS_100k.log_structured.csv")
+
+HDFS_TEMPLATES = [
+    "Receiving block blk_{block} src: /10.250.{a}.{b}:{port} dest: /10.250.{a}.{b}:50010",
+    "Received block blk_{block} of size {size} from /10.250.{a}.{b}",
+    "PacketResponder {n} for block blk_{block} terminating",
+    "BLOCK* NameSystem.addStoredBlock: blockMap updated: 10.251.{a}.{b}:50010 is added to blk_{block} size {size}",
+    "BLOCK* NameSystem.allocateBlock: /user/root/rand/_temporary/_task_{n}_m_{port}_0/part-{port}. blk_{block}",
+    "Verification succeeded for blk_{block}",
+    "Deleting block blk_{block} file /mnt/hadoop/dfs/data/current/subdir{n}/blk_{block}",
+    "10.250.{a}.{b}:50010:Got exception while serving blk_{block} to /10.251.{a}.{b}:",
+]
+
+
+def read_hdfs(path):
+    with open(path, newline="") as f:
+        return [row["Content"] for row in csv.DictReader(f)]
+
+
+def synthetic_hdfs(lines, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(HDFS_TEMPLATES).format(block=rng.randint(-(1 << 62), 1 << 62), a=rng.randint(0, 255),
+                                              b=rng.randint(0, 255), port=rng.randint(1024, 65535),
+                                              size=rng.randint(1, 1 << 26), n=rng.randint(0, 63))
+            for _ in range(lines)]
+
+
+def simulated_classifier(call_ms, line_ms):
+    def classify_lines(lines):
+        time.sleep((call_ms + line_ms * len(lines)) / 1000.0)
+        return [("POSITIVE", 0.9) if "exception" in line.lower() else ("NEGATIVE", 0.8) for line in lines]
+    return classify_lines
+
+
+def replay(classify, lines, batch_size):
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(lines), batch_size):
+        results += classify(lines[i:i + batch_size])
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--synthetic", type=int, default=100000, help="lines to generate when --csv is missing")
+    parser.add_argument("--backend", choices=["simulated", "model"], default="simulated")
+    parser.add_argument("--call-ms", type=float, default=4.0)
+    parser.add_argument("--line-ms", type=float, default=0.3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--baseline-lines", type=int, default=5000, help="lines classified without the cache")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--ttl", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.csv):
+        lines = read_hdfs(args.csv)
+        source = args.csv
+    else:
+        lines = synthetic_hdfs(args.synthetic)
+        source = f"{len(lines)} synthetic HDFS lines ({args.csv} not found)"
+
+    if args.backend == "model":
+        from ids.host_ids.model_inference import classify_log_lines
+    else:
+        classify_log_lines = simulated_classifier(args.call_ms, args.line_ms)
+
+    cached = CachedClassifier(classify_log_lines, TemplateCache(args.cache_size, args.ttl))
+    cached_results, cached_seconds = replay(cached, lines, args.batch_size)
+
+    baseline = lines[:args.baseline_lines]
+    baseline_results, baseline_seconds = replay(classify_log_lines, baseline, args.batch_size)
+    uncached_seconds = baseline_seconds * len(lines) / len(baseline)
+    disagreements = sum(a[0] != b[0] for a, b in zip(cached_results, baseline_results))
+
+    print(f"Replayed {source}")
+    print(f"Lines {len(lines)}, templates {len(set(map(log_template, lines)))}, "
+          f"model lines {cached.model_lines}, hit rate {cached.hit_rate:.2%}, "
+          f"evictions {cached.cache.evictions}")
+    print(f"Uncached {uncached_seconds:.2f}s (extrapolated from {len(baseline)} lines), "
+          f"cached {cached_seconds:.2f}s -> {uncached_seconds / cached_seconds:.1f}x speedup")
+    print(f"Cached verdict differs from the line's own verdict on {disagreements}/{len(baseline)} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Inference backends for the host IDS log classifier, selected by
+`inference_backend` in config.yaml.
+
+pytorch
+    The HuggingFace text-classification pipeline on the fine-tuned
+    checkpoint (model_path). Needs torch and transformers.
+onnx
+    The int8 dynamically quantized ONNX export written by
+    train/export_onnx.py (onnx_model_dir), run by onnxruntime. Tokenization
+    uses the standalone `tokenizers` library, so neither torch nor
+    transformers is imported. Token IDs are kept in an LRU keyed by line, so
+    lines repeated across batches are tokenized once. Each batch is padded
+    to its longest line.
+
+Both backends expose classify_line(line) and classify_lines(lines),
+returning (label, score) with the same softmax/argmax/id2label semantics as
+the pipeline; so does model_server.RemoteBackend, which forwards batches to
+a shared model server.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from ids.host_ids.template_cache import TemplateCache
+
+MAX_LENGTH = 128
+BACKENDS = ("pytorch", "onnx")
+
+
+class PytorchBackend:
+    """HuggingFace pipeline on the PyTorch checkpoint."""
+
+    def __init__(self, model_path, max_length=MAX_LENGTH):
+        import torch
+        from transformers import pipeline
+
+        self.torch = torch
+        self.max_length = max_length
+        self.classifier = pipeline("text-classification", model=model_path, framework="pt")
+
+    def classify_line(self, line):
+        result = self.classifier(line, truncation=True, max_length=self.max_length)[0]
+        return result["label"], result["score"]
+
+    def classify_lines(self, lines):
+        # One forward pass for the whole batch, padded to its longest line rather than to max_length
+        inputs = self.classifier.tokenizer(list(lines), padding="longest", truncation=True,
+                                           max_length=self.max_length, return_tensors="pt")
+        with self.torch.inference_mode():
+            probs = self.torch.softmax(self.classifier.model(**inputs).logits, dim=-1)
+        scores, label_ids = probs.max(dim=-1)
+        id2label = self.classifier.model.config.id2label
+        return [(id2label[i], s) for i, s in zip(label_ids.tolist(), scores.tolist())]
+
+
+class OnnxBackend:
+    """onnxruntime session over the exported model, with cached tokenization."""
+
+    def __init__(self, model_dir, model_file="model.int8.onnx", max_length=MAX_LENGTH, threads=0,
+                 token_cache_size=4096):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        with open(os.path.join(model_dir, "config.json")) as f:
+            self.id2label = {int(i): label for i, label in json.load(f)["id2label"].items()}
+        self.token_cache = TemplateCache(token_cache_size, ttl_seconds=float("inf"))
+
+    def _token_ids(self, lines):
+        ids = {line: self.token_cache.get(line) for line in dict.fromkeys(lines)}
+        missing = [line for line, cached in ids.items() if cached is None]
+        if missing:
+            for line, encoding in zip(missing, self.tokenizer.encode_batch(missing)):
+                ids[line] = np.asarray(encoding.ids, np.int64)
+                self.token_cache.put(line, ids[line])
+        return [ids[line] for line in lines]
+
+    def classify_lines(self, lines):
+        token_ids = self._token_ids(list(lines))
+        width = max(len(ids) for ids in token_ids)
+        input_ids = np.full((len(token_ids), width), self.pad_id, np.int64)
+        attention_mask = np.zeros((len(token_ids), width), np.int64)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        logits = self.session.run(["logits"], feeds)[0]
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        label_ids = probs.argmax(axis=1)
+        return [(self.id2label[int(i)], float(probs[row, i])) for row, i in enumerate(label_ids)]
+
+    def classify_line(self, line):
+        return self.classify_lines([line])[0]
+
+
+def load_backend(config):
+    """Build the backend named by config["inference_backend"] (default pytorch)."""
+    backend = config.get("inference_backend", "pytorch")
+    if backend == "pytorch":
+        return PytorchBackend(config["model_path"])
+    if backend == "onnx":
+        return OnnxBackend(config["onnx_model_dir"], config.get("onnx_model_file", "model.int8.onnx"),
+                           threads=config.get("onnx_threads", 0))
+    raise ValueError(f"Unknown inference_backend '{backend}'. Use one of {BACKENDS}.")
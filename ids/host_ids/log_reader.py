@@ -0,0 +1,389 @@
+"""
+Event-driven, resumable log sources for the host IDS monitor.
+
+MultiplexedReader runs one selectors loop over every source. Pipes and
+sockets are registered with the selector and read only when they have data.
+Regular files cannot be polled that way and are checked every poll_interval
+seconds. Each read drains at most one chunk per source, so a busy source
+cannot starve a quiet one, and a quiet source never blocks the others.
+
+Lines go to a submit(source_name, line, cursor, fields) callback. fields
+holds structured journal metadata (unit, pid, priority, identifier) so
+rule-based prefilters such as FieldPrefilter can skip low-risk units before
+the classifier; it is None for plain-text sources. When that blocks,
+e.g. on a full classifier queue, the loop stops reading. The pipes then fill
+and journalctl/the file tail pause, which gives end-to-end backpressure
+without unbounded buffering.
+
+Cursors (a journal __CURSOR, or a file's inode and byte offset) are stored
+by CursorStore once the line has been handled. After a restart every source
+resumes after the last handled line instead of replaying the last log_lines
+entries.
+
+Sources:
+    JournalSource         journalctl -o json -f [--user], resumed with --after-cursor
+    NativeJournalSource   sd-journal via python-systemd (optional dependency), read in
+                          batches without a subprocess and resumed with seek_cursor
+    FileSource            appended-to text file, following rotation
+    UDPSource             syslog-style datagrams (no cursor)
+"""
+
+import json
+import os
+import selectors
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+READ_CHUNK = 65536
+
+
+class CursorStore:
+    """Thread-safe source -> cursor map persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.cursors = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.cursors = json.load(f)
+
+    def get(self, name):
+        return self.cursors.get(name)
+
+    def update(self, name, cursor):
+        if cursor is None:
+            return
+        with self._lock:
+            self.cursors[name] = cursor
+            self._dirty = True
+
+    def save(self):
+        """Write the cursors atomically if any changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self.cursors)
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+
+class _LineBuffer:
+    def __init__(self):
+        self.pending = b""
+
+    def split(self, data):
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        return lines
+
+
+def format_journal_entry(entry):
+    """Render a journal entry (journalctl JSON or python-systemd dict) like `journalctl -o short-iso`."""
+    message = entry.get("MESSAGE", "")
+    if isinstance(message, (list, bytes)):
+        # Non-UTF-8 messages are exported as byte arrays
+        message = bytes(message).decode("utf-8", errors="replace")
+    timestamp = entry.get("__REALTIME_TIMESTAMP", 0)
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.astimezone()
+    else:
+        timestamp = datetime.fromtimestamp(int(timestamp) / 1e6).astimezone()
+    identifier = entry.get("SYSLOG_IDENTIFIER") or entry.get("_COMM", "")
+    pid = f"[{entry['_PID']}]" if entry.get("_PID") else ""
+    return f"{timestamp.strftime('%Y-%m-%dT%H:%M:%S%z')} {entry.get('_HOSTNAME', '')} {identifier}{pid}: {message}"
+
+
+def journal_fields(entry):
+    """Structured fields handed to prefilters alongside the rendered line."""
+    priority = entry.get("PRIORITY")
+    return {
+        "unit": entry.get("_SYSTEMD_UNIT") or entry.get("_SYSTEMD_USER_UNIT"),
+        "identifier": entry.get("SYSLOG_IDENTIFIER") or entry.get("_COMM"),
+        "pid": int(entry["_PID"]) if entry.get("_PID") else None,
+        "priority": int(priority) if priority is not None else None,
+    }
+
+
+class JournalSource:
+    """Follow the system or user journal (or journal files) through journalctl's JSON output."""
+
+    selectable = True
+
+    def __init__(self, name, user=False, cursor=None, initial_lines=500, files=None, follow=True):
+        self.name = name
+        command = ["journalctl", "-o", "json"]
+        if user:
+            command.append("--user")
+        for path in files or []:
+            command += ["--file", path]
+        if follow:
+            command.append("-f")
+        if cursor:
+            command += ["--after-cursor", cursor]
+        elif follow:
+            command += ["-n", str(initial_lines)]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        os.set_blocking(self.process.stdout.fileno(), False)
+        self._buffer = _LineBuffer()
+
+    def fileno(self):
+        return self.process.stdout.fileno()
+
+    def read(self):
+        """Complete (line, cursor, fields) entries available now, or None at end of stream."""
+        try:
+            data = os.read(self.fileno(), READ_CHUNK)
+        except BlockingIOError:
+            return []
+        if not data:
+            return None
+        lines = []
+        for raw in self._buffer.split(data):
+            if not raw:
+                continue
+            entry = json.loads(raw)
+            lines.append((format_journal_entry(entry), entry["__CURSOR"], journal_fields(entry)))
+        return lines
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+class NativeJournalSource:
+    """Read the journal in-process through python-systemd, batch_size entries per read."""
+
+    def __init__(self, name, user=False, cursor=None, initial_lines=500, files=None, follow=True, batch_size=256):
+        from systemd import journal
+
+        self.name = name
+        self.follow = follow
+        self.selectable = follow
+        self.batch_size = batch_size
+        if files:
+            self.reader = journal.Reader(files=files)
+        else:
+            self.reader = journal.Reader(flags=journal.CURRENT_USER if user else journal.SYSTEM)
+        if cursor:
+            self.reader.seek_cursor(cursor)
+            # seek_cursor positions on the last handled entry itself; step over it
+            entry = self.reader.get_next()
+            if entry and entry.get("__CURSOR") != cursor:
+                self.reader.get_previous()
+        elif follow:
+            self.reader.seek_tail()
+            self.reader.get_previous(initial_lines)
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def read(self):
+        """Up to batch_size (line, cursor, fields) entries, or None once a non-following reader is exhausted."""
+        if self.follow:
+            # Acknowledge the wakeup so the journal fd stops polling readable
+            self.reader.process()
+        lines = []
+        for _ in range(self.batch_size):
+            entry = self.reader.get_next()
+            if not entry:
+                break
+            lines.append((format_journal_entry(entry), entry["__CURSOR"], journal_fields(entry)))
+        if not lines and not self.follow:
+            return None
+        return lines
+
+    def close(self):
+        self.reader.close()
+
+
+class FileSource:
+    """Tail a text file from a saved {inode, offset} cursor, reopening it on rotation or truncation."""
+
+    selectable = False
+
+    def __init__(self, name, path, cursor=None):
+        self.name = name
+        self.path = path
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._buffer = _LineBuffer()
+        self._open(cursor)
+
+    def _open(self, cursor=None):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offset = cursor["offset"] if cursor and cursor.get("inode") == self._inode else 0
+        self._file.seek(self._offset)
+        self._buffer = _LineBuffer()
+
+    def read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        rotated = self._file is not None and stat.st_ino != self._inode
+        truncated = not rotated and stat.st_size < self._offset
+        # After a rotation, finish the old file before following the new one
+        data = self._file.read(READ_CHUNK) if self._file is not None and not truncated else b""
+        if not data and (self._file is None or rotated or truncated):
+            self._open()
+            if self._file is None:
+                return []
+            data = self._file.read(READ_CHUNK)
+        lines = []
+        for raw in self._buffer.split(data):
+            self._offset += len(raw) + 1
+            lines.append((raw.decode("utf-8", errors="replace"), {"inode": self._inode, "offset": self._offset}, None))
+        return lines
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class UDPSource:
+    """Receive newline-separated log lines as UDP datagrams (e.g. rsyslog forwarding)."""
+
+    selectable = True
+
+    def __init__(self, name, host="127.0.0.1", port=5514):
+        self.name = name
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def read(self):
+        try:
+            data = self.socket.recv(READ_CHUNK)
+        except BlockingIOError:
+            return []
+        return [(line.decode("utf-8", errors="replace"), None, None) for line in data.splitlines() if line]
+
+    def close(self):
+        self.socket.close()
+
+
+class FieldPrefilter:
+    """Skip journal entries from low-risk units or with a priority less severe than max_priority."""
+
+    def __init__(self, skip_units=(), max_priority=7):
+        self.skip_units = set(skip_units)
+        self.max_priority = max_priority
+        self.skipped = 0
+
+    def skip(self, fields):
+        if not fields:
+            return False
+        priority = fields.get("priority")
+        if fields.get("unit") in self.skip_units or (priority is not None and priority > self.max_priority):
+            self.skipped += 1
+            return True
+        return False
+
+
+def build_sources(config, cursors):
+    """Journal sources (journal_backend: journalctl or native) plus any extra `log_sources` from config.yaml."""
+    initial_lines = config.get("log_lines", 500)
+    backend = config.get("journal_backend", "journalctl")
+    if backend == "native":
+        def journal_source(name, user):
+            return NativeJournalSource(name, user=user, cursor=cursors.get(name), initial_lines=initial_lines,
+                                       batch_size=config.get("journal_batch_size", 256))
+    elif backend == "journalctl":
+        def journal_source(name, user):
+            return JournalSource(name, user=user, cursor=cursors.get(name), initial_lines=initial_lines)
+    else:
+        raise ValueError(f"Unknown journal_backend '{backend}'. Use 'journalctl' or 'native'.")
+    sources = [journal_source("journal-user", True), journal_source("journal-system", False)]
+    for spec in config.get("log_sources") or []:
+        name = spec.get("name") or f"{spec['type']}:{spec.get('path') or spec.get('port')}"
+        if spec["type"] == "file":
+            sources.append(FileSource(name, spec["path"], cursor=cursors.get(name)))
+        elif spec["type"] == "udp":
+            sources.append(UDPSource(name, spec.get("host", "127.0.0.1"), spec["port"]))
+        else:
+            raise ValueError(f"Unknown log source type '{spec['type']}'. Use 'file' or 'udp'.")
+    return sources
+
+
+class MultiplexedReader:
+    """Single-threaded selectors loop feeding lines from every source to submit()."""
+
+    def __init__(self, sources, submit, cursors=None, poll_interval=0.5, checkpoint_interval=5.0):
+        self.sources = list(sources)
+        self.submit = submit
+        self.cursors = cursors
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self._selector = selectors.DefaultSelector()
+        self._polled = []
+        self._stop = threading.Event()
+        for source in self.sources:
+            if source.selectable:
+                self._selector.register(source, selectors.EVENT_READ)
+            else:
+                self._polled.append(source)
+
+    def _drain(self, source):
+        lines = source.read()
+        if lines is None:
+            if source.selectable:
+                self._selector.unregister(source)
+            else:
+                self._polled.remove(source)
+            source.close()
+            self.sources.remove(source)
+            return False
+        for line, cursor, fields in lines:
+            self.submit(source.name, line, cursor, fields)
+        return bool(lines)
+
+    def run(self):
+        """Read until stop() is called or every source has ended."""
+        last_checkpoint = time.monotonic()
+        backlog = []
+        while not self._stop.is_set() and self.sources:
+            # Sources that just returned data may hold more (a partly read file, a journal batch),
+            # so they are read again straight away instead of waiting for the next wakeup
+            timeout = 0 if backlog else self.poll_interval
+            if self._selector.get_map():
+                ready = [key.fileobj for key, _ in self._selector.select(timeout=timeout)]
+            else:
+                ready = []
+                self._stop.wait(timeout)
+            due = dict.fromkeys(ready + backlog + self._polled)
+            backlog = [source for source in due if self._drain(source)]
+            if self.cursors is not None and time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                self.cursors.save()
+                last_checkpoint = time.monotonic()
+        if self.cursors is not None:
+            self.cursors.save()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        for source in self.sources:
+            source.close()
+        self._selector.close()
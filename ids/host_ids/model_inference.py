@@ -1,27 +1,86 @@
+"""
+Process-wide, lazily loaded host IDS classifier.
+
+Importing this module is cheap: config.yaml is read and the model is built
+on first use (get_backend(), warm_up() or the first classify call), once
+per process, behind a lock. warm_up() loads the model and runs one
+inference, so the first real log line does not pay for lazy
+initialisation inside the backend.
+
+When `model_server_socket` is set and a model server (model_server.py) is
+listening there, the process sends its batches to that server instead of
+loading its own copy. Several monitors and tools then share one model.
+When the socket is not there, the model is loaded locally.
+"""
+
 import os
+import sys
+import threading
+import time
 os.environ["TRANSFORMERS_NO_TF"] = "1"  # <-- Must be set before transformers is imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from transformers import pipeline
 import yaml
 
-config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
-with open(config_path) as f:
-    config = yaml.safe_load(f)
+WARMUP_LINES = [
+    "Error: BlockManager failed to remove block",
+    "Receiving block blk_-1608999687919862906 src: /10.250.19.102:54106",
+]
+
+_config = None
+_backend = None
+_lock = threading.Lock()
 
-model_path = config["model_path"]
-alert_threshold = config["alert_threshold"]
+def load_config():
+    # HOST_IDS_CONFIG points tools and benchmarks at another config.yaml
+    global _config
+    if _config is None:
+        config_path = os.environ.get("HOST_IDS_CONFIG", os.path.join(os.path.dirname(__file__), "config.yaml"))
+        with open(config_path) as f:
+            _config = yaml.safe_load(f)
+    return _config
 
-classifier = pipeline("text-classification", model=model_path, framework="pt")
+def _create_backend(config):
+    socket_path = config.get("model_server_socket")
+    if socket_path and os.path.exists(socket_path):
+        from ids.host_ids.model_server import RemoteBackend
+        try:
+            backend = RemoteBackend(socket_path)
+            backend.connect()
+            print(f"Using model server at {socket_path}")
+            return backend
+        except OSError as e:
+            print(f"Model server at {socket_path} unavailable ({e}), loading the model locally")
+    from ids.host_ids.inference_backends import load_backend
+    return load_backend(config)
+
+def get_backend():
+    """The process-wide backend, built on first call."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _create_backend(load_config())
+    return _backend
+
+def warm_up():
+    """Load the model and run one batch; returns the seconds it took."""
+    start = time.perf_counter()
+    get_backend().classify_lines(WARMUP_LINES)
+    return time.perf_counter() - start
 
 def classify_log_line(log_line):
-    result = classifier(log_line, truncation=True, max_length=128)[0]
-    label = result['label']
-    score = result['score']
+    label, score = get_backend().classify_line(log_line)
     return label, score
 
+def classify_log_lines(log_lines):
+    return get_backend().classify_lines(log_lines)
+
 if __name__ == "__main__":
-    print("Device set to use cpu")
+    print(f"Inference backend: {load_config().get('inference_backend', 'pytorch')}, warm-up {warm_up():.2f}s")
     test_line = "Error: BlockManager failed to remove block"
     label, score = classify_log_line(test_line)
     print(f"Log line classified as: {label} with score: {score:.4f}")
-
+    batch = [test_line, "Receiving block blk_-1608999687919862906 src: /10.250.19.102:54106"]
+    for line, (label, score) in zip(batch, classify_log_lines(batch)):
+        print(f"[batch] {line} -> {label} ({score:.4f})")
@@ -0,0 +1,199 @@
+"""
+Preforked host IDS model server on a local Unix socket.
+
+The parent process loads and warms up the configured backend once, binds
+the socket and forks --workers children. The children share the loaded
+model's memory copy-on-write and accept connections from the same socket.
+Each connection is served by a thread in the worker that accepted it.
+Inference within a worker is serialised. With several workers the model is
+loaded with one intra-op thread (onnx_threads forced to 1, or
+torch.set_num_threads(1)), so workers use one core each instead of
+oversubscribing the CPU, and no thread pool is forked.
+
+Protocol: each message is a 4-byte big-endian length followed by UTF-8 JSON.
+A request is {"lines": [...]} and the response is
+{"results": [[label, score], ...]}, or {"error": "..."}. Connections are
+persistent. RemoteBackend is the client; it imports nothing beyond the
+standard library, so processes that use the server stay small.
+
+Usage:
+    python model_server.py --socket /run/host_ids/model.sock --workers 2
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+HEADER = struct.Struct(">I")
+MAX_MESSAGE = 64 * 2 ** 20
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """Next JSON message, or None when the peer closed the connection."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE:
+        raise ValueError(f"Message of {size} bytes exceeds the {MAX_MESSAGE} byte limit")
+    data = _recv_exact(sock, size)
+    return None if data is None else json.loads(data)
+
+
+class RemoteBackend:
+    """Client for model_server.py; one persistent connection, reconnected once on failure."""
+
+    def __init__(self, socket_path, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._socket = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(self.timeout)
+        self._socket.connect(self.socket_path)
+
+    def _request(self, lines):
+        if self._socket is None:
+            self.connect()
+        send_message(self._socket, {"lines": lines})
+        response = recv_message(self._socket)
+        if response is None:
+            raise ConnectionError(f"Model server at {self.socket_path} closed the connection")
+        return response
+
+    def classify_lines(self, lines):
+        lines = list(lines)
+        with self._lock:
+            try:
+                response = self._request(lines)
+            except OSError:
+                self.close()
+                response = self._request(lines)
+        if "error" in response:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return [(label, score) for label, score in response["results"]]
+
+    def classify_line(self, line):
+        return self.classify_lines([line])[0]
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def serve_connection(connection, backend, lock):
+    with connection:
+        while True:
+            try:
+                request = recv_message(connection)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            try:
+                with lock:
+                    results = backend.classify_lines(request["lines"])
+                send_message(connection, {"results": [[label, float(score)] for label, score in results]})
+            except OSError:
+                return
+            except Exception as e:
+                send_message(connection, {"error": str(e)})
+
+
+def worker_loop(listener, backend):
+    lock = threading.Lock()
+    while True:
+        connection, _ = listener.accept()
+        threading.Thread(target=serve_connection, args=(connection, backend, lock), daemon=True).start()
+
+
+def serve(config, socket_path, workers=1):
+    from ids.host_ids.inference_backends import load_backend
+
+    start = time.perf_counter()
+    if workers > 1:
+        # Thread pools created before fork() do not survive in the children
+        config = {**config, "onnx_threads": 1}
+        if config.get("inference_backend", "pytorch") == "pytorch":
+            import torch
+            torch.set_num_threads(1)
+    backend = load_backend(config)
+    backend.classify_lines(["Receiving block blk_-1608999687919862906 src: /10.250.19.102:54106"])
+    print(f"Model loaded and warmed up in {time.perf_counter() - start:.2f}s")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o660)
+    listener.listen(128)
+    print(f"Model server listening on {socket_path} with {workers} worker(s)")
+
+    if workers <= 1:
+        try:
+            worker_loop(listener, backend)
+        finally:
+            os.unlink(socket_path)
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            worker_loop(listener, backend)
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    from ids.host_ids.model_inference import load_config
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=config.get("model_server_socket") or "/tmp/host_ids_model.sock")
+    parser.add_argument("--workers", type=int, default=config.get("model_server_workers", 1))
+    args = parser.parse_args()
+    serve(config, args.socket, args.workers)
+
+
+if __name__ == "__main__":
+    main()
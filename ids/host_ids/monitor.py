@@ -2,41 +2,91 @@ import sys
 import os
 os.environ["USE_TF"] = "0"
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-import subprocess
-import time
-from ids.host_ids.model_inference import classify_log_line
-from ids.host_ids.prometheus_exporter import export_alert, start_exporter_server
+from ids.host_ids.batch_classifier import BatchingClassifier
+from ids.host_ids.log_reader import CursorStore, FieldPrefilter, MultiplexedReader, build_sources
+from ids.host_ids.model_inference import classify_log_lines, warm_up
+from ids.host_ids.prometheus_exporter import export_alert, export_batch, export_template_lookup, start_exporter_server
+from ids.host_ids.template_cache import CachedClassifier, TemplateCache
 import yaml
 
 config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
 with open(config_path) as f:
     config = yaml.safe_load(f)
 
+def handle_verdict(source, line, cursor, fields, future, cursors, stalled):
+    try:
+        label, score = future.result()
+    except Exception as e:
+        # Hold this source's cursor before the unclassified line for the rest of the run, so a restart
+        # reads it (and everything after it) again instead of silently skipping it
+        print(f"[ERROR] Could not classify log line ({source}): {line.strip()} ({e!r})")
+        stalled.add(source)
+        return
+    if label == "POSITIVE" and score > config["alert_threshold"]:
+        unit = f", {fields['unit']}" if fields and fields.get("unit") else ""
+        print(f"[ALERT] Suspicious log line ({source}{unit}): {line.strip()} ({score:.2f})")
+        export_alert()
+    # Verdicts resolve in submission order, so the stored cursor only ever moves past handled lines
+    if source not in stalled:
+        cursors.update(source, cursor)
+
 def monitor_logs():
     start_exporter_server()
+    # Load the model (or connect to the model server) before reading logs, with /metrics already up
+    print(f"Classifier ready in {warm_up():.2f}s")
     print("Host-based IDS started. Monitoring logs from both user and system journals...")
 
-    commands = [
-        ['journalctl', '--user', '-o', 'short-iso', '-n', str(config["log_lines"]), '-f'],
-        ['journalctl', '-o', 'short-iso', '-n', str(config["log_lines"]), '-f']
-    ]
+    template_cache = TemplateCache(config.get("template_cache_size", 10000),
+                                   config.get("template_cache_ttl_seconds", 3600))
+    classify_lines = classify_log_lines
+    if config.get("cascade_enabled"):
+        from ids.host_ids.prefilter import CascadeClassifier, LinearPrefilter
+        prefilter = LinearPrefilter.load(config["cascade_model_path"])
+        classify_lines = CascadeClassifier(prefilter, classify_log_lines, low=config.get("cascade_low", 0.1),
+                                           high=config.get("cascade_high"))
+    classifier = BatchingClassifier(
+        CachedClassifier(classify_lines, template_cache, on_lookup=export_template_lookup),
+        max_batch=config.get("batch_max_size", 32),
+        max_delay_ms=config.get("batch_max_delay_ms", 20),
+        max_queue=config.get("classifier_queue_size", 10000),
+        on_batch=export_batch,
+    )
+
+    cursors = CursorStore(os.path.join(os.path.dirname(__file__), config.get("cursor_path", "log_cursors.json")))
+    sources = build_sources(config, cursors)
+    print(f"Reading {len(sources)} log sources: {', '.join(source.name for source in sources)}")
+
+    prefilter = FieldPrefilter(config.get("prefilter_skip_units") or [], config.get("prefilter_max_priority", 7))
+    pending = {}
+    stalled = set()
 
-    processes = [
-        subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
-        for cmd in commands
-    ]
+    def advance(source, cursor):
+        if source not in stalled:
+            cursors.update(source, cursor)
 
-    while True:
-        for process in processes:
-            line = process.stdout.readline()
-            if not line:
-                continue
-            label, score = classify_log_line(line)
-            if label == "POSITIVE" and score > config["alert_threshold"]:
-                print(f"[ALERT] Suspicious log line: {line.strip()} ({score:.2f})")
-                export_alert()
+    def submit(source, line, cursor, fields):
+        if prefilter.skip(fields):
+            # Advance past skipped entries only once the lines queued before them are handled
+            previous = pending.get(source)
+            if previous is None or previous.done():
+                advance(source, cursor)
+            else:
+                previous.add_done_callback(lambda f: advance(source, cursor))
+            return
+        future = classifier.submit(line)
+        future.add_done_callback(lambda f: handle_verdict(source, line, cursor, fields, f, cursors, stalled))
+        pending[source] = future
+
+    reader = MultiplexedReader(sources, submit, cursors)
+    try:
+        reader.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        classifier.close()
+        cursors.save()
+        reader.close()
 
 
 if __name__ == "__main__":
     monitor_logs()
-
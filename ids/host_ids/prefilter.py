@@ -0,0 +1,107 @@
+"""
+Hashed n-gram linear prefilter and two-stage cascade for the host IDS.
+
+LinearPrefilter scores a line with logistic regression over hashed word
+1-2-grams of its log template (see template_cache.log_template), so block
+IDs, IPs and numbers do not fragment the features. Hashing needs no
+vocabulary; the artifact is one .npz with the weight vector and the
+vectorizer settings. Scoring costs microseconds per line.
+
+CascadeClassifier runs the prefilter on every line:
+- score < low: benign, answered by the prefilter;
+- score >= high (when set): attack, answered by the prefilter;
+- anything in between escalates to the transformer (classify_lines).
+
+low/high set the operating point; train/evaluate_model.py --cascade reports
+escalation rate, lines/s and F1 against transformer-only for a range of low
+values.
+"""
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from ids.host_ids.template_cache import log_template
+
+FORMAT_VERSION = 1
+
+
+def _normalize(line):
+    return log_template(line).lower()
+
+
+def hashing_vectorizer(n_features=2 ** 18, ngram_range=(1, 2)):
+    return HashingVectorizer(n_features=n_features, ngram_range=tuple(ngram_range), preprocessor=_normalize,
+                             token_pattern=r"[^\s:=,()\[\]]+", alternate_sign=False, norm="l2")
+
+
+class LinearPrefilter:
+    """Logistic regression over hashed template n-grams."""
+
+    def __init__(self, coef, intercept, n_features=2 ** 18, ngram_range=(1, 2)):
+        self.coef = np.asarray(coef, np.float32)
+        self.intercept = float(intercept)
+        self.n_features = int(n_features)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.vectorizer = hashing_vectorizer(self.n_features, self.ngram_range)
+
+    @classmethod
+    def train(cls, lines, labels, n_features=2 ** 18, ngram_range=(1, 2), alpha=1e-6, epochs=20, seed=42):
+        """Fit on raw log lines and 0/1 attack labels."""
+        from sklearn.linear_model import SGDClassifier
+
+        features = hashing_vectorizer(n_features, ngram_range).transform(lines)
+        model = SGDClassifier(loss="log_loss", alpha=alpha, max_iter=epochs, tol=None, random_state=seed)
+        model.fit(features, np.asarray(labels))
+        return cls(model.coef_.ravel(), model.intercept_[0], n_features, ngram_range)
+
+    def save(self, path):
+        np.savez(path, format_version=np.array(FORMAT_VERSION), coef=self.coef, intercept=np.array(self.intercept),
+                 n_features=np.array(self.n_features), ngram_range=np.array(self.ngram_range))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(artifact["coef"], artifact["intercept"], artifact["n_features"], artifact["ngram_range"])
+
+    def predict(self, lines):
+        """Attack probability per line, float64 array."""
+        logits = self.vectorizer.transform(lines) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class CascadeClassifier:
+    """Answers confident lines with the prefilter and escalates the rest to classify_lines."""
+
+    def __init__(self, prefilter, classify_lines, low=0.1, high=None, positive_label="POSITIVE",
+                 negative_label="NEGATIVE"):
+        self.prefilter = prefilter
+        self.classify_lines = classify_lines
+        self.low = low
+        self.high = high
+        self.positive_label = positive_label
+        self.negative_label = negative_label
+        self.lines = 0
+        self.escalated = 0
+
+    @property
+    def escalation_rate(self):
+        return self.escalated / self.lines if self.lines else 0.0
+
+    def __call__(self, lines):
+        """(label, score) per line, in order."""
+        lines = list(lines)
+        scores = self.prefilter.predict(lines)
+        results = [(self.negative_label, 1.0 - score) for score in scores.tolist()]
+        escalate = scores >= self.low
+        if self.high is not None:
+            confident = scores >= self.high
+            for i in np.flatnonzero(confident):
+                results[i] = (self.positive_label, float(scores[i]))
+            escalate &= ~confident
+        indices = np.flatnonzero(escalate)
+        if indices.size:
+            for i, result in zip(indices, self.classify_lines([lines[i] for i in indices])):
+                results[i] = result
+        self.lines += len(lines)
+        self.escalated += int(indices.size)
+        return results
@@ -1,10 +1,31 @@
-from prometheus_client import start_http_server, Counter
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 
 alert_counter = Counter('host_ids_alerts_total', 'Number of alerts triggered by host-based IDS')
+lines_counter = Counter('host_ids_log_lines_total', 'Number of log lines classified by host-based IDS')
+queue_depth_gauge = Gauge('host_ids_classifier_queue_depth', 'Log lines waiting for the classifier')
+batch_size_histogram = Histogram('host_ids_classifier_batch_size', 'Log lines per classifier forward pass',
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+batch_unique_histogram = Histogram('host_ids_classifier_batch_unique_lines',
+                                   'Distinct log lines per classifier forward pass after deduplication',
+                                   buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+batch_latency_histogram = Histogram('host_ids_classifier_batch_seconds', 'Classifier forward pass duration')
+template_hits_counter = Counter('host_ids_template_cache_hits_total', 'Log lines answered from the template cache')
+template_misses_counter = Counter('host_ids_template_cache_misses_total',
+                                  'Log lines with a novel template sent to the classifier')
 
 def export_alert():
     alert_counter.inc()
 
+def export_batch(batch_size, unique_lines, queue_depth, seconds):
+    lines_counter.inc(batch_size)
+    batch_size_histogram.observe(batch_size)
+    batch_unique_histogram.observe(unique_lines)
+    queue_depth_gauge.set(queue_depth)
+    batch_latency_histogram.observe(seconds)
+
+def export_template_lookup(hits, misses):
+    template_hits_counter.inc(hits)
+    template_misses_counter.inc(misses)
+
 def start_exporter_server(port=9102):
     start_http_server(port)
-
@@ -0,0 +1,124 @@
+"""
+Log-template cache in front of the host IDS classifier.
+
+log_template() masks the variable parts of a log line (journal timestamp
+prefix, HDFS block IDs, IPv4 addresses with ports, hex values and numbers),
+so lines differing only in those fields share one template, e.g.
+
+    Receiving block blk_-1608999687919862906 src: /10.250.19.102:54106
+    -> Receiving block blk_<*> src: /<IP>
+
+CachedClassifier maps each line of a batch to its template. It looks the
+template up in a TemplateCache (bounded LRU with a TTL), and sends only lines
+with novel templates to the model, one representative line per template.
+The cached verdict of the first line seen for a template is reused for every
+later line with that template until it expires or is evicted.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+MASKS = [
+    (re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:?\d{2}|Z)?\s+"), ""),
+    (re.compile(r"blk_-?\d+"), "blk_<*>"),
+    (re.compile(r"\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?"), "<IP>"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "<HEX>"),
+    (re.compile(r"\d+(?:\.\d+)*"), "<*>"),
+]
+
+
+def log_template(line):
+    """Template of a log line with its variable fields masked."""
+    line = line.strip()
+    for pattern, replacement in MASKS:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+class TemplateCache:
+    """Thread-safe LRU of template -> classifier result, with per-entry expiry."""
+
+    def __init__(self, max_size=10000, ttl_seconds=3600.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, template):
+        """Cached result for template, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(template)
+            if entry is not None and entry[1] > self.clock():
+                self._entries.move_to_end(template)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[template]
+            self.misses += 1
+            return None
+
+    def put(self, template, result):
+        with self._lock:
+            self._entries[template] = (result, self.clock() + self.ttl)
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after the model changes."""
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedClassifier:
+    """Wraps a batch classify function so only lines with uncached templates reach the model."""
+
+    def __init__(self, classify_lines, cache=None, on_lookup=None):
+        self.classify_lines = classify_lines
+        self.cache = cache if cache is not None else TemplateCache()
+        self.on_lookup = on_lookup
+        self.lines = 0
+        self.model_lines = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of lines answered without running the model."""
+        return 1.0 - self.model_lines / self.lines if self.lines else 0.0
+
+    def __call__(self, lines):
+        """(label, score) per line, in order."""
+        templates = [log_template(line) for line in lines]
+        results = {}
+        novel = {}
+        for line, template in zip(lines, templates):
+            if template in results or template in novel:
+                continue
+            cached = self.cache.get(template)
+            if cached is None:
+                novel[template] = line
+            else:
+                results[template] = cached
+        if novel:
+            for template, result in zip(novel, self.classify_lines(list(novel.values()))):
+                self.cache.put(template, result)
+                results[template] = result
+        self.lines += len(lines)
+        self.model_lines += len(novel)
+        if self.on_lookup is not None:
+            self.on_lookup(len(lines) - len(novel), len(novel))
+        return [results[template] for template in templates]
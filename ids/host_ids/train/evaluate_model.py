@@ -1,5 +1,5 @@
-from prepare_data import prepare_dataset
-from transformers import AutoModelForSequenceClassification
+from prepare_data import SPLIT_SEED, checkpoint_split_seed, prepare_dataset
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     confusion_matrix, ConfusionMatrixDisplay
@@ -7,12 +7,31 @@ from sklearn.metrics import (
 import torch
 from collections import Counter
 import json
+import os
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
 import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+def split_caveat(model_dir):
+    # A checkpoint trained on a different (e.g. the old unseeded) split has seen part of this test split
+    seed = checkpoint_split_seed(model_dir)
+    if seed == SPLIT_SEED:
+        return None
+    trained_on = "an unseeded split" if seed is None else f"the split with seed {seed}"
+    return (f"{model_dir} was trained on {trained_on}, not the seed {SPLIT_SEED} test split evaluated here: "
+            f"some test lines were in its training data, so its F1 is optimistic and any F1 delta against it "
+            f"is unreliable. Retrain it with train.py for a clean comparison.")
 
 def evaluate_model(model_dir="bert-mini-hdfs-best", threshold=0.6, class_weight=1.5):
     model = AutoModelForSequenceClassification.from_pretrained(model_dir, local_files_only=True)
+    caveat = split_caveat(model_dir)
+    if caveat:
+        print(f"WARNING: {caveat}")
     dataset = prepare_dataset()  # loads tokenized train/test splits with labels
 
     train_dataset = dataset["train"]
@@ -52,7 +71,8 @@ def evaluate_model(model_dir="bert-mini-hdfs-best", threshold=0.6, class_weight=
         "true_positive": int(tp),
         "false_positive": int(fp),
         "true_negative": int(tn),
-        "false_negative": int(fn)
+        "false_negative": int(fn),
+        "split_caveat": caveat
     }
 
     log_experiment(
@@ -85,13 +105,74 @@ def log_experiment(results, model_name, dataset_name, class_weight=None, thresho
         "true_negative": results["true_negative"],
         "false_negative": results["false_negative"],
         "label_distribution": label_distribution,
+        "split_caveat": results.get("split_caveat"),
     }
 
     log_file = Path("experiment_log.jsonl")
     with log_file.open("a") as f:
         f.write(json.dumps(log_entry) + "\n")
 
+def transformer_scores(model, tokenizer, lines, batch_size=32):
+    # Attack probability per raw line, batches padded to their longest line as in model_inference
+    scores = []
+    with torch.inference_mode():
+        for start in range(0, len(lines), batch_size):
+            inputs = tokenizer(lines[start:start + batch_size], padding="longest", truncation=True,
+                               max_length=128, return_tensors="pt")
+            scores.append(torch.softmax(model(**inputs).logits, dim=1)[:, 1].numpy())
+    return np.concatenate(scores) if scores else np.empty(0)
+
+def evaluate_cascade(model_dir="bert-mini-hdfs-best", prefilter_path="hdfs_prefilter.npz", threshold=0.6,
+                     lows=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3)):
+    from ids.host_ids.prefilter import LinearPrefilter
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir, local_files_only=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+    model.eval()
+    prefilter = LinearPrefilter.load(prefilter_path)
+    caveat = split_caveat(model_dir)
+
+    test_dataset = prepare_dataset(tokenize_text=False)["test"]
+    lines = list(test_dataset["Content"])
+    true_labels = np.asarray(test_dataset["label"])
+
+    start = time.perf_counter()
+    reference_preds = (transformer_scores(model, tokenizer, lines) > threshold).astype(int)
+    transformer_seconds = time.perf_counter() - start
+    reference_f1 = f1_score(true_labels, reference_preds)
+
+    start = time.perf_counter()
+    prefilter_scores = prefilter.predict(lines)
+    prefilter_seconds = time.perf_counter() - start
+
+    results = [{"low": None, "escalation_rate": 1.0, "lines_per_second": len(lines) / transformer_seconds,
+                "f1": reference_f1, "f1_delta": 0.0, "split_caveat": caveat}]
+    for low in lows:
+        escalate = np.flatnonzero(prefilter_scores >= low)
+        start = time.perf_counter()
+        escalated_scores = transformer_scores(model, tokenizer, [lines[i] for i in escalate])
+        seconds = prefilter_seconds + time.perf_counter() - start
+        preds = np.zeros(len(lines), dtype=int)
+        preds[escalate] = escalated_scores > threshold
+        f1 = f1_score(true_labels, preds)
+        results.append({"low": low, "escalation_rate": len(escalate) / len(lines),
+                        "lines_per_second": len(lines) / seconds, "f1": f1, "f1_delta": f1 - reference_f1,
+                        "split_caveat": caveat})
+
+    print(f"Prefilter alone: {len(lines) / prefilter_seconds:.0f} lines/s")
+    print(f"{'low':>8} {'escalated':>10} {'lines/s':>10} {'f1':>8} {'f1 delta':>9}")
+    for r in results:
+        low = "bert" if r["low"] is None else f"{r['low']:.2f}"
+        print(f"{low:>8} {r['escalation_rate']:>10.2%} {r['lines_per_second']:>10.0f} {r['f1']:>8.4f} "
+              f"{r['f1_delta']:>+9.4f}")
+    if caveat:
+        print(f"WARNING: {caveat}")
+    return results
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--cascade":
+        evaluate_cascade(prefilter_path=sys.argv[2] if len(sys.argv) > 2 else "hdfs_prefilter.npz")
+        sys.exit(0)
     results = evaluate_model()
     print("Evaluation Results:")
     for k, v in results.items():
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+
+# transformers reads this at import time
+os.environ["TRANSFORMERS_NO_TF"] = "1"
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+SAMPLE_LINES = [
+    "Receiving block blk_-1608999687919862906 src: /10.250.19.102:54106 dest: /10.250.19.102:50010",
+    "PacketResponder 1 for block blk_38865049064139660 terminating",
+    "10.251.194.213:50010:Got exception while serving blk_-7724713468912166542 to /10.251.203.80:",
+    "Error: BlockManager failed to remove block",
+]
+
+def export_onnx(model_dir="bert-mini-hdfs-best", output_dir="bert-mini-hdfs-onnx", opset=14, parity_lines=1000):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir, local_files_only=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+    model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tokenizer(SAMPLE_LINES, padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    torch.onnx.export(model, tuple(sample[name] for name in input_names), fp32_path, input_names=input_names,
+                      output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=opset,
+                      do_constant_folding=True)
+
+    # Int8 weights for MatMul/Gemm, activations quantized on the fly per batch
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    # tokenizer.json + config.json (id2label) are all the onnx backend needs besides the graph
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    print(f"ONNX models saved to: {fp32_path} ({os.path.getsize(fp32_path) / 2**20:.1f} MiB), "
+          f"{int8_path} ({os.path.getsize(int8_path) / 2**20:.1f} MiB)")
+
+    return check_parity(model, tokenizer, output_dir, parity_lines)
+
+def check_parity(model, tokenizer, output_dir, parity_lines=1000):
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+    from ids.host_ids.inference_backends import OnnxBackend
+
+    lines = list(SAMPLE_LINES)
+    if parity_lines:
+        from prepare_data import prepare_dataset
+        lines += list(prepare_dataset(tokenize_text=False)["test"]["Content"][:parity_lines])
+
+    results = {}
+    for model_file in ("model.onnx", "model.int8.onnx"):
+        backend = OnnxBackend(output_dir, model_file)
+        max_diff, agree = 0.0, 0
+        for start in range(0, len(lines), 32):
+            batch = lines[start:start + 32]
+            inputs = tokenizer(batch, padding="longest", truncation=True, max_length=128, return_tensors="pt")
+            with torch.inference_mode():
+                expected = torch.softmax(model(**inputs).logits, dim=-1).numpy()
+            for (label, score), probs in zip(backend.classify_lines(batch), expected):
+                predicted = int(np.argmax(probs))
+                agree += label == model.config.id2label[predicted]
+                max_diff = max(max_diff, abs(score - float(probs[predicted])))
+        results[model_file] = {"lines": len(lines), "label_agreement": agree / len(lines),
+                               "max_score_diff": max_diff}
+        print(f"{model_file}: label agreement {agree / len(lines):.4%}, max |score diff| {max_diff:.2e} "
+              f"over {len(lines)} lines")
+
+    with open(os.path.join(output_dir, "parity.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the best checkpoint to ONNX with int8 dynamic quantization")
+    parser.add_argument("--model-dir", default="bert-mini-hdfs-best")
+    parser.add_argument("--output-dir", default="bert-mini-hdfs-onnx")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--parity-lines", type=int, default=1000, help="HDFS test lines checked against PyTorch")
+    args = parser.parse_args()
+    export_onnx(args.model_dir, args.output_dir, args.opset, args.parity_lines)
@@ -1,11 +1,16 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from datasets import Dataset, DatasetDict
+import json
 import os
 from collections import Counter
 from transformers import AutoTokenizer
 from datasets import concatenate_datasets
 
+SPLIT_SEED = 42
+# Written into a trained checkpoint so evaluation can tell which train/test split it was trained on
+SPLIT_FILE = "split.json"
+
 def load_hdfs_dataset(log_path="../data/HDFS_100k.log_structured.csv", label_path="../data/anomaly_label.csv"):
     import re
 
@@ -31,7 +36,22 @@ def load_hdfs_dataset(log_path="../data/HDFS_100k.log_structured.csv", label_pat
 
 
 
-def prepare_dataset():
+def write_split_seed(model_dir, seed=SPLIT_SEED):
+    with open(os.path.join(model_dir, SPLIT_FILE), "w") as f:
+        json.dump({"split_seed": seed}, f)
+
+
+def checkpoint_split_seed(model_dir):
+    # None for checkpoints trained before the split was seeded, whose training lines overlap any seeded test split
+    path = os.path.join(model_dir, SPLIT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("split_seed")
+
+
+def prepare_dataset(seed=SPLIT_SEED, tokenize_text=True):
+    # A fixed seed keeps the test split identical across the transformer, the prefilter and evaluation
     df = load_hdfs_dataset()
     print("Label distribution:", Counter(df['label']))
 
@@ -45,7 +65,7 @@ def prepare_dataset():
     dataset = dataset.cast_column("label", class_label)
 
     # Train-test split with stratification
-    dataset = dataset.train_test_split(test_size=0.2, stratify_by_column="label")
+    dataset = dataset.train_test_split(test_size=0.2, stratify_by_column="label", seed=seed)
 
     train = dataset["train"]
     test = dataset["test"]
@@ -63,6 +83,9 @@ def prepare_dataset():
     train = Dataset.from_pandas(train_df_oversampled)
     train = train.cast_column("label", class_label)
 
+    if not tokenize_text:
+        return DatasetDict({"train": train, "test": test})
+
     tokenizer = AutoTokenizer.from_pretrained("prajjwal1/bert-mini", local_files_only=True)
     MAX_LENGTH = 128
 
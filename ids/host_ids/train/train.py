@@ -14,7 +14,7 @@ from transformers import (
     Trainer,
     EarlyStoppingCallback
 )
-from prepare_data import prepare_dataset
+from prepare_data import prepare_dataset, write_split_seed
 
 # Prevent TensorFlow import by Hugging Face
 os.environ["TRANSFORMERS_NO_TF"] = "1"
@@ -142,6 +142,7 @@ def train():
         if os.path.exists(best_model_save_path):
             shutil.rmtree(best_model_save_path)
         shutil.copytree(best_model_dir, best_model_save_path)
+        write_split_seed(best_model_save_path)
         print(f"Best model saved to: {best_model_save_path}")
     
     print("Best config:", best_config)
@@ -0,0 +1,33 @@
+import os
+import sys
+from collections import Counter
+
+from sklearn.metrics import f1_score, precision_score, recall_score
+
+from prepare_data import prepare_dataset
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from ids.host_ids.prefilter import LinearPrefilter
+
+def train_prefilter(output_path="hdfs_prefilter.npz", n_features=2 ** 18, alpha=1e-6, epochs=20):
+    # Same HDFS data and split as the transformer; text only, no tokenization needed
+    dataset = prepare_dataset(tokenize_text=False)
+    train_dataset = dataset["train"]
+    test_dataset = dataset["test"]
+    print("Train label distribution:", Counter(train_dataset["label"]))
+
+    prefilter = LinearPrefilter.train(train_dataset["Content"], train_dataset["label"],
+                                      n_features=n_features, alpha=alpha, epochs=epochs)
+    prefilter.save(output_path)
+    print(f"Prefilter saved to: {output_path}")
+
+    scores = prefilter.predict(test_dataset["Content"])
+    true_labels = test_dataset["label"]
+    for threshold in (0.1, 0.3, 0.5):
+        preds = (scores >= threshold).astype(int)
+        print(f"threshold {threshold}: precision {precision_score(true_labels, preds):.4f}, "
+              f"recall {recall_score(true_labels, preds):.4f}, f1 {f1_score(true_labels, preds):.4f}")
+    return prefilter
+
+if __name__ == "__main__":
+    train_prefilter()
@@ -0,0 +1,162 @@
+"""
+Correctness and per-core throughput of the flow-level packet labelling in
+process_pcap.process_captures.
+
+The script writes a synthetic capture of --flows bidirectional TCP/UDP/ICMP
+flows between 08:00 and 17:00 capture-site time, together with a
+CICIDS2017-style TrafficLabelling CSV for them. Labels are "BENIGN" or one
+of a few attack names. The CSV reproduces the awkward parts of the real
+files:
+- local UTC-3 timestamps;
+- day-first dates with minute resolution;
+- afternoon hours on a 12-hour clock without AM/PM.
+Some 5-tuples are reused by a later flow with a different label, and
+unlabelled ARP and UDP noise packets are mixed in.
+
+For each --workers value the capture is labelled into a CSV. Every packet's
+label is compared with the flow it was generated for, and the script
+reports packets/s, packets/s per core and packets per worker CPU-second.
+
+Usage:
+    python bench_flow_labels.py --flows 50000 --workers 1 2 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import process_pcap
+from bench_pcap_reader import ETHERNET, IPV4, MAC, RECORD, TCP, UDP
+
+LABELS = ["BENIGN"] * 8 + ["DDoS", "PortScan"]
+DAY_START = datetime(2017, 7, 7, 11, 0, tzinfo=timezone.utc)  # 08:00 at UTC-3
+DAY_SECONDS = 9 * 3600
+REUSE_GAP = 600
+
+
+def frame(proto, src, dst, sport, dport, payload):
+    if proto == 6:
+        transport = TCP.pack(sport, dport, 0, 0, 5 << 4, 0x18, 64240, 0, 0) + payload
+    elif proto == 17:
+        transport = UDP.pack(sport, dport, 8 + len(payload), 0) + payload
+    else:
+        transport = bytes([8, 0]) + bytes(6) + payload
+    ip = IPV4.pack(0x45, 0, 20 + len(transport), 0, 0, 64, proto, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return ETHERNET.pack(MAC, MAC, 0x0800) + ip + transport
+
+
+def synthetic_flows(count, rng):
+    """Flows as (proto, src, sport, dst, dport, start, [(offset, forward)], label); 5% reuse an earlier 5-tuple."""
+    flows = []
+    latest = {}
+    for _ in range(count):
+        if flows and rng.random() < 0.05:
+            # Reuse a 5-tuple REUSE_GAP seconds after its most recent flow ended
+            proto, src, sport, dst, dport, start, times, _ = latest[rng.choice(list(latest))]
+            start = start + times[-1][0] + REUSE_GAP
+            if start > DAY_SECONDS:
+                continue
+        else:
+            proto = rng.choice([6, 6, 6, 17, 1])
+            src, dst = f"192.168.10.{rng.randrange(2, 254)}", f"10.0.{rng.randrange(256)}.{rng.randrange(1, 254)}"
+            sport, dport = (0, 0) if proto == 1 else (rng.randrange(1024, 65536), rng.choice([80, 443, 53, 22]))
+            if (proto, src, sport, dst, dport) in latest:
+                continue
+            start = rng.uniform(0, DAY_SECONDS - 120)
+        offset = 0.0
+        times = []
+        for _ in range(rng.randrange(1, 20)):
+            times.append((offset, rng.random() < 0.6))
+            offset += rng.expovariate(2.0)
+        flows.append((proto, src, sport, dst, dport, start, times, rng.choice(LABELS)))
+        latest[(proto, src, sport, dst, dport)] = flows[-1]
+    return flows
+
+
+def write_capture(pcap, labels_csv, flows, rng):
+    packets = []
+    for flow_id, (proto, src, sport, dst, dport, start, times, label) in enumerate(flows):
+        for offset, forward in times:
+            packets.append((start + offset, flow_id, forward))
+    # Unlabelled noise: ARP and UDP to hosts that never appear in the label CSV
+    for _ in range(len(packets) // 20):
+        packets.append((rng.uniform(0, DAY_SECONDS), -1, rng.random() < 0.5))
+    packets.sort()
+
+    expected = []
+    with open(pcap, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for seconds, flow_id, forward in packets:
+            if flow_id < 0:
+                data = ETHERNET.pack(MAC, MAC, 0x0806) + bytes(28) if forward else \
+                    frame(17, "172.16.0.1", "172.16.0.2", 5353, 5353, bytes(20))
+                expected.append(None)
+            else:
+                proto, src, sport, dst, dport, _, _, label = flows[flow_id]
+                if not forward:
+                    src, dst, sport, dport = dst, src, dport, sport
+                data = frame(proto, src, dst, sport, dport, bytes(rng.randrange(0, 200)))
+                expected.append(label)
+            ts = DAY_START.timestamp() + seconds
+            f.write(RECORD.pack(int(ts), int(ts % 1 * 1e6), len(data), len(data)) + data)
+
+    rows = []
+    for proto, src, sport, dst, dport, start, times, label in flows:
+        local = DAY_START + timedelta(seconds=start) - timedelta(hours=3)
+        # CIC style: day first, no seconds, 12-hour clock without AM/PM
+        timestamp = f"{local.day}/{local.month}/{local.year} {(local.hour - 1) % 12 + 1}:{local.minute:02d}"
+        rows.append({"Flow ID": f"{src}-{dst}-{sport}-{dport}-{proto}", " Source IP": src, " Source Port": sport,
+                     " Destination IP": dst, " Destination Port": dport, " Protocol": proto,
+                     " Timestamp": timestamp, " Flow Duration": int(times[-1][0] * 1e6),
+                     " Total Fwd Packets": sum(forward for _, forward in times), " Label": label})
+    pd.DataFrame(rows).to_csv(labels_csv, index=False)
+    return np.array(expected, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    work_dir = tempfile.mkdtemp(prefix="flow_labels_")
+    try:
+        pcap, labels_csv = os.path.join(work_dir, "day.pcap"), os.path.join(work_dir, "day.pcap_ISCX.csv")
+        expected = write_capture(pcap, labels_csv, synthetic_flows(args.flows, rng), rng)
+        print(f"Wrote {len(expected)} packets, {sum(label is not None for label in expected)} in labelled flows")
+
+        process_pcap.logger.setLevel("WARNING")
+        results = {}
+        for workers in dict.fromkeys(args.workers):
+            output = os.path.join(work_dir, f"labelled-{workers}.csv")
+            stats = process_pcap.process_captures([(pcap, [labels_csv])], output, workers=workers,
+                                                  chunk_size=args.chunk_size)
+            labelled = pd.read_csv(output, usecols=["frame_number", "label"], keep_default_na=False)
+            got = labelled["label"].to_numpy(dtype=object)
+            got[got == ""] = None
+            want = expected[labelled["frame_number"].to_numpy() - 1]
+            stats["accuracy"] = np.mean(got == want)
+            results[workers] = stats
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'workers':>7} {'accuracy':>9} {'packets/s':>10} {'per core':>9} {'per CPU-s':>10}")
+    for workers, s in results.items():
+        print(f"{workers:>7} {s['accuracy']:>9.4%} {s['packets_per_second']:>10.0f} "
+              f"{s['packets_per_second_per_core']:>9.0f} {s['packets_per_cpu_second']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
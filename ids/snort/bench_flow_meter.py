@@ -0,0 +1,190 @@
+"""
+Correctness, flows/s and memory per active flow of flow_meter.FlowMeter.
+
+The script writes a synthetic high-connection-rate capture: --flows short
+connections opened at --rate new flows per second, so thousands are open at
+once. Each connection is one of:
+- a TCP connection: handshake, one request and one response, then FIN
+  from the client (which ends the flow);
+- a UDP exchange of a request and a response, which only ends when the flow
+  timeout sweeps it out or the capture ends.
+Every flow's expected features are computed independently from the packets
+written for it and compared with the FlowMeter output. The script then
+reports flows/s and packets/s for decoding plus flow aggregation, the
+largest number of flows open at once, and the traced memory per open flow
+(flow table row, 5-tuple dict entry and identity) when --open-flows
+connections are left open.
+
+Usage:
+    python bench_flow_meter.py --flows 200000 --rate 20000
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_pcap_reader import ETHERNET, IPV4, MAC, RECORD, TCP, UDP
+from flow_meter import FEATURE_COLUMNS, FlowMeter, flow_features
+from pcap_columns import read_pcap_columns
+
+START = 1499400000.0
+SYN, ACK, PSH_ACK, FIN_ACK, SYN_ACK = 0x02, 0x10, 0x18, 0x11, 0x12
+TCP_HEADER = 32  # data offset 8 words: timestamps option
+
+
+def frame(proto, src, dst, sport, dport, flags, window, payload):
+    if proto == 6:
+        transport = TCP.pack(sport, dport, 0, 0, (TCP_HEADER // 4) << 4, flags, window, 0, 0) + \
+            bytes(TCP_HEADER - 20) + bytes(payload)
+    else:
+        transport = UDP.pack(sport, dport, 8 + payload, 0) + bytes(payload)
+    ip = IPV4.pack(0x45, 0, 20 + len(transport), 0, 0, 64, proto, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return ETHERNET.pack(MAC, MAC, 0x0800) + ip + transport
+
+
+def synthetic_flows(count, rate, rng):
+    """Flows as (proto, client, sport, server, dport, [(time, forward, flags, window, payload)])."""
+    flows = []
+    for i in range(count):
+        start = START + i / rate + rng.random() / rate
+        client = f"172.16.{i // 60000 % 256}.{rng.randrange(1, 255)}"
+        server = f"10.1.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        sport = 1024 + i % 60000
+        rtt = rng.uniform(2e-4, 5e-2)
+        if rng.random() < 0.8:
+            request, response = rng.randrange(40, 600), rng.randrange(0, 4000)
+            packets = [(0.0, True, SYN, 64240, 0), (rtt, False, SYN_ACK, 65160, 0), (2 * rtt, True, ACK, 502, 0),
+                       (2 * rtt + 1e-4, True, PSH_ACK, 502, request), (3 * rtt, False, PSH_ACK, 509, response),
+                       (3 * rtt + 2e-4, True, FIN_ACK, 502, 0)]
+            flows.append((6, client, sport, server, rng.choice([80, 443, 8080]), packets))
+        else:
+            packets = [(0.0, True, 0, 0, rng.randrange(20, 80)), (rtt, False, 0, 0, rng.randrange(40, 500))]
+            flows.append((17, client, sport, server, 53, packets))
+        flows[-1] = flows[-1][:5] + ([(start + round(t, 6), *rest) for t, *rest in flows[-1][5]],)
+    return flows
+
+
+def write_capture(path, flows):
+    packets = sorted((p[0], i, j) for i, flow in enumerate(flows) for j, p in enumerate(flow[5]))
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for ts, i, j in packets:
+            proto, client, sport, server, dport, flow_packets = flows[i]
+            _, forward, flags, window, payload = flow_packets[j]
+            src, dst, sp, dp = (client, server, sport, dport) if forward else (server, client, dport, sport)
+            data = frame(proto, src, dst, sp, dp, flags, window, payload)
+            usec = round(ts * 1e6)
+            f.write(RECORD.pack(usec // 1000000, usec % 1000000, len(data), len(data)) + data)
+    return len(packets)
+
+
+def expected_features(flows):
+    rows = {}
+    for proto, client, sport, server, dport, packets in flows:
+        ts = np.array([round(p[0] * 1e6) for p in packets], dtype=float)
+        fwd = np.array([p[1] for p in packets])
+        lengths = np.array([p[4] for p in packets], dtype=float)
+        header = TCP_HEADER if proto == 6 else 8
+        rows[f"{client}-{server}-{sport}-{dport}-{proto}"] = {
+            " Destination Port": dport,
+            " Flow Duration": ts[-1] - ts[0],
+            " Total Fwd Packets": fwd.sum(),
+            " Total Backward Packets": (~fwd).sum(),
+            "Total Length of Fwd Packets": lengths[fwd].sum(),
+            "Bwd Packet Length Max": lengths[~fwd].max(),
+            " Flow IAT Max": np.diff(ts).max(),
+            " Fwd IAT Mean": np.diff(ts[fwd]).mean() if fwd.sum() > 1 else 0,
+            " Fwd Header Length": header * fwd.sum(),
+            " Packet Length Std": lengths.std(ddof=1),
+            " SYN Flag Count": sum(p[2] & SYN > 0 for p in packets),
+            " Average Packet Size": lengths.mean(),
+            "Init_Win_bytes_forward": packets[0][3] if proto == 6 else -1,
+            " Init_Win_bytes_backward": next(p[3] for p in packets if not p[1]) if proto == 6 else -1,
+            " act_data_pkt_fwd": (lengths[fwd] > 0).sum(),
+            " min_seg_size_forward": header,
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def check(got, want):
+    if list(got.columns) != FEATURE_COLUMNS:
+        raise AssertionError("Feature columns are not in training CSV order")
+    if len(got) != len(want) or not got.index.sort_values().equals(want.index.sort_values()):
+        raise AssertionError(f"Got {len(got)} flows, expected {len(want)}")
+    got = got.loc[want.index]
+    for column in want.columns:
+        if not np.allclose(got[column].to_numpy(dtype=float), want[column].to_numpy(dtype=float)):
+            raise AssertionError(f"Feature {column!r} differs from the expected values")
+
+
+def memory_per_flow(path, flows):
+    """Traced bytes held by a FlowMeter per open flow, after the first packet of flows connections."""
+    gc.collect()
+    tracemalloc.start()
+    meter = FlowMeter(flow_timeout=1e9)
+    for packets in read_pcap_columns(path, max_packets=flows):
+        meter.add_packets(packets)
+        del packets
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held / meter.active_flows, meter.active_flows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=200000)
+    parser.add_argument("--rate", type=float, default=20000, help="new flows per second in the capture")
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--open-flows", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    work_dir = tempfile.mkdtemp(prefix="flow_meter_")
+    try:
+        pcap = os.path.join(work_dir, "connections.pcap")
+        flows = synthetic_flows(args.flows, args.rate, rng)
+        packets = write_capture(pcap, flows)
+        print(f"Wrote {packets} packets in {len(flows)} flows ({os.path.getsize(pcap) / 2 ** 20:.0f} MiB)")
+
+        peak = 0
+        meter = FlowMeter()
+        start = time.perf_counter()
+        parts = []
+        for chunk in read_pcap_columns(pcap, chunk_size=args.chunk_size):
+            parts.append(meter.add_packets(chunk))
+            peak = max(peak, meter.active_flows)
+        parts.append(meter.flush())
+        seconds = time.perf_counter() - start
+        features = pd.concat(parts)
+        check(features, expected_features(flows))
+        print(f"All {len(features)} flows match their expected features")
+        if not features.equals(pd.concat(flow_features(pcap, chunk_size=args.chunk_size))):
+            raise AssertionError("flow_features() disagrees with FlowMeter")
+
+        # Only first packets: every connection stays open
+        first_packets = os.path.join(work_dir, "open.pcap")
+        write_capture(first_packets, [flow[:5] + (flow[5][:1],) for flow in flows[:args.open_flows]])
+        per_flow, open_flows = memory_per_flow(first_packets, args.open_flows)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'flows/s':>10} {'packets/s':>10} {'peak open flows':>16} {'bytes/open flow':>16}")
+    print(f"{len(features) / seconds:>10.0f} {packets / seconds:>10.0f} {peak:>16} {per_flow:>16.0f}")
+    print(f"(memory traced with {open_flows} open flows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+End-to-end detection lag of live_ingest under a synthetic live capture.
+
+A writer thread stands in for start_tcpdump.sh. It replays the
+bench_flow_meter connections (TCP connections closed by FIN, UDP exchanges
+that end by flow timeout) at --rate new flows per second, stamping every
+packet with the current wall-clock time. Packets go into a two-file ring
+(traffic.pcap00, traffic.pcap01) rotated every --file-mb MiB, like
+`tcpdump -C ... -W 2`, and are flushed every few milliseconds.
+
+live_ingest follows the directory with a randomly initialised exported
+runtime as the detector. Halfway through the run the ingester is stopped
+and a new one is started from the same offset checkpoint. The script checks
+that the two ingesters together decoded every written packet exactly once,
+then reports the detection lag (verdict time minus the time the flow ended)
+for FIN-closed and timed-out flows.
+
+Usage:
+    python bench_live_ingest.py --rate 2000 --seconds 20 --poll-interval 0.2
+"""
+
+import argparse
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fl_common.detection_engine import HotSwapModel
+from fl_common.numpy_runtime import export_runtime
+from ids.host_ids.log_reader import CursorStore
+from bench_flow_meter import START, frame, synthetic_flows
+from bench_pcap_reader import RECORD
+from flow_meter import FEATURE_COLUMNS
+import live_ingest
+from live_ingest import CaptureFollower, LiveDetector, follow, load_runtime
+
+FLUSH_INTERVAL = 0.005
+
+
+class RingWriter(threading.Thread):
+    """Replay flows in real time into a tcpdump -C/-W style ring of capture files."""
+
+    def __init__(self, directory, flows, file_bytes, files=2):
+        super().__init__(name="ring-writer", daemon=True)
+        # tcpdump appends the file number to the -w name (traffic.pcap0 -> traffic.pcap00, traffic.pcap01)
+        self.paths = [os.path.join(directory, f"traffic.pcap0{i}") for i in range(files)]
+        self.flows = flows
+        self.file_bytes = file_bytes
+        self.packets = 0
+        self.rotations = 0
+
+    def _open(self, index):
+        f = open(self.paths[index % len(self.paths)], "wb")
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        return f
+
+    def run(self):
+        packets = sorted((p[0], i, j) for i, flow in enumerate(self.flows) for j, p in enumerate(flow[5]))
+        shift = time.time() + 0.1 - START
+        index = 0
+        f = self._open(index)
+        k = 0
+        while k < len(packets):
+            now = time.time()
+            while k < len(packets) and packets[k][0] + shift <= now:
+                _, i, j = packets[k]
+                proto, client, sport, server, dport, flow_packets = self.flows[i]
+                _, forward, flags, window, payload = flow_packets[j]
+                src, dst, sp, dp = (client, server, sport, dport) if forward else (server, client, dport, sport)
+                data = frame(proto, src, dst, sp, dp, flags, window, payload)
+                # Stamped at write time, as tcpdump stamps at capture time
+                usec = round(now * 1e6)
+                f.write(RECORD.pack(usec // 1000000, usec % 1000000, len(data), len(data)) + data)
+                k += 1
+                if f.tell() >= self.file_bytes:
+                    f.close()
+                    index += 1
+                    self.rotations += 1
+                    f = self._open(index)
+            f.flush()
+            self.packets = k
+            time.sleep(FLUSH_INTERVAL)
+        f.close()
+
+
+def random_runtime(path, rng):
+    sizes = [len(FEATURE_COLUMNS), 64, 32, 1]
+    weights = []
+    for n_in, n_out in zip(sizes[:-1], sizes[1:]):
+        weights += [rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)), np.zeros(n_out)]
+    # A scale large enough to keep the raw CICFlowMeter magnitudes in a sensible range
+    export_runtime(path, weights, np.zeros(sizes[0]), np.full(sizes[0], 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=2000, help="new flows per second")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--file-mb", type=float, default=16)
+    parser.add_argument("--flow-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="live_ingest_")
+    try:
+        runtime = os.path.join(work_dir, "runtime.npz")
+        random_runtime(runtime, np.random.default_rng(0))
+        model = HotSwapModel(load_runtime(runtime))
+        checkpoint = os.path.join(work_dir, "cursors.json")
+        flows = synthetic_flows(int(args.rate * args.seconds), args.rate, random.Random(0))
+        writer = RingWriter(work_dir, flows, int(args.file_mb * 2 ** 20))
+
+        lags = {"FIN": [], "timeout": []}
+
+        def record(verdicts, now):
+            for verdict in verdicts:
+                flow_id, ended_at = verdict.flow_id
+                lags["FIN" if flow_id.endswith("-6") else "timeout"].append(now - ended_at)
+
+        # The random model flags about half the flows; keep its alerts out of the report
+        live_ingest.logger.setLevel("ERROR")
+        decoded = 0
+        writer.start()
+        for phase, until in ((1, time.time() + args.seconds / 2),
+                             (2, time.time() + args.seconds + args.flow_timeout + 4 * args.poll_interval + 1)):
+            follower = CaptureFollower(work_dir, "traffic.pcap*", CursorStore(checkpoint))
+            live = LiveDetector(model, flow_timeout=args.flow_timeout, on_verdicts=record)
+            stop = threading.Event()
+            thread = threading.Thread(target=follow, args=(follower, live, args.poll_interval, stop))
+            thread.start()
+            time.sleep(max(0.0, until - time.time()))
+            stop.set()
+            thread.join()
+            live.detector.flush()
+            live.close()
+            decoded += follower.packets
+            print(f"ingester {phase}: {follower.packets} packets, {live.detector.flows_processed} verdicts")
+        writer.join()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Writer: {writer.packets} packets, {writer.rotations} rotations")
+    if decoded != writer.packets:
+        raise AssertionError(f"Ingesters decoded {decoded} packets, the writer wrote {writer.packets}")
+    print("Every written packet was decoded exactly once across the restart")
+    print(f"{'flows ended by':>15} {'verdicts':>9} {'lag p50 ms':>11} {'p99 ms':>8} {'max ms':>8}")
+    for reason, values in lags.items():
+        if values:
+            p50, p99, top = np.percentile(np.asarray(values) * 1000, [50, 99, 100])
+            print(f"{reason:>15} {len(values):>9} {p50:>11.1f} {p99:>8.1f} {top:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
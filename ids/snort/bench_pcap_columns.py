@@ -0,0 +1,156 @@
+"""
+Throughput of the memory-mapped, vectorized pcap decoder on a multi-GB capture.
+
+A synthetic Ethernet capture of --size-gb GiB is written by repeating a block
+of distinct frames from bench_pcap_reader.synthetic_frame (TCP, UDP, ICMP,
+VLAN, IPv6, ARP). The script reports, for the whole file:
+
+- raw sequential read speed (the "disk speed" ceiling; a just-written file
+  is usually served from the page cache);
+- read_pcap_columns decode throughput;
+- decode plus a Parquet write via process_pcap.ColumnarWriter, when pyarrow
+  is installed;
+- read_pcap (per-packet struct decoding) on the first --check-packets
+  packets, for reference;
+
+along with the largest resident set sampled between decoded chunks, which
+stays bounded by the chunk size rather than the file size. Finally it checks
+that read_pcap_columns decodes the first --check-packets packets exactly as
+pcap_reader.read_pcap does.
+
+Usage:
+    python bench_pcap_columns.py --size-gb 2 --chunk-size 65536
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_pcap_reader import RECORD, synthetic_frame
+from pcap_columns import read_pcap_columns
+from pcap_reader import COLUMNS, read_pcap
+
+BLOCK_FRAMES = 65536
+
+
+def write_large_pcap(path, size_bytes, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(BLOCK_FRAMES):
+        frame = synthetic_frame(i, rng)[0]
+        records.append(RECORD.pack(1500000000 + i // 1000, (i % 1000) * 1000, len(frame), len(frame)) + frame)
+    block = b"".join(records)
+    packets = 0
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        while f.tell() < size_bytes:
+            f.write(block)
+            packets += BLOCK_FRAMES
+    return packets
+
+
+def check(path, packets, chunk_size):
+    expected = pd.concat([pd.DataFrame(c) for c in read_pcap(path, max_packets=packets)], ignore_index=True)
+    decoded = pd.concat(list(read_pcap_columns(path, chunk_size=chunk_size, max_packets=packets)), ignore_index=True)
+    for column in COLUMNS:
+        want = expected[column].astype(object).where(expected[column].notna(), None)
+        got = decoded[column].astype(object).where(decoded[column].notna(), None)
+        if column == "frame_time":
+            equal = np.allclose(expected[column], decoded[column])
+        else:
+            equal = want.tolist() == got.tolist()
+        if not equal:
+            raise AssertionError(f"read_pcap_columns disagrees with read_pcap on column {column}")
+
+
+def rss_mib():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--check-packets", type=int, default=200000)
+    parser.add_argument("--dir", help="where to write the capture (default: a temporary directory)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pcap_columns_", dir=args.dir)
+    try:
+        pcap = os.path.join(work_dir, "synthetic.pcap")
+        packets, seconds = timed(lambda: write_large_pcap(pcap, int(args.size_gb * 2 ** 30)))
+        size_mib = os.path.getsize(pcap) / 2 ** 20
+        print(f"Wrote {packets} packets ({size_mib:.0f} MiB) in {seconds:.1f}s")
+
+        def read_raw():
+            with open(pcap, "rb", buffering=0) as f:
+                while f.read(16 * 2 ** 20):
+                    pass
+            return packets
+
+        decode_rss = []
+
+        def decode():
+            count = 0
+            for df in read_pcap_columns(pcap, chunk_size=args.chunk_size):
+                count += len(df)
+                decode_rss.append(rss_mib())
+            return count
+
+        def decode_parquet():
+            from process_pcap import ColumnarWriter
+            writer = ColumnarWriter(os.path.join(work_dir, "synthetic.parquet"))
+            count = 0
+            for df in read_pcap_columns(pcap, chunk_size=args.chunk_size):
+                writer.write(df)
+                count += len(df)
+            writer.close()
+            return count
+
+        def per_packet():
+            return sum(len(c["frame_number"]) for c in read_pcap(pcap, max_packets=args.check_packets))
+
+        results = {"raw read": timed(read_raw)}
+        decoded, seconds = timed(decode)
+        if decoded != packets:
+            raise AssertionError(f"Decoded {decoded} of {packets} packets")
+        results["read_pcap_columns"] = (decoded, seconds)
+        try:
+            import pyarrow  # noqa: F401
+            results["+ Parquet write"] = timed(decode_parquet)
+            print(f"Parquet output: {os.path.getsize(os.path.join(work_dir, 'synthetic.parquet')) / 2 ** 20:.0f} MiB")
+        except ImportError:
+            print("pyarrow not installed; skipping the Parquet write")
+        results["read_pcap (sample)"] = timed(per_packet)
+        check(pcap, args.check_packets, args.chunk_size)
+        print(f"read_pcap_columns matches read_pcap on the first {args.check_packets} packets")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    mib_per_packet = size_mib / packets
+    print(f"{'decoder':>20} {'packets/s':>11} {'MiB/s':>8}")
+    for name, (count, seconds) in results.items():
+        print(f"{name:>20} {count / seconds:>11.0f} {count * mib_per_packet / seconds:>8.0f}")
+    print(f"RSS during read_pcap_columns: {min(decode_rss):.0f}-{max(decode_rss):.0f} MiB "
+          f"(process peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
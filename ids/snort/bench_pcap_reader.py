@@ -0,0 +1,150 @@
+"""
+Decode throughput of pcap_reader against pyshark.
+
+A synthetic Ethernet capture of --packets frames is written with struct. It
+mixes TCP, UDP and ICMP over IPv4 plus VLAN-tagged, IPv6 and ARP frames. The
+script checks every decoded field against the values it wrote, then reports
+packets/s for:
+
+- pcap_reader.read_pcap over the whole capture;
+- a pyshark.FileCapture loop reading the fields process_pcap used to read
+  (only when pyshark and tshark are installed; capped at --pyshark-packets).
+
+Usage:
+    python bench_pcap_reader.py --packets 500000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pcap_reader import read_pcap, protocol_name
+
+ETHERNET = struct.Struct("!6s6sH")
+IPV4 = struct.Struct("!BBHHHBBH4s4s")
+IPV6 = struct.Struct("!IHBB16s16s")
+TCP = struct.Struct("!HHIIBBHHH")
+UDP = struct.Struct("!HHHH")
+RECORD = struct.Struct("<IIII")
+MAC = b"\x00\x11\x22\x33\x44\x55"
+
+
+def synthetic_frame(i, rng):
+    """Build frame i and return (bytes, expected ip_proto name, ip_src, ip_dst, tcp_flags, udp_length, icmp_type)."""
+    kind = rng.choice(["tcp", "tcp", "tcp", "udp", "icmp", "vlan", "ipv6", "arp"])
+    if kind == "arp":
+        return ETHERNET.pack(MAC, MAC, 0x0806) + bytes(28), "ARP", "", "", None, None, None
+    src, dst = f"10.0.{i % 250}.{i % 200 + 1}", f"192.168.{i % 100}.{i % 250 + 1}"
+    payload = bytes(rng.randrange(0, 400))
+    if kind in ("tcp", "vlan", "ipv6"):
+        flags = rng.choice([0x02, 0x12, 0x10, 0x18, 0x11, 0x04])
+        transport = TCP.pack(rng.randrange(1024, 65536), 443, i, 0, 5 << 4, flags, 64240, 0, 0) + payload
+        proto, expected = 6, ("TCP", flags, None, None)
+    elif kind == "udp":
+        transport = UDP.pack(rng.randrange(1024, 65536), 53, 8 + len(payload), 0) + payload
+        proto, expected = 17, ("UDP", None, 8 + len(payload), None)
+    else:
+        icmp_type = rng.choice([0, 3, 8, 11])
+        transport = bytes([icmp_type, 0]) + bytes(6) + payload
+        proto, expected = 1, ("ICMP", None, None, icmp_type)
+
+    if kind == "ipv6":
+        src, dst = f"2001:db8::{i % 65535 + 1:x}", "2001:db8:1::1"
+        ip = IPV6.pack(6 << 28, len(transport), proto, 64, socket.inet_pton(socket.AF_INET6, src),
+                       socket.inet_pton(socket.AF_INET6, dst))
+        link = ETHERNET.pack(MAC, MAC, 0x86DD)
+    else:
+        ip = IPV4.pack(0x45, 0, 20 + len(transport), i & 0xFFFF, 0, 64, proto, 0, socket.inet_aton(src),
+                       socket.inet_aton(dst))
+        link = ETHERNET.pack(MAC, MAC, 0x8100) + struct.pack("!HH", 100, 0x0800) if kind == "vlan" \
+            else ETHERNET.pack(MAC, MAC, 0x0800)
+    return (link + ip + transport, expected[0], src, dst) + expected[1:]
+
+
+def write_pcap(path, packets, seed=0):
+    rng = random.Random(seed)
+    expected = []
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for i in range(packets):
+            frame, *fields = synthetic_frame(i, rng)
+            f.write(RECORD.pack(1500000000 + i // 1000, (i % 1000) * 1000, len(frame), len(frame)) + frame)
+            expected.append(fields)
+    return expected
+
+
+def check(path, expected):
+    decoded = []
+    for columns in read_pcap(path, chunk_size=50000):
+        decoded.extend(zip((protocol_name(p, e) for p, e in zip(columns["ip_proto"], columns["eth_type"])),
+                           columns["ip_src"], columns["ip_dst"], columns["tcp_flags"], columns["udp_length"],
+                           columns["icmp_type"]))
+    mismatches = [i for i, (got, want) in enumerate(zip(decoded, expected)) if list(got) != want]
+    if len(decoded) != len(expected) or mismatches:
+        raise AssertionError(f"Decoded {len(decoded)}/{len(expected)} packets, "
+                             f"first mismatch at frame {mismatches[:1]}")
+
+
+def bench_pyshark(path, max_packets):
+    import pyshark
+
+    capture = pyshark.FileCapture(path)
+    start = time.perf_counter()
+    count = 0
+    for packet in capture:
+        # The fields process_pcap read before it switched to pcap_reader
+        _ = (packet.number, packet.length, packet.sniff_time.timestamp(), packet.highest_layer)
+        if 'IP' in packet:
+            _ = (packet.ip.src, packet.ip.dst)
+        if 'TCP' in packet:
+            _ = packet.tcp.flags
+        count += 1
+        if count >= max_packets:
+            break
+    capture.close()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=500000)
+    parser.add_argument("--pyshark-packets", type=int, default=10000)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pcap_bench_")
+    try:
+        pcap = os.path.join(work_dir, "synthetic.pcap")
+        expected = write_pcap(pcap, args.packets)
+        print(f"Wrote {args.packets} packets ({os.path.getsize(pcap) / 2 ** 20:.1f} MiB) to {pcap}")
+        check(pcap, expected)
+        print("All decoded fields match the written packets")
+
+        start = time.perf_counter()
+        count = sum(len(columns["frame_number"]) for columns in read_pcap(pcap))
+        results = {"read_pcap": count / (time.perf_counter() - start)}
+
+        try:
+            results["pyshark"] = bench_pyshark(pcap, args.pyshark_packets)
+        except ImportError:
+            print("pyshark not installed; skipping the pyshark comparison")
+        except Exception as e:
+            print(f"pyshark failed ({e}); is tshark installed?")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'decoder':>20} {'packets/s':>11}")
+    for decoder, rate in results.items():
+        print(f"{decoder:>20} {rate:>11.0f}")
+    if "pyshark" in results:
+        print(f"read_pcap speedup over pyshark: {results['read_pcap'] / results['pyshark']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
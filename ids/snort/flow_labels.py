@@ -0,0 +1,105 @@
+"""
+Flow-level labels for decoded packets.
+
+The CICIDS2017 label CSVs (the TrafficLabelling / GeneratedLabelledFlows
+release) hold one row per CICFlowMeter flow, not one per packet. A packet
+belongs to the flow with the same bidirectional 5-tuple (protocol plus both
+endpoints, in either direction) whose time window contains it.
+
+load_flows() builds a sorted flow index from the label CSVs:
+- key: the canonical 5-tuple string, with the endpoints in sorted order so
+  both directions of a connection share one key;
+- start/end: flow start and start + Flow Duration, in epoch seconds;
+- label: the flow's Label.
+label_packets() joins a chunk of decoded packets (pcap_columns.COLUMNS) to
+the index with pandas.merge_asof, grouped by key. Each packet takes the
+latest flow with the same key that started before it, and keeps that label
+only if the packet also falls before the flow's end. time_slack widens
+each window on both sides. Packets without a matching flow get a null
+label.
+
+Timestamp quirks of the published CSVs are handled here:
+- they are local time at the capture site (UTC-3 by default, see
+  utc_offset_hours);
+- dates are day first;
+- some files drop the seconds, so time_slack defaults to a minute;
+- some files write afternoon hours on a 12-hour clock without AM/PM. In a
+  file whose hours never exceed 12, hours before WORKDAY_START_HOUR are
+  taken as afternoon.
+"""
+
+import numpy as np
+import pandas as pd
+
+FLOW_COLUMNS = ["Source IP", "Source Port", "Destination IP", "Destination Port", "Protocol", "Timestamp",
+                "Flow Duration", "Label"]
+TIMESTAMP_FORMATS = ["%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M"]
+WORKDAY_START_HOUR = 8
+
+
+def flow_keys(protocol, src_ip, src_port, dst_ip, dst_port):
+    """Canonical bidirectional 5-tuple strings; both directions of a flow map to the same key."""
+    src = src_ip.astype(str) + ":" + src_port.astype("int64").astype(str)
+    dst = dst_ip.astype(str) + ":" + dst_port.astype("int64").astype(str)
+    low = src.where(src <= dst, dst)
+    high = dst.where(src <= dst, src)
+    return protocol.astype("int64").astype(str) + "|" + low + "|" + high
+
+
+def parse_timestamps(timestamps, utc_offset_hours=-3.0):
+    """Epoch seconds for the CICIDS2017 local, day-first label timestamps."""
+    timestamps = timestamps.astype(str).str.strip()
+    parsed = pd.to_datetime(timestamps, format=TIMESTAMP_FORMATS[0], errors="coerce")
+    for fmt in TIMESTAMP_FORMATS[1:]:
+        parsed = parsed.fillna(pd.to_datetime(timestamps, format=fmt, errors="coerce"))
+    hours = parsed.dt.hour
+    if hours.max() <= 12:
+        # 12-hour clock without AM/PM: 1:30 in a working-hours capture is 13:30
+        parsed = parsed + pd.to_timedelta(np.where(hours < WORKDAY_START_HOUR, 12, 0), unit="h")
+    seconds = (parsed - pd.Timestamp("1970-01-01")) / pd.Timedelta(seconds=1)
+    return seconds - utc_offset_hours * 3600
+
+
+def load_flows(label_files, utc_offset_hours=-3.0):
+    """Flow index (key, start, end, label) from CICIDS2017 label CSVs, sorted by start."""
+    frames = []
+    for label_file in label_files:
+        flows = pd.read_csv(label_file, usecols=lambda c: c.strip() in FLOW_COLUMNS, encoding_errors="replace",
+                            skipinitialspace=True, low_memory=False)
+        flows.columns = [c.strip() for c in flows.columns]
+        missing = set(FLOW_COLUMNS) - set(flows.columns)
+        if missing:
+            raise ValueError(f"{label_file} has no {sorted(missing)} columns; flow labels need the "
+                             f"TrafficLabelling CSVs, not the MachineLearningCSV ones")
+        flows = flows.dropna(subset=FLOW_COLUMNS)
+        start = parse_timestamps(flows["Timestamp"], utc_offset_hours)
+        frames.append(pd.DataFrame({
+            "key": flow_keys(flows["Protocol"], flows["Source IP"].str.strip(), flows["Source Port"],
+                             flows["Destination IP"].str.strip(), flows["Destination Port"]),
+            "start": start,
+            "end": start + flows["Flow Duration"].clip(lower=0) / 1e6,
+            "label": flows["Label"].astype(str).str.strip(),
+        }))
+    index = pd.concat(frames, ignore_index=True).dropna(subset=["start"])
+    return index.sort_values("start", kind="stable").reset_index(drop=True)
+
+
+def label_packets(packets, flows, time_slack=60.0):
+    """Label per packet (aligned with packets, null where no flow matches) from a load_flows() index."""
+    is_ip = packets["ip_proto"].notna().to_numpy()
+    ip = packets[is_ip]
+    labels = pd.Series(pd.NA, index=packets.index, dtype="string")
+    if ip.empty or flows.empty:
+        return labels
+    left = pd.DataFrame({
+        "key": flow_keys(ip["ip_proto"], ip["ip_src"], ip["src_port"].fillna(0), ip["ip_dst"],
+                         ip["dst_port"].fillna(0)).to_numpy(),
+        "time": ip["frame_time"].to_numpy(),
+        "row": np.flatnonzero(is_ip),
+    }).sort_values("time", kind="stable")
+    right = flows.assign(time=flows["start"] - time_slack)
+    merged = pd.merge_asof(left, right, on="time", by="key", direction="backward")
+    inside = merged["time"].to_numpy() <= merged["end"].to_numpy() + time_slack
+    matched = merged[inside]
+    labels.iloc[matched["row"].to_numpy()] = matched["label"].to_numpy()
+    return labels
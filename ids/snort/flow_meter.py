@@ -0,0 +1,384 @@
+"""
+Streaming CICFlowMeter-compatible flow features from decoded packets.
+
+FlowMeter turns pcap_columns chunks into the 78 CICIDS2017 flow features
+that the federated ANN trains on (INPUT_SHAPE = 78). They are emitted in
+FEATURE_COLUMNS order, which is the column order of the MachineLearningCVE
+CSVs minus the trailing Label.
+
+Flow semantics follow CICFlowMeter-V3, which generated CICIDS2017:
+- flows are bidirectional TCP or UDP 5-tuples. The first packet sets the
+  forward direction and the Destination Port;
+- a flow ends after a packet with FIN (that packet is included). It also
+  ends when a packet arrives more than flow_timeout (120 s) after the flow
+  started; that packet opens a new flow. Flows still open after
+  flow_timeout are swept out at the end of each chunk (or by expire() on a
+  quiet live capture), and flush() emits the rest at the end of a capture;
+- lengths are transport payload bytes, header lengths are transport header
+  bytes, and times are in microseconds. Std and Variance are sample
+  statistics (n - 1), and the rates divide by the duration in seconds, so
+  one-packet flows give the same inf/NaN rates as the published CSVs;
+- active/idle periods split at gaps longer than activity_timeout (5 s). As
+  in CICFlowMeter-V3, the active period still open when a flow ends is not
+  counted;
+- as throughout CICIDS2017, the six bulk features are 0 and the Subflow
+  features repeat the flow totals.
+
+Per-flow state lives in one float64 table with a row per flow slot, and
+freed slots are reused. The only per-packet Python work is finding each
+packet's slot (a dict lookup on the 5-tuple plus the FIN and timeout
+checks). Lengths, inter-arrival times, flags, windows and active/idle
+periods are accumulated per chunk with NumPy group reductions.
+
+Usage:
+    python flow_meter.py capture.pcap --output flows.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pcap_columns import read_pcap_columns
+
+# MachineLearningCVE header as written back by pandas (the duplicate "Fwd Header Length" becomes ".1")
+FEATURE_COLUMNS = [
+    " Destination Port", " Flow Duration", " Total Fwd Packets", " Total Backward Packets",
+    "Total Length of Fwd Packets", " Total Length of Bwd Packets", " Fwd Packet Length Max",
+    " Fwd Packet Length Min", " Fwd Packet Length Mean", " Fwd Packet Length Std", "Bwd Packet Length Max",
+    " Bwd Packet Length Min", " Bwd Packet Length Mean", " Bwd Packet Length Std", "Flow Bytes/s",
+    " Flow Packets/s", " Flow IAT Mean", " Flow IAT Std", " Flow IAT Max", " Flow IAT Min", "Fwd IAT Total",
+    " Fwd IAT Mean", " Fwd IAT Std", " Fwd IAT Max", " Fwd IAT Min", "Bwd IAT Total", " Bwd IAT Mean",
+    " Bwd IAT Std", " Bwd IAT Max", " Bwd IAT Min", "Fwd PSH Flags", " Bwd PSH Flags", " Fwd URG Flags",
+    " Bwd URG Flags", " Fwd Header Length", " Bwd Header Length", "Fwd Packets/s", " Bwd Packets/s",
+    " Min Packet Length", " Max Packet Length", " Packet Length Mean", " Packet Length Std",
+    " Packet Length Variance", "FIN Flag Count", " SYN Flag Count", " RST Flag Count", " PSH Flag Count",
+    " ACK Flag Count", " URG Flag Count", " CWE Flag Count", " ECE Flag Count", " Down/Up Ratio",
+    " Average Packet Size", " Avg Fwd Segment Size", " Avg Bwd Segment Size", " Fwd Header Length.1",
+    "Fwd Avg Bytes/Bulk", " Fwd Avg Packets/Bulk", " Fwd Avg Bulk Rate", " Bwd Avg Bytes/Bulk",
+    " Bwd Avg Packets/Bulk", "Bwd Avg Bulk Rate", "Subflow Fwd Packets", " Subflow Fwd Bytes",
+    " Subflow Bwd Packets", " Subflow Bwd Bytes", "Init_Win_bytes_forward", " Init_Win_bytes_backward",
+    " act_data_pkt_fwd", " min_seg_size_forward", "Active Mean", " Active Std", " Active Max", " Active Min",
+    "Idle Mean", " Idle Std", " Idle Max", " Idle Min",
+]
+
+TCP_FLAGS = {"fin": 0x01, "syn": 0x02, "rst": 0x04, "psh": 0x08, "ack": 0x10, "urg": 0x20, "ece": 0x40, "cwe": 0x80}
+STATS = ("fwd_len", "bwd_len", "flow_iat", "fwd_iat", "bwd_iat", "active", "idle")
+FIELDS = (
+    [f"{stat}_{part}" for stat in STATS for part in ("n", "sum", "sq", "min", "max")]
+    + [f"{flag}_count" for flag in TCP_FLAGS]
+    + ["fwd_psh", "bwd_psh", "fwd_urg", "bwd_urg", "fwd_header", "bwd_header", "min_seg_fwd", "act_data_fwd",
+       "init_win_fwd", "init_win_bwd", "first_ts", "last_ts", "last_fwd_ts", "last_bwd_ts", "active_start",
+       "dst_port"]
+)
+COLUMN = {name: i for i, name in enumerate(FIELDS)}
+BLANK_ROW = np.zeros(len(FIELDS))
+for _stat in STATS:
+    BLANK_ROW[COLUMN[f"{_stat}_min"]] = np.inf
+    BLANK_ROW[COLUMN[f"{_stat}_max"]] = -np.inf
+BLANK_ROW[COLUMN["min_seg_fwd"]] = np.inf
+BLANK_ROW[[COLUMN["init_win_fwd"], COLUMN["init_win_bwd"]]] = -1
+
+
+def _groups(slots):
+    """Start index of each run of equal values in a sorted slot array."""
+    return np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]]) if len(slots) else np.empty(0, dtype=np.int64)
+
+
+def _previous(slots, values, state):
+    """Value of the previous element in the same slot; the first of each slot takes state[slot]."""
+    previous = np.r_[np.nan, values[:-1]]
+    starts = _groups(slots)
+    previous[starts] = state[slots[starts]]
+    return previous
+
+
+def _summary(n, total, squares, low, high):
+    """Mean, sample std, max and min with CICFlowMeter's zeros for empty statistics."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, total / n, 0.0)
+        variance = np.where(n > 1, (squares - total * total / n) / (n - 1), 0.0)
+    return mean, np.sqrt(np.maximum(variance, 0.0)), np.where(n > 0, high, 0.0), np.where(n > 0, low, 0.0)
+
+
+class FlowMeter:
+    """Incremental CICFlowMeter flow table; add_packets() returns the feature rows of flows that ended.
+
+    After every add_packets(), expire() or flush(), ended_at holds the epoch
+    time each returned flow ended: its last packet, or flow start plus
+    flow_timeout for flows that timed out.
+    """
+
+    def __init__(self, flow_timeout=120.0, activity_timeout=5.0, capacity=4096):
+        self.flow_timeout = flow_timeout * 1e6
+        self.activity_timeout = activity_timeout * 1e6
+        self.table = np.tile(BLANK_ROW, (capacity, 1))
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._start = [0.0] * capacity
+        self._forward = [None] * capacity
+        self._flow_id = [None] * capacity
+        self._live = np.zeros(capacity, dtype=bool)
+        self.flows_emitted = 0
+        self.ended_at = np.empty(0)
+
+    @property
+    def active_flows(self):
+        return len(self._slots)
+
+    def _column(self, name):
+        return self.table[:, COLUMN[name]]
+
+    def _grow(self):
+        """Double the slot capacity; the per-slot lists grow in place so _assign's local references stay valid."""
+        capacity = len(self.table)
+        self.table = np.vstack([self.table, np.tile(BLANK_ROW, (capacity, 1))])
+        self._live = np.r_[self._live, np.zeros(capacity, dtype=bool)]
+        self._start += [0.0] * capacity
+        self._forward += [None] * capacity
+        self._flow_id += [None] * capacity
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _assign(self, ts, proto, src_ip, src_port, dst_ip, dst_port, fin):
+        """Slot and direction of every packet, plus the slots of flows that ended on a FIN and that timed out."""
+        slot_of = np.empty(len(ts), dtype=np.int64)
+        forward = np.empty(len(ts), dtype=bool)
+        ended = []
+        timed_out = []
+        slots, free, start, forward_src, flow_id = self._slots, self._free, self._start, self._forward, self._flow_id
+        timeout = self.flow_timeout
+        for i, t in enumerate(ts):
+            src, dst = (src_ip[i], src_port[i]), (dst_ip[i], dst_port[i])
+            key = (proto[i], src, dst) if src <= dst else (proto[i], dst, src)
+            slot = slots.get(key)
+            if slot is not None and t - start[slot] > timeout:
+                timed_out.append(slot)
+                slot = None
+            if slot is None:
+                if not free:
+                    self._grow()
+                slot = free.pop()
+                slots[key] = slot
+                start[slot] = t
+                forward_src[slot] = src
+                flow_id[slot] = key + (src, dst)
+            slot_of[i] = slot
+            forward[i] = src == forward_src[slot]
+            if fin[i]:
+                ended.append(slot)
+                del slots[key]
+        self._live[slot_of] = True
+        return slot_of, forward, ended, timed_out
+
+    def _merge(self, stat, slots, values):
+        """Fold values (sorted by slot) into the count/sum/squares/min/max columns of stat."""
+        if not len(slots):
+            return
+        starts = _groups(slots)
+        rows = slots[starts]
+        t = self.table
+        t[rows, COLUMN[f"{stat}_n"]] += np.diff(np.r_[starts, len(slots)])
+        t[rows, COLUMN[f"{stat}_sum"]] += np.add.reduceat(values, starts)
+        t[rows, COLUMN[f"{stat}_sq"]] += np.add.reduceat(values * values, starts)
+        t[rows, COLUMN[f"{stat}_min"]] = np.minimum(t[rows, COLUMN[f"{stat}_min"]], np.minimum.reduceat(values, starts))
+        t[rows, COLUMN[f"{stat}_max"]] = np.maximum(t[rows, COLUMN[f"{stat}_max"]], np.maximum.reduceat(values, starts))
+
+    def _count(self, name, slots, weights=None):
+        counts = np.bincount(slots, weights=weights, minlength=len(self.table))
+        touched = np.flatnonzero(counts)
+        self.table[touched, COLUMN[name]] += counts[touched]
+
+    def add_packets(self, packets):
+        """Add a pcap_columns chunk; returns a FEATURE_COLUMNS DataFrame of the flows that ended."""
+        packets = packets[packets["ip_proto"].isin([6, 17]).fillna(False).to_numpy()]
+        if packets.empty:
+            return self._emit([], [])
+        ts = np.round(packets["frame_time"].to_numpy() * 1e6)
+        is_tcp = (packets["ip_proto"] == 6).to_numpy()
+        flags = packets["tcp_flags"].fillna(0).to_numpy(dtype=np.int64)
+        slot_of, forward, ended, timed_out = self._assign(
+            ts.tolist(), packets["ip_proto"].to_numpy(dtype=np.int64).tolist(), packets["ip_src"].tolist(),
+            packets["src_port"].to_numpy(dtype=np.int64).tolist(), packets["ip_dst"].tolist(),
+            packets["dst_port"].to_numpy(dtype=np.int64).tolist(), (flags & TCP_FLAGS["fin"]).tolist())
+
+        order = np.argsort(slot_of, kind="stable")
+        slot, fwd, t = slot_of[order], forward[order], ts[order]
+        payload = packets["payload_len"].to_numpy(dtype=np.float64)[order]
+        header = np.where(is_tcp, packets["tcp_header_len"].fillna(0).to_numpy(dtype=np.float64), 8.0)[order]
+        window = np.where(is_tcp, packets["tcp_window"].fillna(-1).to_numpy(dtype=np.float64), -1.0)[order]
+        flags = flags[order]
+        table = self.table
+        col = COLUMN
+
+        # Flows seen for the first time: start times and destination port of the first (forward) packet
+        starts = _groups(slot)
+        rows = slot[starts]
+        new = (table[rows, col["fwd_len_n"]] + table[rows, col["bwd_len_n"]]) == 0
+        table[rows[new], col["first_ts"]] = t[starts[new]]
+        table[rows[new], col["last_ts"]] = t[starts[new]]
+        table[rows[new], col["active_start"]] = t[starts[new]]
+        table[rows[new], col["last_fwd_ts"]] = np.nan
+        table[rows[new], col["last_bwd_ts"]] = np.nan
+        table[rows[new], col["dst_port"]] = [self._flow_id[r][4][1] for r in rows[new]]
+
+        # Inter-arrival times over the whole flow and per direction
+        previous = _previous(slot, t, self._column("last_ts"))
+        previous[starts[new]] = np.nan
+        iat = t - previous
+        has_iat = ~np.isnan(iat)
+        self._merge("flow_iat", slot[has_iat], iat[has_iat])
+        for direction, mask in (("fwd", fwd), ("bwd", ~fwd)):
+            d_slot, d_t = slot[mask], t[mask]
+            if not len(d_slot):
+                continue
+            d_iat = d_t - _previous(d_slot, d_t, self._column(f"last_{direction}_ts"))
+            has = ~np.isnan(d_iat)
+            self._merge(f"{direction}_iat", d_slot[has], d_iat[has])
+            self._merge(f"{direction}_len", d_slot, payload[mask])
+            self._count(f"{direction}_header", d_slot, header[mask])
+            d_starts = _groups(d_slot)
+            first = d_slot[d_starts]
+            unset = table[first, col[f"init_win_{direction}"]] == -1
+            unset &= table[first, col[f"{direction}_len_n"]] == np.diff(np.r_[d_starts, len(d_slot)])
+            table[first[unset], col[f"init_win_{direction}"]] = window[mask][d_starts[unset]]
+            table[first, col[f"last_{direction}_ts"]] = d_t[np.r_[d_starts[1:], len(d_slot)] - 1]
+            self._count(f"{direction}_psh", d_slot, (flags[mask] & TCP_FLAGS["psh"]) > 0)
+            self._count(f"{direction}_urg", d_slot, (flags[mask] & TCP_FLAGS["urg"]) > 0)
+        f_slot = slot[fwd]
+        if len(f_slot):
+            f_starts = _groups(f_slot)
+            table[f_slot[f_starts], col["min_seg_fwd"]] = np.minimum(table[f_slot[f_starts], col["min_seg_fwd"]],
+                                                                     np.minimum.reduceat(header[fwd], f_starts))
+        self._count("act_data_fwd", f_slot, payload[fwd] >= 1)
+        for flag, bit in TCP_FLAGS.items():
+            self._count(f"{flag}_count", slot, (flags & bit) > 0)
+
+        # Active/idle periods split at gaps above activity_timeout
+        idle = has_iat & (iat > self.activity_timeout)
+        self._merge("idle", slot[idle], iat[idle])
+        b_slot, b_t, b_previous = slot[idle], t[idle], previous[idle]
+        if len(b_slot):
+            segment_start = _previous(b_slot, b_t, self._column("active_start"))
+            active = b_previous - segment_start
+            keep = active > 0
+            self._merge("active", b_slot[keep], active[keep])
+            b_starts = _groups(b_slot)
+            table[b_slot[b_starts], col["active_start"]] = b_t[np.r_[b_starts[1:], len(b_slot)] - 1]
+        table[rows, col["last_ts"]] = t[np.r_[starts[1:], len(slot)] - 1]
+
+        return self._emit(ended, timed_out + self._expired(t.max(), exclude=ended + timed_out))
+
+    def _expired(self, now, exclude=()):
+        """Live slots that outlived flow_timeout at now (microseconds); their 5-tuples start new flows."""
+        live = np.flatnonzero(self._live)
+        expired = set(live[now - self._column("first_ts")[live] > self.flow_timeout].tolist()) - set(exclude)
+        for slot in expired:
+            key = self._flow_id[slot][:3]
+            if self._slots.get(key) == slot:
+                del self._slots[key]
+        return sorted(expired)
+
+    def expire(self, now):
+        """End the flows that outlived flow_timeout at epoch time now, e.g. while a live capture is quiet."""
+        return self._emit([], self._expired(now * 1e6))
+
+    def flush(self):
+        """End every open flow (end of capture) and return their features."""
+        self._slots.clear()
+        return self._emit(np.flatnonzero(self._live).tolist(), [])
+
+    def _emit(self, ended, timed_out):
+        # CICFlowMeter sweeps flows out on their next packet; they end at flow start + flow_timeout either way
+        slots = np.asarray(ended + timed_out, dtype=np.int64)
+        features = self.features(slots)
+        end = self.table[slots, COLUMN["last_ts"]]
+        end[len(ended):] = self.table[slots[len(ended):], COLUMN["first_ts"]] + self.flow_timeout
+        self.ended_at = end / 1e6
+        self.table[slots] = BLANK_ROW
+        self._live[slots] = False
+        self._free.extend(slots.tolist())
+        self.flows_emitted += len(slots)
+        return features
+
+    def features(self, slots):
+        """FEATURE_COLUMNS rows for the given slots, indexed by a CICFlowMeter-style Flow ID."""
+        rows = self.table[slots]
+        c = {name: rows[:, i] for name, i in COLUMN.items()}
+        duration = c["last_ts"] - c["first_ts"]
+        fwd_n, bwd_n = c["fwd_len_n"], c["bwd_len_n"]
+        packets = fwd_n + bwd_n
+        total = c["fwd_len_sum"] + c["bwd_len_sum"]
+        fwd = _summary(fwd_n, c["fwd_len_sum"], c["fwd_len_sq"], c["fwd_len_min"], c["fwd_len_max"])
+        bwd = _summary(bwd_n, c["bwd_len_sum"], c["bwd_len_sq"], c["bwd_len_min"], c["bwd_len_max"])
+        lengths = _summary(packets, total, c["fwd_len_sq"] + c["bwd_len_sq"],
+                           np.minimum(c["fwd_len_min"], c["bwd_len_min"]),
+                           np.maximum(c["fwd_len_max"], c["bwd_len_max"]))
+        flow_iat, fwd_iat, bwd_iat, active, idle = (
+            _summary(*(c[f"{stat}_{part}"] for part in ("n", "sum", "sq", "min", "max")))
+            for stat in ("flow_iat", "fwd_iat", "bwd_iat", "active", "idle"))
+        seconds = duration / 1e6
+        zeros = np.zeros(len(slots))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = [
+                c["dst_port"], duration, fwd_n, bwd_n, c["fwd_len_sum"], c["bwd_len_sum"],
+                fwd[2], fwd[3], fwd[0], fwd[1], bwd[2], bwd[3], bwd[0], bwd[1],
+                total / seconds, packets / seconds,
+                flow_iat[0], flow_iat[1], flow_iat[2], flow_iat[3],
+                c["fwd_iat_sum"], fwd_iat[0], fwd_iat[1], fwd_iat[2], fwd_iat[3],
+                c["bwd_iat_sum"], bwd_iat[0], bwd_iat[1], bwd_iat[2], bwd_iat[3],
+                c["fwd_psh"], c["bwd_psh"], c["fwd_urg"], c["bwd_urg"], c["fwd_header"], c["bwd_header"],
+                fwd_n / seconds, bwd_n / seconds,
+                lengths[3], lengths[2], lengths[0], lengths[1], lengths[1] ** 2,
+                *(c[f"{flag}_count"] for flag in ("fin", "syn", "rst", "psh", "ack", "urg", "cwe", "ece")),
+                np.where(fwd_n > 0, np.floor(bwd_n / fwd_n), 0), np.where(packets > 0, total / packets, 0),
+                fwd[0], bwd[0], c["fwd_header"],
+                zeros, zeros, zeros, zeros, zeros, zeros,
+                fwd_n, c["fwd_len_sum"], bwd_n, c["bwd_len_sum"],
+                c["init_win_fwd"], c["init_win_bwd"], c["act_data_fwd"],
+                np.where(np.isinf(c["min_seg_fwd"]), 0, c["min_seg_fwd"]),
+                active[0], active[1], active[2], active[3], idle[0], idle[1], idle[2], idle[3],
+            ]
+        index = pd.Index([self._flow_id_string(s) for s in slots.tolist()], name="Flow ID")
+        return pd.DataFrame(dict(zip(FEATURE_COLUMNS, values)), index=index)
+
+    def _flow_id_string(self, slot):
+        proto, _, _, (src, sport), (dst, dport) = self._flow_id[slot]
+        return f"{src}-{dst}-{sport}-{dport}-{proto}"
+
+
+def flow_features(path, chunk_size=65536, **meter_options):
+    """Yield FEATURE_COLUMNS DataFrames for the flows of a capture as they end."""
+    meter = FlowMeter(**meter_options)
+    for packets in read_pcap_columns(path, chunk_size=chunk_size):
+        features = meter.add_packets(packets)
+        if len(features):
+            yield features
+    features = meter.flush()
+    if len(features):
+        yield features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pcaps", nargs="+")
+    parser.add_argument("--output", required=True, help="CSV of FEATURE_COLUMNS rows, one per flow")
+    parser.add_argument("--flow-ids", action="store_true", help="prepend the Flow ID column")
+    parser.add_argument("--flow-timeout", type=float, default=120.0)
+    parser.add_argument("--activity-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    flows = 0
+    with open(args.output, "w") as out:
+        for path in args.pcaps:
+            for features in flow_features(path, flow_timeout=args.flow_timeout,
+                                          activity_timeout=args.activity_timeout):
+                features.to_csv(out, header=flows == 0, index=args.flow_ids)
+                flows += len(features)
+    print(f"Wrote {flows} flows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
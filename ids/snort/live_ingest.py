@@ -0,0 +1,245 @@
+"""
+Live ingestion of start_tcpdump.sh's rotating captures into the flow meter and ANN detector.
+
+start_tcpdump.sh runs `tcpdump -C 5000 -W 2 -w traffic.pcap0`: a ring of two
+files (traffic.pcap00, traffic.pcap01). tcpdump fills them in turn and
+truncates the older one when it wraps around. CaptureFollower polls the
+capture directory and reads every file from its last byte offset with
+pcap_columns.read_pcap_tail. Each poll decodes only the records appended
+since the previous one; a record still being written is left for the next
+poll. Files are read oldest first (by modification time), so the end of a
+just-closed file is read before the file that replaced it.
+
+Offsets are checkpointed per file name in a host_ids CursorStore (JSON,
+replaced atomically) once a chunk's flows have been handed to the detector.
+A cursor also keeps the file's first record header. When tcpdump wraps
+around and rewrites a file, the header no longer matches and the file is
+read from the start again. After a restart every file resumes from its
+cursor, so no packet is decoded twice. Flows that were open at the restart
+lose the packets seen before it.
+
+Decoded packets feed one flow_meter.FlowMeter across all files, since flows
+span rotations. Ended flows go to a fl_common MicroBatchDetector running
+the NumPy runtime the clients export (runtime_export_path). That runtime
+applies the training scaler and NaN/inf cleaning itself, and it is reloaded
+whenever the file is rewritten. With --quantized the runtime is the int8
+model the clients write to quantized_export_path instead.
+
+Each verdict records its detection lag: the wall-clock time of the verdict
+minus the time the flow ended. That is the flow's last packet, or flow
+start + flow_timeout for flows that timed out. A flow is only classified
+once it ends, so long-lived flows wait for their FIN or the flow timeout.
+
+Usage:
+    python live_ingest.py /home/rtikes/pcap --runtime global_model.npz --checkpoint ingest_cursors.json
+"""
+
+import argparse
+import glob
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from fl_common.detection_engine import HotSwapModel, MicroBatchDetector
+from fl_common.numpy_runtime import NumpyANN
+from fl_common.quantized_runtime import QuantizedANN
+from ids.host_ids.log_reader import CursorStore
+from flow_meter import FEATURE_COLUMNS, FlowMeter
+from pcap_columns import read_pcap_tail
+
+logger = logging.getLogger(__name__)
+
+PCAP_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+
+
+def first_record(path):
+    """Hex of the file's first record header, or None while tcpdump has not written one yet."""
+    with open(path, "rb") as f:
+        f.seek(PCAP_HEADER_SIZE)
+        header = f.read(RECORD_HEADER_SIZE)
+    return header.hex() if len(header) == RECORD_HEADER_SIZE else None
+
+
+class CaptureFollower:
+    """Incrementally decode a directory of rotating pcap files, checkpointing a byte offset per file."""
+
+    def __init__(self, directory, pattern="traffic.pcap*", cursors=None, chunk_size=65536):
+        self.directory = directory
+        self.pattern = pattern
+        self.cursors = cursors or CursorStore(None)
+        self.chunk_size = chunk_size
+        self.packets = 0
+
+    def files(self):
+        """Capture files, oldest first."""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, self.pattern)):
+            try:
+                entries.append((os.stat(path).st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(entries)]
+
+    def poll(self):
+        """Yield (file name, packets) for the records written since the last poll.
+
+        A chunk's cursor is saved when the caller asks for the next one, i.e.
+        once it has been handled; a chunk the caller never finishes is read
+        again on the next poll.
+        """
+        for path in self.files():
+            name = os.path.basename(path)
+            try:
+                identity, size = first_record(path), os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+            if identity is None:
+                continue
+            cursor = self.cursors.get(name)
+            if not cursor or cursor["first_record"] != identity or cursor["offset"] > size:
+                if cursor:
+                    logger.info(f"{name} was rewritten; reading it from the start")
+                cursor = {"first_record": identity, "offset": PCAP_HEADER_SIZE, "packets": 0}
+            if cursor["offset"] + RECORD_HEADER_SIZE > size:
+                continue
+            for packets, offset in read_pcap_tail(path, cursor["offset"], self.chunk_size, cursor["packets"] + 1):
+                yield name, packets
+                cursor = {"first_record": identity, "offset": offset, "packets": cursor["packets"] + len(packets)}
+                self.packets += len(packets)
+                self.cursors.update(name, cursor)
+                self.cursors.save()
+
+
+class DetectionLag:
+    """Ring buffer of packet-to-verdict lags (seconds) for percentile reporting."""
+
+    def __init__(self, window=100000):
+        self._lags = np.zeros(window, np.float64)
+        self.count = 0
+
+    def record(self, lags):
+        lags = np.asarray(lags, np.float64)
+        slots = (self.count + np.arange(len(lags))) % self._lags.size
+        self._lags[slots] = lags
+        self.count += len(lags)
+
+    def percentiles(self, percentiles=(50, 99)):
+        filled = self._lags[:min(self.count, self._lags.size)]
+        if filled.size == 0:
+            return {p: float("nan") for p in percentiles}
+        return dict(zip(percentiles, np.percentile(filled, percentiles).tolist()))
+
+
+def load_runtime(path, quantized=False):
+    """The clients' exported NumPy runtime (fl_common.numpy_runtime), or its int8 version."""
+    return QuantizedANN.load(path) if quantized else NumpyANN.load(path)
+
+
+class LiveDetector:
+    """FlowMeter plus MicroBatchDetector; ended flows are classified and their detection lag recorded."""
+
+    def __init__(self, predict_fn, flow_timeout=120.0, activity_timeout=5.0, threshold=0.5, max_batch=256,
+                 max_delay_ms=5.0, on_verdicts=None):
+        self.meter = FlowMeter(flow_timeout=flow_timeout, activity_timeout=activity_timeout)
+        self.lag = DetectionLag()
+        self.on_verdicts = on_verdicts
+        self.detector = MicroBatchDetector(predict_fn, len(FEATURE_COLUMNS), max_batch=max_batch,
+                                           max_delay_ms=max_delay_ms, threshold=threshold,
+                                           on_verdicts=self._verdicts)
+
+    def add_packets(self, packets):
+        self._submit(self.meter.add_packets(packets), self.meter.ended_at)
+
+    def expire(self, now=None):
+        """Classify flows that timed out while no packets arrived."""
+        self._submit(self.meter.expire(time.time() if now is None else now), self.meter.ended_at)
+
+    def _submit(self, features, ended_at):
+        values = features.to_numpy(dtype=np.float32)
+        for flow_id, row, end in zip(features.index, values, ended_at.tolist()):
+            self.detector.submit((flow_id, end), row)
+
+    def _verdicts(self, verdicts):
+        now = time.time()
+        self.lag.record([now - verdict.flow_id[1] for verdict in verdicts])
+        for verdict in verdicts:
+            if verdict.is_attack:
+                logger.warning(f"Attack flow {verdict.flow_id[0]} (score {verdict.score:.3f})")
+        if self.on_verdicts is not None:
+            self.on_verdicts(verdicts, now)
+
+    def close(self):
+        self.detector.close()
+
+
+def follow(follower, live, poll_interval=1.0, stop=None, runtime_path=None, model=None, quantized=False,
+           report_interval=60.0):
+    """Feed new capture data to live until stop is set, reloading the runtime when its file changes."""
+    stop = stop or threading.Event()
+    runtime_mtime = os.stat(runtime_path).st_mtime_ns if runtime_path else None
+    last_report = time.monotonic()
+    while not stop.is_set():
+        packets = 0
+        for _, chunk in follower.poll():
+            if stop.is_set():
+                break
+            live.add_packets(chunk)
+            packets += len(chunk)
+        if not packets:
+            live.expire()
+        if runtime_path and model is not None:
+            mtime = os.stat(runtime_path).st_mtime_ns
+            if mtime != runtime_mtime:
+                runtime_mtime = mtime
+                model.swap(load_runtime(runtime_path, quantized))
+                logger.info(f"Reloaded detection model from {runtime_path}")
+        if time.monotonic() - last_report >= report_interval:
+            last_report = time.monotonic()
+            lag = live.lag.percentiles()
+            logger.info(f"{follower.packets} packets, {live.meter.active_flows} open flows, "
+                        f"{live.detector.flows_processed} verdicts ({live.detector.alerts} alerts), "
+                        f"detection lag p50 {lag[50]:.3f}s p99 {lag[99]:.3f}s")
+        if not packets:
+            stop.wait(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="capture directory written by start_tcpdump.sh")
+    parser.add_argument("--pattern", default="traffic.pcap*")
+    parser.add_argument("--runtime", required=True, help="NumPy runtime exported by the clients (runtime_export_path)")
+    parser.add_argument("--quantized", action="store_true", help="the runtime is an int8 QuantizedANN artifact (quantized_export_path)")
+    parser.add_argument("--checkpoint", help="JSON file of per-file offsets (default: no checkpoint)")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--flow-timeout", type=float, default=120.0)
+    parser.add_argument("--activity-timeout", type=float, default=5.0)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    model = HotSwapModel(load_runtime(args.runtime, args.quantized))
+    follower = CaptureFollower(args.directory, args.pattern, CursorStore(args.checkpoint), args.chunk_size)
+    live = LiveDetector(model, flow_timeout=args.flow_timeout, activity_timeout=args.activity_timeout,
+                        threshold=args.threshold)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    logger.info(f"Following {os.path.join(args.directory, args.pattern)}")
+    try:
+        follow(follower, live, args.poll_interval, stop, args.runtime, model, args.quantized)
+    finally:
+        live.close()
+        follower.cursors.save()
+
+
+if __name__ == "__main__":
+    main()
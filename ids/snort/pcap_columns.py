@@ -0,0 +1,300 @@
+"""
+Memory-mapped, vectorized pcap-to-columns decoder.
+
+read_pcap_columns() maps the capture with mmap. For each chunk it first
+walks the record headers to find chunk_size record offsets. That walk is
+the only per-packet Python loop. It then decodes every header field for
+the whole chunk with NumPy on a frombuffer view of the mapping. Each packet
+costs three fixed-width window copies (link, network and transport header),
+taken through a sliding_window_view. Fields are then plain column
+arithmetic on those windows. Pages behind a finished chunk are released
+with madvise, so resident memory stays bounded by the chunk size on
+multi-GB captures.
+
+chunk_offsets() and read_chunk() split the same work into independently
+decodable chunks for process pools. read_pcap_tail() resumes from a byte
+offset and stops before a partly written record, for captures that are
+still being written. It reads the file in TAIL_BLOCK_SIZE blocks instead of
+mapping it: a live capture can be truncated by tcpdump's ring at any time,
+which turns any access to a mapped page past the new end into SIGBUS, and a
+multi-GB mapping does not fit a 32-bit Raspberry Pi OS address space.
+
+Chunks are pandas DataFrames with the same columns and semantics as
+pcap_reader.read_pcap (pcap_reader.COLUMNS). Fields that do not apply to a
+packet are null, stored as nullable integer columns. Addresses are
+formatted once per distinct address in the chunk.
+"""
+
+import mmap
+import os
+import socket
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from pcap_reader import (COLUMNS, ETHERTYPE_IPV4, ETHERTYPE_IPV6, LINKTYPE_ETHERNET, LINKTYPE_IPV4, LINKTYPE_IPV6,
+                         LINKTYPE_LINUX_SLL, LINKTYPE_RAW, VLAN_ETHERTYPES, read_header)
+
+MAX_VLAN_TAGS = 2
+TAIL_BLOCK_SIZE = 8 << 20
+
+
+class _Frames:
+    """Bounds-checked byte windows over the frames of one chunk."""
+
+    def __init__(self, data, start, cap_len):
+        self.data = data
+        self.end = start + cap_len
+        self.last = len(data) - 1
+
+    def window(self, positions, width):
+        """Copy width bytes from each position (one row per packet); bytes past the end of the file repeat the last one."""
+        limit = len(self.data) - width
+        if limit < 0:
+            return self.data[np.minimum(positions[:, None] + np.arange(width), self.last)]
+        rows = sliding_window_view(self.data, width)[np.minimum(positions, limit)]
+        over = positions > limit
+        if over.any():
+            rows[over] = self.data[np.minimum(positions[over, None] + np.arange(width), self.last)]
+        return rows
+
+    def has(self, positions, size):
+        return positions + size <= self.end
+
+
+def _uint(window, offset, size):
+    # Big-endian unsigned field at a fixed offset in every row; only meaningful where _Frames.has() holds
+    value = window[:, offset].astype(np.int64)
+    for k in range(1, size):
+        value = (value << 8) | window[:, offset + k]
+    return value
+
+
+def _nullable(values, valid):
+    return pd.arrays.IntegerArray(np.where(valid, values, 0).astype(np.int64), ~valid)
+
+
+def _ipv4_strings(values):
+    uniques, inverse = np.unique(values, return_inverse=True)
+    names = np.array([socket.inet_ntoa(int(v).to_bytes(4, "big")) for v in uniques], dtype=object)
+    return names[inverse]
+
+
+def _ipv6_strings(addresses):
+    raw = np.ascontiguousarray(addresses).view(np.dtype((np.void, 16))).ravel()
+    uniques, inverse = np.unique(raw, return_inverse=True)
+    names = np.array([socket.inet_ntop(socket.AF_INET6, bytes(v)) for v in uniques], dtype=object)
+    return names[inverse]
+
+
+def scan_records(mapped, offset, record, count):
+    """Offsets of up to count complete records starting at offset, and the offset after the last one."""
+    offsets = []
+    size = len(mapped)
+    unpack = record.unpack_from
+    while len(offsets) < count and offset + 16 <= size:
+        cap_len = unpack(mapped, offset)[2]
+        if offset + 16 + cap_len > size:
+            break
+        offsets.append(offset)
+        offset += 16 + cap_len
+    return np.asarray(offsets, dtype=np.int64), offset
+
+
+def decode_records(data, offsets, order, scale, linktype, first_number=1):
+    """Decode the records at offsets (record header positions in data) into a DataFrame of COLUMNS."""
+    n = len(offsets)
+    header = np.ascontiguousarray(sliding_window_view(data, 16)[offsets]).view(order + "u4").astype(np.int64)
+    cap_len, orig_len = header[:, 2], header[:, 3]
+    start = offsets + 16
+    frames = _Frames(data, start, cap_len)
+    has = frames.has
+
+    # Link layer
+    if linktype == LINKTYPE_ETHERNET:
+        link = frames.window(start, 14 + 4 * MAX_VLAN_TAGS)
+        has_eth = has(start, 14)
+        eth_type = _uint(link, 12, 2)
+        tagged = has_eth
+        l3 = start + 14
+        for tag in range(MAX_VLAN_TAGS):
+            tagged = tagged & np.isin(eth_type, VLAN_ETHERTYPES) & has(l3, 4)
+            eth_type = np.where(tagged, _uint(link, 16 + 4 * tag, 2), eth_type)
+            l3 = l3 + 4 * tagged
+    elif linktype == LINKTYPE_LINUX_SLL:
+        has_eth = has(start, 16)
+        eth_type = _uint(frames.window(start, 16), 14, 2)
+        l3 = start + 16
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        has_eth = has(start, 1)
+        eth_type = np.where(_uint(frames.window(start, 1), 0, 1) >> 4 == 6, ETHERTYPE_IPV6, ETHERTYPE_IPV4)
+        l3 = start
+    else:
+        has_eth, eth_type, l3 = np.zeros(n, dtype=bool), np.zeros(n, dtype=np.int64), start
+
+    # Network layer; one 40-byte window covers the IPv6 header and the fixed IPv4 header
+    net = frames.window(l3, 40)
+    is_v4 = has_eth & (eth_type == ETHERTYPE_IPV4) & has(l3, 20)
+    is_v6 = has_eth & (eth_type == ETHERTYPE_IPV6) & has(l3, 40)
+    is_ip = is_v4 | is_v6
+    ip_header_len = np.where(is_v4, (_uint(net, 0, 1) & 0x0F) * 4, 40)
+    ip_len = np.where(is_v4, _uint(net, 2, 2), _uint(net, 4, 2) + 40)
+    # Segmentation offload captures report a zero IPv4 total length
+    ip_len = np.where(is_v4 & (ip_len == 0), frames.end - l3, ip_len)
+    ip_proto = np.where(is_v4, _uint(net, 9, 1), _uint(net, 6, 1))
+    ip_ttl = np.where(is_v4, _uint(net, 8, 1), _uint(net, 7, 1))
+    ip_src = np.full(n, "", dtype=object)
+    ip_dst = np.full(n, "", dtype=object)
+    if is_v4.any():
+        v4 = net[is_v4]
+        ip_src[is_v4] = _ipv4_strings(_uint(v4, 12, 4))
+        ip_dst[is_v4] = _ipv4_strings(_uint(v4, 16, 4))
+    if is_v6.any():
+        v6 = net[is_v6]
+        ip_src[is_v6] = _ipv6_strings(v6[:, 8:24])
+        ip_dst[is_v6] = _ipv6_strings(v6[:, 24:40])
+
+    # Transport layer; snapshot length can cut it short, so only decode what was captured
+    l4 = l3 + ip_header_len
+    transport = frames.window(l4, 16)
+    transport_end = np.minimum(frames.end, l3 + ip_len)
+    is_tcp = is_ip & (ip_proto == 6) & (l4 + 20 <= transport_end)
+    is_udp = is_ip & (ip_proto == 17) & (l4 + 8 <= transport_end)
+    is_icmp = is_ip & np.isin(ip_proto, (1, 58)) & (l4 + 2 <= transport_end)
+    has_ports = is_tcp | is_udp
+    data_offset = _uint(transport, 12, 1)
+    tcp_header_len = (data_offset >> 4) * 4
+    udp_length = _uint(transport, 4, 2)
+
+    payload_len = np.where(is_ip, np.maximum(0, ip_len - ip_header_len), 0)
+    payload_len = np.where(is_tcp, np.maximum(0, payload_len - tcp_header_len), payload_len)
+    payload_len = np.where(is_udp, np.maximum(0, udp_length - 8), payload_len)
+    payload_len = np.where(is_icmp, np.maximum(0, payload_len - 8), payload_len)
+
+    columns = {
+        "frame_number": np.arange(first_number, first_number + n, dtype=np.int64),
+        "frame_time": header[:, 0] + header[:, 1] * scale,
+        "frame_len": orig_len,
+        "cap_len": cap_len,
+        "eth_type": _nullable(eth_type, has_eth),
+        "ip_version": _nullable(np.where(is_v4, 4, 6), is_ip),
+        "ip_src": ip_src,
+        "ip_dst": ip_dst,
+        "ip_proto": _nullable(ip_proto, is_ip),
+        "ip_len": _nullable(ip_len, is_ip),
+        "ip_ttl": _nullable(ip_ttl, is_ip),
+        "ip_header_len": _nullable(ip_header_len, is_ip),
+        "src_port": _nullable(_uint(transport, 0, 2), has_ports),
+        "dst_port": _nullable(_uint(transport, 2, 2), has_ports),
+        "tcp_flags": _nullable(_uint(transport, 13, 1) | (data_offset & 0x01) << 8, is_tcp),
+        "tcp_window": _nullable(_uint(transport, 14, 2), is_tcp),
+        "tcp_header_len": _nullable(tcp_header_len, is_tcp),
+        "udp_length": _nullable(udp_length, is_udp),
+        "icmp_type": _nullable(_uint(transport, 0, 1), is_icmp),
+        "icmp_code": _nullable(_uint(transport, 1, 1), is_icmp),
+        "payload_len": payload_len,
+    }
+    return pd.DataFrame({name: columns[name] for name in COLUMNS})
+
+
+def read_pcap_columns(path, chunk_size=65536, max_packets=None):
+    """Yield DataFrames of COLUMNS holding up to chunk_size packets each."""
+    for packets, _ in _read_chunks(path, 24, chunk_size, max_packets, 1):
+        yield packets
+
+
+def read_pcap_tail(path, offset=24, chunk_size=65536, first_number=1, block_size=TAIL_BLOCK_SIZE):
+    """Yield (DataFrame, next offset) for the complete records from offset on in a capture that may still grow.
+
+    Only the bytes present when the call starts are read, block_size bytes
+    at a time. A record still being written at the end of the file is left
+    for the next call, which resumes from the last offset yielded.
+    """
+    with open(path, "rb") as f:
+        record, scale, linktype = read_header(f)
+        order = record.format[0]
+        end = os.fstat(f.fileno()).st_size
+        f.seek(offset)
+        # buffer holds the file bytes from base on; pos is the first record not yet decoded
+        buffer, base, pos = b"", offset, 0
+        count = 0
+        eof = False
+        while True:
+            offsets, next_pos = scan_records(buffer, pos, record, chunk_size)
+            if len(offsets) < chunk_size and not eof:
+                # Short read if the file was truncated meanwhile; whatever was read is still decodable
+                block = f.read(max(0, min(block_size, end - f.tell())))
+                if block:
+                    buffer, base, pos = buffer[pos:] + block, base + pos, 0
+                else:
+                    eof = True
+                continue
+            if not len(offsets):
+                break
+            packets = decode_records(np.frombuffer(buffer, dtype=np.uint8), offsets, order, scale, linktype,
+                                     first_number + count)
+            yield packets, base + next_pos
+            count += len(offsets)
+            pos = next_pos
+
+
+def _read_chunks(path, offset, chunk_size, max_packets, first_number):
+    with open(path, "rb") as f:
+        record, scale, linktype = read_header(f)
+        order = record.format[0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+            data = np.frombuffer(mapped, dtype=np.uint8)
+            count = 0
+            try:
+                while max_packets is None or count < max_packets:
+                    limit = chunk_size if max_packets is None else min(chunk_size, max_packets - count)
+                    offsets, next_offset = scan_records(mapped, offset, record, limit)
+                    if not len(offsets):
+                        break
+                    yield decode_records(data, offsets, order, scale, linktype, first_number + count), next_offset
+                    count += len(offsets)
+                    # Decoded pages are not read again; drop them from this mapping's resident set
+                    done = offset - offset % mmap.PAGESIZE
+                    released = next_offset - next_offset % mmap.PAGESIZE
+                    if released > done:
+                        mapped.madvise(mmap.MADV_DONTNEED, done, released - done)
+                    offset = next_offset
+            finally:
+                # The mapping cannot be closed while a NumPy view still exports its buffer
+                del data
+
+
+def chunk_offsets(path, chunk_size=65536, max_packets=None):
+    """Yield (record offset, packet count, first frame number) for each chunk without decoding it.
+
+    Each chunk can then be decoded on its own with read_chunk(), e.g. by a
+    separate worker process.
+    """
+    with open(path, "rb") as f:
+        record = read_header(f)[0]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            offset = 24
+            count = 0
+            while max_packets is None or count < max_packets:
+                limit = chunk_size if max_packets is None else min(chunk_size, max_packets - count)
+                offsets, next_offset = scan_records(mapped, offset, record, limit)
+                if not len(offsets):
+                    break
+                yield offset, len(offsets), count + 1
+                count += len(offsets)
+                offset = next_offset
+
+
+def read_chunk(path, offset, count, first_number=1):
+    """Decode count records starting at the record offset from chunk_offsets() into a DataFrame of COLUMNS."""
+    with open(path, "rb") as f:
+        record, scale, linktype = read_header(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                offsets = scan_records(mapped, offset, record, count)[0]
+                return decode_records(data, offsets, record.format[0], scale, linktype, first_number)
+            finally:
+                del data
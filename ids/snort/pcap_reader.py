@@ -0,0 +1,179 @@
+"""
+Streaming libpcap reader with struct-based header decoding (no tshark).
+
+read_pcap() reads a classic .pcap file in large blocks. It walks the record
+headers in place and decodes each frame with precompiled struct.Struct
+objects:
+
+- link layer: Ethernet II (with 802.1Q/802.1ad VLAN tags), Linux cooked
+  capture (SLL) and raw IP;
+- network: IPv4 (IHL, total length, TTL, protocol, addresses) and IPv6
+  (next header, payload length, hop limit, addresses; no extension-header
+  walking);
+- transport: TCP (ports, flags, header length, window), UDP (ports,
+  length) and ICMP/ICMPv6 (type, code).
+
+Decoded fields are appended to column buffers and yielded every chunk_size
+packets as a dict of lists, so memory stays bounded for captures of any
+size. Microsecond and nanosecond pcaps in either byte order are supported;
+pcapng is not (convert with `editcap -F pcap`).
+"""
+
+import socket
+import struct
+
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_ARP = 0x0806
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+
+PROTO_NAMES = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "ICMPV6"}
+
+COLUMNS = [
+    "frame_number", "frame_time", "frame_len", "cap_len", "eth_type", "ip_version", "ip_src", "ip_dst",
+    "ip_proto", "ip_len", "ip_ttl", "ip_header_len", "src_port", "dst_port", "tcp_flags", "tcp_window",
+    "tcp_header_len", "udp_length", "icmp_type", "icmp_code", "payload_len",
+]
+
+ETHERNET = struct.Struct("!6s6sH")
+VLAN = struct.Struct("!HH")
+SLL = struct.Struct("!HHH8sH")
+IPV4 = struct.Struct("!BBHHHBBH4s4s")
+IPV6 = struct.Struct("!IHBB16s16s")
+TCP = struct.Struct("!HHIIBBHHH")
+UDP = struct.Struct("!HHHH")
+ICMP = struct.Struct("!BB")
+
+READ_BLOCK = 4 * 2 ** 20
+
+
+def read_header(f):
+    """Parse the 24-byte global header; returns (record Struct, timestamp scale, linktype)."""
+    header = f.read(24)
+    if len(header) < 24 or header[:4] not in PCAP_MAGIC:
+        raise ValueError(f"Not a libpcap file (magic {header[:4].hex()}); pcapng needs `editcap -F pcap` first")
+    order, scale = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack_from(order + "I", header, 20)[0] & 0x0FFFFFFF
+    return struct.Struct(order + "IIII"), scale, linktype
+
+
+def iter_records(f):
+    """Yield (timestamp, orig_len, frame bytes) for each record, reading the file in large blocks."""
+    record, scale, linktype = read_header(f)
+    buffer = b""
+    offset = 0
+    while True:
+        block = f.read(READ_BLOCK)
+        if not block:
+            return
+        buffer = buffer[offset:] + block
+        offset = 0
+        end = len(buffer)
+        while offset + 16 <= end:
+            ts_sec, ts_frac, cap_len, orig_len = record.unpack_from(buffer, offset)
+            if offset + 16 + cap_len > end:
+                break
+            yield ts_sec + ts_frac * scale, orig_len, buffer[offset + 16:offset + 16 + cap_len]
+            offset += 16 + cap_len
+
+
+def decode_frame(frame, linktype):
+    """Decode one frame into a tuple of the COLUMNS fields after cap_len."""
+    eth_type = ip_version = ip_proto = ip_len = ip_ttl = ip_header_len = None
+    src_port = dst_port = tcp_flags = tcp_window = tcp_header_len = udp_length = icmp_type = icmp_code = None
+    ip_src = ip_dst = ""
+    payload_len = 0
+    size = len(frame)
+    offset = 0
+
+    if linktype == LINKTYPE_ETHERNET and size >= 14:
+        eth_type = ETHERNET.unpack_from(frame, 0)[2]
+        offset = 14
+        while eth_type in VLAN_ETHERTYPES and size >= offset + 4:
+            eth_type = VLAN.unpack_from(frame, offset)[1]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL and size >= 16:
+        eth_type = SLL.unpack_from(frame, 0)[4]
+        offset = 16
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6) and size:
+        eth_type = ETHERTYPE_IPV6 if frame[0] >> 4 == 6 else ETHERTYPE_IPV4
+
+    if eth_type == ETHERTYPE_IPV4 and size >= offset + 20:
+        version_ihl, _, ip_len, _, _, ip_ttl, ip_proto, _, src, dst = IPV4.unpack_from(frame, offset)
+        ip_version = 4
+        ip_header_len = (version_ihl & 0x0F) * 4
+        if not ip_len:
+            # Segmentation offload captures report a zero total length
+            ip_len = size - offset
+        ip_src, ip_dst = socket.inet_ntoa(src), socket.inet_ntoa(dst)
+    elif eth_type == ETHERTYPE_IPV6 and size >= offset + 40:
+        _, payload, ip_proto, ip_ttl, src, dst = IPV6.unpack_from(frame, offset)
+        ip_version = 6
+        ip_header_len = 40
+        ip_len = payload + 40
+        ip_src, ip_dst = socket.inet_ntop(socket.AF_INET6, src), socket.inet_ntop(socket.AF_INET6, dst)
+
+    if ip_version is not None:
+        # Snapshot length can cut the transport header short; only decode what was captured
+        transport_end = min(size, offset + ip_len)
+        offset += ip_header_len
+        payload_len = max(0, ip_len - ip_header_len)
+        if ip_proto == 6 and transport_end >= offset + 20:
+            src_port, dst_port, _, _, data_offset, tcp_flags, tcp_window, _, _ = TCP.unpack_from(frame, offset)
+            tcp_header_len = (data_offset >> 4) * 4
+            tcp_flags |= (data_offset & 0x01) << 8
+            payload_len = max(0, payload_len - tcp_header_len)
+        elif ip_proto == 17 and transport_end >= offset + 8:
+            src_port, dst_port, udp_length, _ = UDP.unpack_from(frame, offset)
+            payload_len = max(0, udp_length - 8)
+        elif ip_proto in (1, 58) and transport_end >= offset + 2:
+            icmp_type, icmp_code = ICMP.unpack_from(frame, offset)
+            payload_len = max(0, payload_len - 8)
+
+    return (eth_type, ip_version, ip_src, ip_dst, ip_proto, ip_len, ip_ttl, ip_header_len, src_port, dst_port,
+            tcp_flags, tcp_window, tcp_header_len, udp_length, icmp_type, icmp_code, payload_len)
+
+
+def _column_buffers():
+    columns = {name: [] for name in COLUMNS}
+    return columns, [columns[name].append for name in COLUMNS]
+
+
+def read_pcap(path, chunk_size=100000, max_packets=None):
+    """Yield dicts of column lists (see COLUMNS) holding up to chunk_size packets each."""
+    with open(path, "rb") as f:
+        _, _, linktype = read_header(f)
+        f.seek(0)
+        columns, appends = _column_buffers()
+        count = 0
+        for timestamp, orig_len, frame in iter_records(f):
+            count += 1
+            fields = (count, timestamp, orig_len, len(frame)) + decode_frame(frame, linktype)
+            for append, value in zip(appends, fields):
+                append(value)
+            if count % chunk_size == 0:
+                yield columns
+                columns, appends = _column_buffers()
+            if max_packets is not None and count >= max_packets:
+                break
+        if columns["frame_number"]:
+            yield columns
+
+
+def protocol_name(ip_proto, eth_type):
+    """Transport-level protocol name for the legacy ip_proto column (TCP/UDP/ICMP/IP/ARP/ETH)."""
+    if ip_proto is not None:
+        return PROTO_NAMES.get(ip_proto, "IP")
+    return "ARP" if eth_type == ETHERTYPE_ARP else "ETH"
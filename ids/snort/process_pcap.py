@@ -1,60 +1,186 @@
-import pyshark
-import pandas as pd
+import argparse
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from flow_labels import label_packets, load_flows
+from pcap_columns import chunk_offsets, read_chunk
+from pcap_reader import ETHERTYPE_ARP, PROTO_NAMES
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
-def process_packets(packet, labels_df, idx, data, lock):
-    try:
-        if idx < len(labels_df):
-            row = labels_df.iloc[idx]
-            with lock:
-                data['frame_number'].append(packet.number)
-                data['frame_len'].append(packet.length)
-                data['frame_time_relative'].append(packet.sniff_time.timestamp())
-                data['ip_proto'].append(packet.highest_layer)
-                data['ip_src'].append(packet.ip.src if 'IP' in packet else '')
-                data['ip_dst'].append(packet.ip.dst if 'IP' in packet else '')
-                data['tcp_flags'].append(packet.tcp.flags if 'TCP' in packet else '')
-                data['udp_length'].append(packet.udp.length if 'UDP' in packet else '')
-                data['icmp_type'].append(packet.icmp.type if 'ICMP' in packet else '')
-                data['label'].append(row[' Label'])
-    except Exception as e:
-        logger.error(f"Error processing packet {idx}: {e}")
-
-def process_pcap(pcap_file, label_files, data, packet_count_override=None):
-    try:
-        capture = pyshark.FileCapture(pcap_file)
-        logger.debug("Processing packets from %s", pcap_file)
+OUTPUT_COLUMNS = ['frame_number', 'frame_len', 'frame_time_relative', 'ip_proto', 'ip_src', 'ip_dst',
+                  'tcp_flags', 'udp_length', 'icmp_type', 'label']
+
+# Set in each worker process by _init_worker; read-only afterwards
+_flows = None
+_time_slack = None
+
+def to_frame(packets):
+    # Same columns and formats as the former pyshark dissection
+    is_ip = packets['ip_proto'].notna().to_numpy()
+    is_arp = packets['eth_type'].eq(ETHERTYPE_ARP).fillna(False).to_numpy()
+    return pd.DataFrame({
+        'frame_number': packets['frame_number'],
+        'frame_len': packets['frame_len'],
+        'frame_time_relative': packets['frame_time'],
+        'ip_proto': np.where(is_ip, packets['ip_proto'].map(PROTO_NAMES).fillna('IP'), np.where(is_arp, 'ARP', 'ETH')),
+        'ip_src': packets['ip_src'],
+        'ip_dst': packets['ip_dst'],
+        'tcp_flags': np.where(packets['tcp_flags'].notna(),
+                              [f"0x{f:04x}" for f in packets['tcp_flags'].fillna(0).astype('int64')], ''),
+        'udp_length': packets['udp_length'],
+        'icmp_type': packets['icmp_type'],
+    })
+
+class ColumnarWriter:
+    """Write DataFrame or Arrow table chunks to Parquet (one zstd row group per chunk) or an Arrow IPC file (.arrow/.feather)."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.arrow = path.endswith(('.arrow', '.feather'))
+        self._writer = None
+        self._schema = None
 
-        packet_count = packet_count_override if packet_count_override else 10000
+    def read(self, path):
+        """Read back a whole file in this writer's format."""
+        if self.arrow:
+            with self.pa.memory_map(path) as source:
+                return self.pa.ipc.open_file(source).read_all()
+        return self.pq.read_table(path)
 
-        labels_dfs = [pd.read_csv(label_file) for label_file in label_files]
+    def write(self, df):
+        table = df if isinstance(df, self.pa.Table) else self.pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.arrow:
+                self._writer = self.pa.ipc.new_file(self.path, table.schema)
+            else:
+                self._writer = self.pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        self._writer.write_table(table.cast(self._schema))
 
-        lock = threading.Lock()
-        with ThreadPoolExecutor(max_workers=4) as executor:
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+def _init_worker(flows, time_slack):
+    global _flows, _time_slack
+    _flows, _time_slack = flows, time_slack
+
+def label_chunk(task):
+    """Worker: decode one chunk, join it to its capture's flow labels and write it to its own part file."""
+    capture, pcap_file, offset, count, first_number, part, columnar = task
+    start, cpu = time.perf_counter(), time.process_time()
+    packets = read_chunk(pcap_file, offset, count, first_number)
+    labels = label_packets(packets, _flows[capture], _time_slack)
+    if columnar:
+        writer = ColumnarWriter(part)
+        writer.write(packets.assign(label=labels))
+        writer.close()
+    else:
+        to_frame(packets).assign(label=labels).to_csv(part, header=False, index=False)
+    return len(packets), int(labels.notna().sum()), time.perf_counter() - start, time.process_time() - cpu
+
+def merge_parts(parts, output, columnar):
+    if columnar:
+        writer = ColumnarWriter(output)
+        for part in parts:
+            writer.write(writer.read(part))
+        writer.close()
+        return
+    with open(output, 'w') as out:
+        out.write(','.join(OUTPUT_COLUMNS) + '\n')
+        for part in parts:
+            with open(part) as f:
+                shutil.copyfileobj(f, out)
+
+def process_captures(captures, output, workers=None, chunk_size=65536, max_packets=None, time_slack=60.0,
+                     utc_offset_hours=-3.0):
+    """Decode and flow-label (pcap_file, label_files) captures into output; returns throughput stats.
+
+    Each chunk of each capture is a separate task for a process pool. A
+    worker decodes its chunk, labels it against its capture's flow index and
+    writes its own part file, so workers share no mutable state. The parts
+    are concatenated in capture and chunk order at the end. A .csv output
+    keeps the legacy columns; .parquet/.arrow/.feather outputs hold every
+    pcap_columns column.
+    """
+    columnar = not output.endswith('.csv')
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    flows = [load_flows(label_files, utc_offset_hours) for _, label_files in captures]
+    logger.info(f"Indexed {sum(len(f) for f in flows)} labelled flows in {time.perf_counter() - start:.1f}s")
+
+    parts_dir = tempfile.mkdtemp(prefix='.parts-', dir=os.path.dirname(os.path.abspath(output)))
+    parts = []
+    packets = labelled = 0
+    cpu_seconds = 0.0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(flows, time_slack)) as pool:
             futures = []
-            for idx, packet in enumerate(capture):
-                if idx >= packet_count:
-                    break
-                for labels_df in labels_dfs:
-                    futures.append(executor.submit(process_packets, packet, labels_df, idx, data, lock))
-                
-                if idx % 100 == 0:
-                    logger.info(f"Processed {idx} packets from {pcap_file}")
-
-            for future in as_completed(futures):
-                future.result()
-
-        capture.close()
-    except Exception as e:
-        logger.error(f"Error processing packets: {e}")
+            for capture, (pcap_file, _) in enumerate(captures):
+                logger.info(f"Processing {pcap_file}")
+                for offset, count, first_number in chunk_offsets(pcap_file, chunk_size, max_packets):
+                    part = os.path.join(parts_dir, f"{len(parts):06d}{os.path.splitext(output)[1]}")
+                    parts.append(part)
+                    futures.append(pool.submit(label_chunk, (capture, pcap_file, offset, count, first_number, part,
+                                                             columnar)))
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk_packets, chunk_labelled, _, chunk_cpu = future.result()
+                packets += chunk_packets
+                labelled += chunk_labelled
+                cpu_seconds += chunk_cpu
+                if done % 50 == 0 or done == len(futures):
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"Labelled {done}/{len(futures)} chunks, {packets} packets ({packets / elapsed:.0f} packets/s)")
+        merge_parts(parts, output, columnar)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'packets': packets,
+        'labelled': labelled,
+        'seconds': elapsed,
+        'workers': workers,
+        'packets_per_second': packets / elapsed,
+        'packets_per_second_per_core': packets / elapsed / workers,
+        'packets_per_cpu_second': packets / cpu_seconds if cpu_seconds else 0.0,
+    }
+    logger.info(f"{packets} packets in {elapsed:.1f}s, {labelled / max(packets, 1):.1%} matched to a labelled flow: "
+                f"{stats['packets_per_second']:.0f} packets/s on {workers} workers, "
+                f"{stats['packets_per_second_per_core']:.0f} per core "
+                f"({stats['packets_per_cpu_second']:.0f} per worker CPU-second)")
+    return stats
 
 def main():
+    parser = argparse.ArgumentParser(description="Decode CICIDS2017 pcaps into a labelled packet dataset")
+    parser.add_argument('--max-packets', type=int, default=None, help="per capture (default: all packets)")
+    parser.add_argument('--chunk-size', type=int, default=65536, help="packets per worker task")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--time-slack', type=float, default=60.0,
+                        help="seconds a packet may fall outside its flow's window (label timestamps can lack seconds)")
+    parser.add_argument('--utc-offset', type=float, default=-3.0, help="UTC offset of the label CSV timestamps, in hours")
+    parser.add_argument('--bulk', action='store_true',
+                        help="default to combined_dataset.parquet with every pcap_columns column (needs pyarrow)")
+    parser.add_argument('--output', help="a .csv output keeps the legacy columns; .parquet/.arrow/.feather hold them all")
+    args = parser.parse_args()
+
     pcap_files = [
         "/ml/Lightweight-IDS/cicids2017/Monday-WorkingHours.pcap",
         "/ml/Lightweight-IDS/cicids2017/Tuesday-WorkingHours.pcap",
@@ -77,18 +203,11 @@ def main():
         ]
     ]
 
-    data = {
-        'frame_number': [], 'frame_len': [], 'frame_time_relative': [], 'ip_proto': [],
-        'ip_src': [], 'ip_dst': [], 'tcp_flags': [], 'udp_length': [], 'icmp_type': [], 'label': []
-    }
-    
-    for pcap_file, label_file in zip(pcap_files, label_files):
-        logger.info(f"Processing {pcap_file} with labels from {label_file}")
-        process_pcap(pcap_file, label_file, data, packet_count_override=10000)  # Override packet count for testing
-    
-    df = pd.DataFrame(data)
-    logger.debug(f"Saving combined dataset with shape {df.shape}")
-    df.to_csv('/ml/Lightweight-IDS/cicids2017/combined_dataset.csv', index=False)
+    output = args.output or os.path.join("/ml/Lightweight-IDS/cicids2017",
+                                         "combined_dataset.parquet" if args.bulk else "combined_dataset.csv")
+    process_captures(list(zip(pcap_files, label_files)), output, workers=args.workers, chunk_size=args.chunk_size,
+                     max_packets=args.max_packets, time_slack=args.time_slack, utc_offset_hours=args.utc_offset)
+    logger.debug(f"Saved combined dataset to {output}")
 
 if __name__ == "__main__":
     main()
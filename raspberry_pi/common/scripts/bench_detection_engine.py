@@ -0,0 +1,104 @@
+"""
+Benchmark the micro-batching detection engine against per-flow inference.
+
+The model is the nodes' 78-64-32-1 ANN: a NumPy forward pass with random
+weights by default, or a freshly built Keras model (--backend keras, needs
+TensorFlow) compiled through keras_predict_fn. The baseline classifies one
+flow per call, as the old simulate_detection loop did (without its 1 s
+sleep). The engine is then driven at several offered loads, reporting
+achieved flows/s, mean batch size and end-to-end p50/p99 latency.
+--call-overhead-ms adds a fixed per-call cost to the NumPy model to emulate
+Keras dispatch overhead without TensorFlow.
+
+Usage:
+    python bench_detection_engine.py --flows 20000 --rates 1000 5000 20000 0
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from fl_common.detection_engine import MicroBatchDetector, keras_predict_fn
+
+NUM_FEATURES = 78
+
+
+def numpy_predict_fn(seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = [NUM_FEATURES, 64, 32, 1]
+    weights = [(rng.normal(size=(a, b)) / np.sqrt(a)).astype(np.float32) for a, b in zip(sizes[:-1], sizes[1:])]
+    biases = [np.zeros(b, np.float32) for b in sizes[1:]]
+
+    def predict(X):
+        h = np.maximum(X @ weights[0] + biases[0], 0.0)
+        h = np.maximum(h @ weights[1] + biases[1], 0.0)
+        return 1.0 / (1.0 + np.exp(-(h @ weights[2] + biases[2]).ravel()))
+
+    return predict
+
+
+def keras_model_fn():
+    from fl_common.client import build_model
+    return keras_predict_fn(build_model(NUM_FEATURES, 0.0005))
+
+
+def run_engine(predict_fn, X, rate, max_batch, max_delay_ms):
+    detector = MicroBatchDetector(predict_fn, NUM_FEATURES, max_batch=max_batch, max_delay_ms=max_delay_ms)
+    start = time.perf_counter()
+    for i, x in enumerate(X):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        detector.submit(i, x)
+    detector.close()
+    elapsed = time.perf_counter() - start
+    latency = detector.latency_percentiles()
+    return len(X) / elapsed, len(X) / detector.batches, latency[50], latency[99]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=20000)
+    parser.add_argument("--rates", type=float, nargs="+", default=[1000, 5000, 20000, 0],
+                        help="offered loads in flows/s (0 = unthrottled)")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    parser.add_argument("--backend", choices=["numpy", "keras"], default="numpy")
+    parser.add_argument("--call-overhead-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    predict_fn = numpy_predict_fn() if args.backend == "numpy" else keras_model_fn()
+    if args.call_overhead_ms:
+        model_fn = predict_fn
+
+        def predict_fn(X):
+            time.sleep(args.call_overhead_ms / 1000.0)
+            return model_fn(X)
+
+    X = np.random.default_rng(1).normal(size=(args.flows, NUM_FEATURES)).astype(np.float32)
+
+    baseline_flows = min(args.flows, 2000)
+    latencies = []
+    start = time.perf_counter()
+    for x in X[:baseline_flows]:
+        t = time.perf_counter()
+        predict_fn(x[None, :])
+        latencies.append((time.perf_counter() - t) * 1000)
+    baseline_rate = baseline_flows / (time.perf_counter() - start)
+
+    print(f"{'mode':>22} {'flows/s':>10} {'mean batch':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'per-flow predict':>22} {baseline_rate:>10.0f} {1:>11.1f} "
+          f"{np.percentile(latencies, 50):>8.3f} {np.percentile(latencies, 99):>8.3f}")
+    for rate in args.rates:
+        throughput, mean_batch, p50, p99 = run_engine(predict_fn, X, rate, args.max_batch, args.max_delay_ms)
+        label = f"engine @ {rate:.0f}/s" if rate else "engine unthrottled"
+        print(f"{label:>22} {throughput:>10.0f} {mean_batch:>11.1f} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
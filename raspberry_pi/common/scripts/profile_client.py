@@ -0,0 +1,92 @@
+"""
+Run a node's Flower client in-process (no server) and profile its rounds.
+
+Builds fl_common.client.FlowerClient from a node's client_config.json and
+drives fit/evaluate directly, feeding each round's weights back in as the
+next global model. Reports per-phase wall-clock times and, with --profile,
+the top cProfile entries. --synthetic replaces the node's dataset with
+random CICIDS-shaped data so the harness runs on any machine with TensorFlow.
+
+Usage:
+    python profile_client.py --config ../../node-beta/config/client_config.json --rounds 2 --epochs 1 --profile
+"""
+
+import argparse
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from fl_common.client import ClientMetrics, FlowerClient, configure_device, load_config
+
+
+def synthetic_data(rows, features=78, seed=42):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features)).astype(np.float32)
+    y = (X[:, :4].sum(axis=1) > 0).astype(np.int32)
+    split = int(rows * 0.8)
+    return X[:split], X[split:], y[:split], y[split:]
+
+
+def run(client, rounds):
+    timings = {}
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    timed("load data", lambda: client.data)
+    parameters = timed("build model", client.get_parameters, {})
+    for _ in range(rounds):
+        parameters, _, _ = timed("fit", client.fit, parameters, {})
+        timed("evaluate", client.evaluate, parameters, {})
+    client.hash_log.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", required=True, help="node client_config.json")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=None, help="override the configured local epochs")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS", help="use random data instead of dataset_path")
+    parser.add_argument("--profile", action="store_true", help="print the top cProfile entries")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # Keep the node's real hash log untouched
+    overrides = {"hash_log_path": os.path.join(tempfile.mkdtemp(prefix="profile_client_"), "model_hashes.log")}
+    if args.epochs is not None:
+        overrides["epochs"] = args.epochs
+    config = load_config(args.config, overrides)
+    configure_device(config.get("use_gpu", False))
+
+    data = (lambda: synthetic_data(args.synthetic)) if args.synthetic else None
+    client = FlowerClient(config, data=data, metrics=ClientMetrics())
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    timings = run(client, args.rounds)
+    if profiler:
+        profiler.disable()
+
+    for name, values in timings.items():
+        print(f"{name:>12}: {np.mean(values):8.3f}s mean over {len(values)} call(s)")
+    if profiler:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        print(stream.getvalue())
+
+
+if __name__ == "__main__":
+    main()